@@ -0,0 +1,84 @@
+"""
+Compares payload packing throughput for different compression settings.
+
+Generates a synthetic payload (half random bytes, half repetitive text, which
+roughly resembles model weights plus code and configs), packs it with every
+configuration and prints input throughput and compression ratio.
+
+Usage:
+    python benchmarks/payload_compression.py --size 2048 --threads 1 --threads 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from hs.util.compression import CODECS, PackOptions, write_tarball
+from hs.util.payload import iter_payload_files
+
+FILE_SIZE = 64 * 1024 * 1024
+
+
+class CountingSink:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def generate_payload(path: str, size: int):
+    text = b"".join(f"line {i}: the quick brown fox jumps over the lazy dog\n".encode() for i in range(100000))
+    written = 0
+    idx = 0
+    while written < size:
+        chunk_size = min(FILE_SIZE, size - written)
+        with open(os.path.join(path, f"part-{idx:04}.bin"), "wb") as f:
+            left = chunk_size
+            while left > 0:
+                random_part = os.urandom(min(len(text), left // 2 or 1))
+                block = (random_part + text)[:left]
+                f.write(block)
+                left -= len(block)
+        written += chunk_size
+        idx += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048, help="payload size in MiB")
+    parser.add_argument("--threads", type=int, action="append", help="thread counts to compare")
+    parser.add_argument("--level", type=int, action="append", help="compression levels to compare")
+    parser.add_argument("--codec", choices=CODECS, action="append", help="codecs to compare")
+    args = parser.parse_args()
+    threads = args.threads or [1, os.cpu_count() or 1]
+    codecs = args.codec or CODECS
+
+    with tempfile.TemporaryDirectory() as path:
+        print(f"Generating {args.size} MiB payload in {path}")
+        generate_payload(path, args.size * 1024 * 1024)
+        files = list(iter_payload_files(path, ["./"]))
+        total = sum(os.path.getsize(p) for p, _ in files)
+        print(f"{'codec':<6} {'level':>5} {'threads':>7} {'MiB/s':>9} {'ratio':>7}")
+        for codec in codecs:
+            for level in args.level or [None]:
+                for thread_count in threads:
+                    try:
+                        options = PackOptions(codec, level, thread_count, reproducible=True)
+                    except ImportError as ex:
+                        print(f"{codec:<6} skipped: {ex}")
+                        break
+                    sink = CountingSink()
+                    started_at = time.monotonic()
+                    write_tarball(sink, files, options)
+                    elapsed = time.monotonic() - started_at
+                    throughput = total / elapsed / 1024 / 1024
+                    print(f"{codec:<6} {options.level:>5} {thread_count:>7} {throughput:>9.1f} {total / sink.size:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1 @@
-from hs.cli.commands.hs import *
-from hs.cli.commands.cluster import *
-from hs.cli.commands.profile import *
-from hs.cli.commands.model import *
-from hs.cli.commands.app import *
-from hs.cli.commands.apply import *
-from hs.cli.commands.servable import *
-from hs.cli.commands.deployment_configuration import *
\ No newline at end of file
+from hs.cli.commands.hs import hs_cli
@@ -1,36 +1,44 @@
 
 import click
-from tabulate import tabulate
 
-from hs.cli.commands.hs import hs_cli
-from hs.cli.context import CONTEXT_SETTINGS
-from hs.cli.help import PROFILE_HELP
-from hs.entities.cluster_config import get_cluster_connection
-from hydrosdk.application import Application
+from hs.cli.completion import APPLICATIONS, complete
+from hs.cli.context import CONTEXT_SETTINGS, invalidate_listings, pass_connection
+from hs.cli.help import APPLICATION_HELP
+from hs.util.listing import APPLICATIONS_URL, stream_list
+from hs.util.output import filter_rows, list_options, write_rows
 
-@hs_cli.group(help=PROFILE_HELP)
-@click.pass_context
-def app(ctx):
-    ctx.obj = get_cluster_connection(ctx.obj)
+@click.group(help=APPLICATION_HELP)
+def app():
+    pass
+
+
+def application_row(app_json: dict) -> dict:
+    return {
+        'name': app_json.get('name'),
+        'status': app_json.get('status'),
+    }
 
 
 @app.command(context_settings=CONTEXT_SETTINGS)
+@list_options()
 @click.pass_obj
-def list(obj):
-    apps = Application.list(obj)
-    apps_view = []
-    for a in apps:
-        apps_view.append({'name': a.name})
-    click.echo(tabulate(apps_view, headers="keys", tablefmt="github"))
+def list(obj, name, status, limit, cache_mode):
+    apps = stream_list(obj.connection, APPLICATIONS_URL, "Failed to list all applications",
+                       obj.listing_cache, cache_mode)
+    rows = filter_rows(map(application_row, apps), name, status, limit)
+    write_rows(rows, obj.output)
 
 
 @app.command(context_settings=CONTEXT_SETTINGS)
 @click.argument('app-name',
-                required=True)
+                required=True,
+                autocompletion=complete(APPLICATIONS))
 @click.option('-y', default=False, is_flag=True)
-@click.pass_obj
+@pass_connection
 def rm(obj, app_name, y):
+    from hydrosdk.application import Application
     if not y:
         click.confirm(f"Are you sure you want to delete the {app_name} application?", abort=True)
     Application.delete(obj, app_name)
+    invalidate_listings()
     click.echo(f"Application is  deleted: {app_name}")
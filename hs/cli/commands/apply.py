@@ -3,19 +3,35 @@ from hs.entities.deployment_config import DeploymentConfig
 from hs.entities.application import Application
 import os
 import sys
-import pprint
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
 import click
 
-from hs.cli.commands.hs import hs_cli
-from hs.cli.context import CONTEXT_SETTINGS
-from hs.entities.cluster_config import get_cluster_connection
+from hs.cli.context import CONTEXT_SETTINGS, invalidate_listings, pass_connection
+from hs.cli.help import APPLY_HELP
+from hs.entities.apply_context import ApplyContext, ApplyLock, PendingBuild, PendingBuilds
+from hs.entities.model_index import ModelVersionIndex
 from hs.entities.model_version import ModelVersion
+from hs.metadata_collectors.collected_metadata import COLLECTOR_TIMEOUT, CollectedMetadata, MetadataOptions
+from hs.util.compression import CODECS, GZIP, PackOptions
+from hs.util.dag import CycleError, run_graph
+from hs.util.logutils import echo, grouped_output
 
+KINDS = {
+    "Model": ModelVersion,
+    "Application": Application,
+    "DeploymentConfiguration": DeploymentConfig,
+}
 
-@hs_cli.command(
-    help="Applies YAML definition files and creates resources on Hydrosphere serving cluster",
-    context_settings=CONTEXT_SETTINGS)
+
+class ApplyDocument(NamedTuple):
+    arg: str
+    cwd: str
+    kind: str
+    entity: Union[ModelVersion, Application, DeploymentConfig]
+
+
+@click.command(help=APPLY_HELP, context_settings=CONTEXT_SETTINGS)
 @click.option('-f',
               type=click.Path(
                   exists=True,
@@ -26,9 +42,89 @@ from hs.entities.model_version import ModelVersion
               ),
               multiple=True,
               required=True)
-@click.pass_obj
-def apply(obj, f):
-    conn = get_cluster_connection(obj)
+@click.option('--parallelism',
+              type=click.IntRange(min=1),
+              default=1,
+              show_default=True,
+              help="Max number of documents applied concurrently. "
+                   "Documents are applied after the resources they refer to.")
+@click.option('--force',
+              is_flag=True,
+              default=False,
+              help="Build model versions even if their content didn't change since the last apply.")
+@click.option('--upload-timeout',
+              type=click.FloatRange(min=0),
+              required=False,
+              help="Timeout in seconds for model payload uploads.")
+@click.option('--compression',
+              type=click.Choice(CODECS),
+              default=GZIP,
+              show_default=True,
+              help="Payload archive compression. zstd requires `zstandard` package "
+                   "and a cluster which accepts zstd archives.")
+@click.option('--compression-level',
+              type=click.IntRange(min=0, max=22),
+              required=False,
+              help="Payload compression level. Defaults to 6 for gzip and 3 for zstd.")
+@click.option('--threads',
+              type=click.IntRange(min=1),
+              required=False,
+              help="Number of payload compression threads. Defaults to the number of CPU cores.")
+@click.option('--reproducible',
+              is_flag=True,
+              default=False,
+              help="Drop timestamps and ownership from payload archives, "
+                   "so the same payload always produces the same archive.")
+@click.option('--no-dvc-metadata',
+              is_flag=True,
+              default=False,
+              help="Don't collect DVC metrics into model version metadata.")
+@click.option('--dvc-api',
+              is_flag=True,
+              default=False,
+              help="Collect DVC metrics using `dvc` package instead of reading metrics files "
+                   "declared in dvc.yaml. Slower, but supports all DVC features.")
+@click.option('--metadata-timeout',
+              type=click.FloatRange(min=0),
+              default=COLLECTOR_TIMEOUT,
+              show_default=True,
+              help="Time budget in seconds for collecting git and DVC metadata. "
+                   "Metadata that isn't collected in time is skipped.")
+@click.option('--save-build-logs/--no-save-build-logs',
+              default=True,
+              show_default=True,
+              help="Save full build logs of model versions to .hs/logs.")
+@click.option('--no-wait',
+              is_flag=True,
+              default=False,
+              help="Don't wait for model versions to build, unless applications of this run use them. "
+                   "Model versions are written to --pending-file to be awaited with `hs wait`.")
+@click.option('--pending-file',
+              type=click.Path(dir_okay=False, writable=True),
+              default=ApplyContext.default_pending_path(),
+              show_default=True,
+              help="File to write model versions applied with --no-wait to.")
+@pass_connection
+def apply(conn, f, parallelism, force, upload_timeout, compression, compression_level, threads, reproducible,
+          no_dvc_metadata, dvc_api, metadata_timeout, save_build_logs, no_wait, pending_file):
+    try:
+        pack_options = PackOptions(compression, compression_level, threads, reproducible)
+    except (ValueError, ImportError) as ex:
+        raise click.ClickException(str(ex))
+    ctx = ApplyContext(
+        lock=ApplyLock(ApplyContext.default_lock_path()),
+        force=force,
+        upload_timeout=upload_timeout,
+        pack_options=pack_options,
+        index=ModelVersionIndex(conn),
+        metadata_options=MetadataOptions(dvc=not no_dvc_metadata, dvc_api=dvc_api, timeout=metadata_timeout),
+        build_logs_folder=ApplyContext.default_build_logs_folder() if save_build_logs else None,
+        wait=not no_wait,
+        pending=PendingBuilds(pending_file) if no_wait else None
+    )
+    # the repository may have changed since the previous run of this process
+    CollectedMetadata.clear_cache()
+    docs = []
     for path in f:
         if path == "-":
             content = list(yaml.safe_load_all(sys.stdin))
@@ -38,31 +134,99 @@ def apply(obj, f):
                 content = list(yaml.safe_load_all(f))
                 cwd = os.path.dirname(path)
         for doc in content:
-            parse_apply(path, conn, cwd, doc)
+            docs.append(parse_document(path, cwd, doc))
+    ctx.index.resolve(model_refs(docs, ctx, conn))
+    if no_wait:
+        # applications can only be created from built model versions
+        ctx.wait_for = {name for doc in docs if doc.kind == "Application"
+                        for kind, name in doc.entity.dependencies() if kind == "Model"}
 
+    def _apply(doc: ApplyDocument):
+        if parallelism > 1:
+            with grouped_output():
+                apply_document(conn, doc, ctx)
+        else:
+            apply_document(conn, doc, ctx)
 
+    try:
+        run_graph(docs, document_dependencies(docs), _apply, parallelism)
+    except CycleError as ex:
+        cycle = ", ".join(f"{docs[i].kind} {docs[i].entity.name}" for i in ex.nodes)
+        raise click.ClickException(f"Can't apply documents with cyclic references: {cycle}")
+    finally:
+        invalidate_listings()
 
-def parse_apply(arg, conn, cwd, raw_dict):
+
+def model_refs(docs: List[ApplyDocument], ctx: ApplyContext, conn) -> List[Tuple[str, int]]:
+    """
+    Model versions referred to by documents or recorded in the apply lock for them.
+    """
+    refs = []
+    for doc in docs:
+        refs.extend(doc.entity.model_refs())
+        if doc.kind == "Model" and not ctx.force:
+            locked = ctx.lock.get(conn.http_address, doc.entity.name)
+            if locked:
+                refs.append((doc.entity.name, locked.version))
+    return refs
+
+
+def document_dependencies(docs: List[ApplyDocument]) -> Dict[int, Set[int]]:
+    """
+    Builds dependency graph between documents.
+    A document depends on every earlier document with the same kind and name
+    and on every document it refers to.
+    """
+    by_key: Dict[tuple, List[int]] = {}
+    for idx, doc in enumerate(docs):
+        by_key.setdefault((doc.kind, doc.entity.name), []).append(idx)
+
+    deps: Dict[int, Set[int]] = {}
+    for idx, doc in enumerate(docs):
+        deps[idx] = {i for i in by_key[(doc.kind, doc.entity.name)] if i < idx}
+        for ref in doc.entity.dependencies():
+            deps[idx].update(i for i in by_key.get(ref, []) if i != idx)
+    return deps
+
+
+def parse_document(arg, cwd, raw_dict) -> ApplyDocument:
     kind = raw_dict.get('kind')
     if not kind:
         raise click.ClickException(f"No 'kind' field specified in {arg}.")
-    if kind == "Model":
-        mv_def = ModelVersion.parse_obj(raw_dict)
-        click.echo("Applying the following model version:")
-        click.echo(mv_def.to_yaml())
-        result = mv_def.apply(conn, cwd)
-        click.echo(f"Model {result.name}:{result.version} was applied successfully")
-    elif kind == "Application":
-        app_def = Application.parse_obj(raw_dict)
-        click.echo("Applying the following application:")
-        click.echo(app_def.to_yaml())
-        result = app_def.apply(conn, cwd)
-        click.echo(f"Application {result.name} with id {result.id} was applied successfully")
-    elif kind == "DeploymentConfiguration":
-        dc_def = DeploymentConfig.parse_obj(raw_dict)
-        click.echo("Applying the following deployment configuration:")
-        click.echo(dc_def.dict(by_alias=True))
-        result = dc_def.apply(conn)
-        click.echo(f"Deployment configuration {result.name} was applied successfully")
-    else:
-        raise click.ClickException(f"Kind {kind} in {arg} is not supported")
\ No newline at end of file
+    entity_cls = KINDS.get(kind)
+    if entity_cls is None:
+        raise click.ClickException(f"Kind {kind} in {arg} is not supported")
+    return ApplyDocument(arg, cwd, kind, entity_cls.parse_obj(raw_dict))
+
+
+def apply_document(conn, doc: ApplyDocument, ctx: Optional[ApplyContext] = None):
+    if doc.kind == "Model":
+        echo("Applying the following model version:")
+        echo(doc.entity.to_yaml())
+        result = doc.entity.apply(conn, doc.cwd, ctx, manifest=doc.arg)
+        if ctx is not None and not ctx.should_wait(result.name):
+            if ctx.pending is not None:
+                ctx.pending.add(PendingBuild(
+                    cluster = conn.http_address,
+                    id = result.id,
+                    name = result.name,
+                    version = result.version,
+                    manifest = doc.arg
+                ))
+            echo(f"Model {result.name}:{result.version} was uploaded, its build is in progress")
+        else:
+            echo(f"Model {result.name}:{result.version} was applied successfully")
+    elif doc.kind == "Application":
+        echo("Applying the following application:")
+        echo(doc.entity.to_yaml())
+        result = doc.entity.apply(conn, doc.cwd, ctx)
+        echo(f"Application {result.name} with id {result.id} was applied successfully")
+    elif doc.kind == "DeploymentConfiguration":
+        echo("Applying the following deployment configuration:")
+        echo(doc.entity.dict(by_alias=True))
+        result = doc.entity.apply(conn)
+        echo(f"Deployment configuration {result.name} was applied successfully")
+
+
+def parse_apply(arg, conn, cwd, raw_dict):
+    apply_document(conn, parse_document(arg, cwd, raw_dict))
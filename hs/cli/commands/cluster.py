@@ -1,21 +1,20 @@
 from tabulate import tabulate
 import click
 
-from hs.cli.commands.hs import hs_cli
 from hs.cli.help import CLUSTER_HELP, CLUSTER_USE_HELP, CLUSTER_LIST_HELP, CLUSTER_ADD_HELP, \
     CLUSTER_RM_HELP
 from hs.entities.cluster_config import ClusterConfig, ClusterDef, ClusterServerDef, \
      read_cluster_config, read_current_cluster, write_cluster_config
 from hs.settings import CONFIG_PATH
 
-@hs_cli.group(
+@click.group(
     invoke_without_command=True,
     help=CLUSTER_HELP
 )
 @click.pass_context
 def cluster(ctx):
     if ctx.invoked_subcommand is None:
-        current_cluster = read_current_cluster(ctx.obj)
+        current_cluster = read_current_cluster(ctx.obj.config_path, ctx.obj.cluster_name)
         click.echo("Current cluster: {}".format(current_cluster))
 
 
@@ -23,7 +22,7 @@ def cluster(ctx):
 @click.argument('cluster_name')
 @click.pass_obj
 def use(obj, cluster_name):
-    config = read_cluster_config(obj)
+    config = read_cluster_config(obj.config_path)
     if config is None:
         raise click.ClickException("Can't set current cluster. No clusters defined.")
 
@@ -35,12 +34,12 @@ def use(obj, cluster_name):
     if current_cluster is None:
         raise click.ClickException(f"Can't find {cluster_name} cluster")
     config.current_cluster = current_cluster
-    write_cluster_config(obj, config)
+    write_cluster_config(obj.config_path, config)
 
 @cluster.command(help=CLUSTER_LIST_HELP)
 @click.pass_obj
 def list(obj):
-    config = read_cluster_config(obj)
+    config = read_cluster_config(obj.config_path)
     click.echo(f"Current cluster: {config.current_cluster}")
     clusters_view = []
     for cluster in config.clusters:
@@ -57,7 +56,7 @@ def list(obj):
 @click.pass_obj
 def add(obj, name, server):
     new_cluster = ClusterDef(name=name, cluster=ClusterServerDef(server=server))
-    config = read_cluster_config(obj)
+    config = read_cluster_config(obj.config_path)
     
     if config is None:
         config = ClusterConfig(
@@ -80,7 +79,7 @@ def add(obj, name, server):
         click.echo(f"Couldn't find current cluster. Setting {current_cluster.name} as current.")
         config.current_cluster = current_cluster.name
 
-    write_cluster_config(obj, config)
+    write_cluster_config(obj.config_path, config)
     click.echo(f"Cluster {new_cluster.name} at {new_cluster.cluster.server} added successfully")
 
 
@@ -88,7 +87,7 @@ def add(obj, name, server):
 @click.argument("cluster_name")
 @click.pass_obj
 def rm(obj, cluster_name):
-    config = read_cluster_config(obj)
+    config = read_cluster_config(obj.config_path)
 
     if config is None:
         raise click.ClickException("Can't delete. No clusters defined.")
@@ -103,7 +102,7 @@ def rm(obj, cluster_name):
         raise click.ClickException(f"Can't delete. Cluster {cluster_name} is not found.")
 
     config.clusters.remove(to_delete)
-    write_cluster_config(obj, config)
+    write_cluster_config(obj.config_path, config)
     click.echo("Deleted successfully")
 
 @cluster.command()
@@ -1,25 +1,26 @@
 import click
-from hydrosdk.deployment_configuration import DeploymentConfiguration
-from tabulate import tabulate
 import textwrap
 
-from hs.cli.commands.hs import hs_cli
+from hs.cli.completion import DEPLOYMENT_CONFIGURATIONS, complete
+from hs.cli.context import invalidate_listings, pass_connection
+from hs.util.listing import DEPLOYMENT_CONFIGURATIONS_URL, stream_list
+from hs.util.output import filter_rows, list_options, write_rows
 from hs.cli.help import DEPLOYMENT_CONFIGURATION_LIST_HELP, \
     DEPLOYMENT_CONFIGURATION_HELP, DEPLOYMENT_CONFIGURATION_RM_HELP
-from hs.entities.cluster_config import get_cluster_connection
 
 def wrap_text(text: str) -> str:
     return "\n".join(textwrap.wrap(str(text), width=50))
 
-@hs_cli.group(help=DEPLOYMENT_CONFIGURATION_HELP)
-@click.pass_context
-def depconf(ctx):
-    ctx.obj = get_cluster_connection()
+@click.group(help=DEPLOYMENT_CONFIGURATION_HELP)
+def depconf():
+    pass
 
 @depconf.command()
-@click.argument("depconf-name")
-@click.pass_obj
+@click.argument("depconf-name", autocompletion=complete(DEPLOYMENT_CONFIGURATIONS))
+@pass_connection
 def get(obj, depconf_name):
+    from hydrosdk.deployment_configuration import DeploymentConfiguration
+    from tabulate import tabulate
     deployment_configuration = DeploymentConfiguration.find(obj, depconf_name)
     table = {
         "param": [
@@ -39,18 +40,31 @@ def get(obj, depconf_name):
     }
     click.echo(tabulate(table))
 
+def deployment_configuration_row(config_json: dict) -> dict:
+    return {
+        'name': config_json.get('name'),
+        'hpa': 'hpa' in config_json,
+        'pod': 'pod' in config_json,
+        'container': 'container' in config_json,
+        'deployment': 'deployment' in config_json,
+    }
+
+
 @depconf.command(help=DEPLOYMENT_CONFIGURATION_LIST_HELP)
+@list_options(with_status=False)
 @click.pass_obj
-def list(obj):
-    click.echo("List of available deployment configurations:")
-    deployment_configurations = DeploymentConfiguration.list(obj)
-    for config in deployment_configurations:
-        click.echo(f"\t* {config}")
+def list(obj, name, limit, cache_mode):
+    configs = stream_list(obj.connection, DEPLOYMENT_CONFIGURATIONS_URL,
+                          "Failed to get a list of Deployment Configurations", obj.listing_cache, cache_mode)
+    rows = filter_rows(map(deployment_configuration_row, configs), name, limit=limit)
+    write_rows(rows, obj.output, sort_key=lambda x: x['name'])
 
 
 @depconf.command(help=DEPLOYMENT_CONFIGURATION_RM_HELP)
-@click.argument("depconf-name")
-@click.pass_obj
+@click.argument("depconf-name", autocompletion=complete(DEPLOYMENT_CONFIGURATIONS))
+@pass_connection
 def rm(obj, depconf_name):
+    from hydrosdk.deployment_configuration import DeploymentConfiguration
     DeploymentConfiguration.delete(obj, depconf_name)
+    invalidate_listings()
     click.echo("Deployment Configuration '{depconf_name}' removed successfully")
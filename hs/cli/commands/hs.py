@@ -4,11 +4,27 @@ import click
 import click_log
 
 from hs.util.logutils import StdoutLogHandler
-from hs.cli.context import CONTEXT_SETTINGS
+from hs.cli.context import CONTEXT_SETTINGS, CliContext
+from hs.cli.help import APPLICATION_HELP, APPLY_HELP, CLUSTER_HELP, DEPLOYMENT_CONFIGURATION_HELP, MODEL_HELP, \
+    PROFILE_HELP, SERVABLE_HELP, WAIT_HELP
+from hs.cli.lazy_group import LazyCommand, LazyGroup
 from hs.settings import CONFIG_PATH
+from hs.util.output import OUTPUT_FORMATS, TABLE
 
+# subcommand modules are imported only when the subcommand is invoked
+COMMANDS = {
+    "app": LazyCommand("hs.cli.commands.app", "app", APPLICATION_HELP),
+    "apply": LazyCommand("hs.cli.commands.apply", "apply", APPLY_HELP),
+    "cluster": LazyCommand("hs.cli.commands.cluster", "cluster", CLUSTER_HELP),
+    "depconf": LazyCommand("hs.cli.commands.deployment_configuration", "depconf", DEPLOYMENT_CONFIGURATION_HELP),
+    "model": LazyCommand("hs.cli.commands.model", "model", MODEL_HELP),
+    "profile": LazyCommand("hs.cli.commands.profile", "profile", PROFILE_HELP),
+    "servable": LazyCommand("hs.cli.commands.servable", "servable", SERVABLE_HELP),
+    "wait": LazyCommand("hs.cli.commands.wait", "wait", WAIT_HELP),
+}
 
-@click.group(context_settings=CONTEXT_SETTINGS)
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS, context_settings=CONTEXT_SETTINGS)
 @click.version_option(message="%(prog)s version %(version)s")
 @click.option("--verbose", "-v", "verbose",
               default=False,
@@ -23,8 +39,13 @@ from hs.settings import CONFIG_PATH
               help=f"Override the default config file at {CONFIG_PATH}",
               show_default=CONFIG_PATH,
               required=False)
+@click.option('--output', '-o',
+              type=click.Choice(OUTPUT_FORMATS),
+              default=TABLE,
+              show_default=True,
+              help="Output format of list commands. json, ndjson and csv rows are printed as they are received")
 @click.pass_context
-def hs_cli(ctx, verbose, cluster, config_file):
+def hs_cli(ctx, verbose, cluster, config_file, output):
     click_log.basic_config(logging.root)
     # custom handler to print output into stdout
     log_handler = StdoutLogHandler()
@@ -35,11 +56,8 @@ def hs_cli(ctx, verbose, cluster, config_file):
     else:
         logging.root.setLevel(logging.INFO)
     logging.debug("CLI root command (hs_cli) initialized")
-    if config_file:
-        ctx.obj = config_file
-    else:
-        # note: didn't set as default in click, 
-        # since CONFIG_FILE is a special case and can be missing
-        # and created later using `hs cluster add` command
-        ctx.obj = CONFIG_PATH
-    logging.debug(f"Working with {ctx.obj} config file")
\ No newline at end of file
+    # note: didn't set as default in click, 
+    # since CONFIG_FILE is a special case and can be missing
+    # and created later using `hs cluster add` command
+    ctx.obj = CliContext(config_file or CONFIG_PATH, cluster, output)
+    logging.debug(f"Working with {ctx.obj.config_path} config file")
\ No newline at end of file
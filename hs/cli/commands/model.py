@@ -1,33 +1,37 @@
+import os
 import click
-from tabulate import tabulate
 
-from hs.cli.commands.hs import hs_cli
-from hs.cli.context import CONTEXT_SETTINGS
-from hs.cli.help import PROFILE_HELP
-from hs.entities.cluster_config import get_cluster_connection
-from hydrosdk.modelversion import ModelVersion
+from hs.cli.completion import MODEL_VERSIONS, complete
+from hs.cli.context import CONTEXT_SETTINGS, pass_connection
+from hs.cli.help import MODEL_HELP, MODEL_PAYLOAD_SIZE_HELP
+from hs.util.listing import MODEL_VERSIONS_URL, stream_list
+from hs.util.output import filter_rows, list_options, write_rows
 
-@hs_cli.group(help=PROFILE_HELP)
-@click.pass_context
-def model(ctx):
-    ctx.obj = get_cluster_connection()
+@click.group(help=MODEL_HELP)
+def model():
+    pass
+
+
+def model_version_row(mv_json: dict) -> dict:
+    runtime = mv_json.get('runtime')
+    return {
+        'id': mv_json['id'],
+        'name': mv_json['model']['name'],
+        'version': mv_json['modelVersion'],
+        'status': mv_json.get('status'),
+        'runtime': f"{runtime['name']}:{runtime['tag']}" if runtime else None,
+        'apps': mv_json.get('applications') or []
+    }
 
 
 @model.command(context_settings=CONTEXT_SETTINGS)
+@list_options()
 @click.pass_obj
-def list(obj):
-    models = ModelVersion.list(obj)
-    versions_view = []
-    for m in models:
-        versions_view.append({
-            'id': m.id,
-            'name': m.name,
-            '#': m.version,
-            'status': m.status,
-            'runtime': str(m.runtime),
-            'apps': m.applications
-        })
-    click.echo(tabulate(sorted(versions_view, key=lambda x: (x['name'], x['#'])), headers="keys", tablefmt="github"))
+def list(obj, name, status, limit, cache_mode):
+    versions = stream_list(obj.connection, MODEL_VERSIONS_URL, "Failed to list model versions",
+                           obj.listing_cache, cache_mode)
+    rows = filter_rows(map(model_version_row, versions), name, status, limit)
+    write_rows(rows, obj.output, sort_key=lambda x: (x['name'], x['version']))
 
 
 # todo: can't find delete model method in SDK
@@ -46,12 +50,58 @@ def list(obj):
 
 
 @model.command(context_settings=CONTEXT_SETTINGS)
-@click.argument('model-name', required=True)
-@click.pass_obj
+@click.argument('model-name', required=True, autocompletion=complete(MODEL_VERSIONS))
+@pass_connection
 def logs(obj, model_name):
+    from hydrosdk.modelversion import ModelVersion, ModelVersionStatus
+    from hs.util.dockerutils import DockerLogHandler
+    from hs.util.sse import resumable_events
     (name, version) = model_name.split(':')
     mv = ModelVersion.find(obj, name, version)
-    logs = mv.build_logs()
-    for l in logs:
-        click.echo(l.data)
+
+    def _is_finished():
+        return ModelVersion.find(obj, name, version).status is not ModelVersionStatus.Assembling
+
+    with DockerLogHandler() as handler:
+        for l in resumable_events(obj, f"/api/v2/model/version/{mv.id}/logs", _is_finished):
+            handler.show(l.data)
     click.echo("End of logs")
+
+
+@model.command(name="payload-size", help=MODEL_PAYLOAD_SIZE_HELP, context_settings=CONTEXT_SETTINGS)
+@click.option('-f',
+              type=click.Path(exists=True, dir_okay=False, readable=True),
+              required=True,
+              help="Path to a YAML file with model definitions")
+@click.option('--top', type=click.IntRange(min=1), default=10, show_default=True,
+              help="Number of the biggest files and directories to show")
+def payload_size(f, top):
+    from hs.entities.model_version import ModelVersion as ModelVersionDef
+    from hs.util.upload import format_size
+    from tabulate import tabulate
+    import yaml
+    cwd = os.path.dirname(f)
+    with open(f, "r") as fd:
+        docs = [doc for doc in yaml.safe_load_all(fd) if doc and doc.get("kind") == "Model"]
+    if not docs:
+        raise click.ClickException(f"No models defined in {f}")
+    for doc in docs:
+        mv_def = ModelVersionDef.parse_obj(doc)
+        file_sizes = {}
+        dir_sizes = {}
+        for path, arcname in mv_def.payload_files(cwd):
+            size = os.path.getsize(path)
+            file_sizes[arcname] = size
+            parent = os.path.dirname(arcname)
+            while parent:
+                dir_sizes[parent] = dir_sizes.get(parent, 0) + size
+                parent = os.path.dirname(parent)
+        total = sum(file_sizes.values())
+        click.echo(f"Model {mv_def.name}: {len(file_sizes)} files, {format_size(total)}")
+        for title, sizes in [("directory", dir_sizes), ("file", file_sizes)]:
+            if not sizes:
+                continue
+            biggest = sorted(sizes.items(), key=lambda x: (-x[1], x[0]))[:top]
+            view = [{title: name, 'size': format_size(size), '%': f"{100 * size / max(total, 1):.1f}"}
+                    for name, size in biggest]
+            click.echo(tabulate(view, headers="keys", tablefmt="github"))
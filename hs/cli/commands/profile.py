@@ -1,63 +1,249 @@
+import os
+from typing import Dict, List, Optional
+
 import click
-from hydrosdk.modelversion import ModelVersion, _upload_local_file, _upload_s3_file, _upload_training_data
 
-from hs.cli.commands.hs import hs_cli
-from hs.cli.context import CONTEXT_SETTINGS
-from hs.cli.help import PROFILE_HELP, PROFILE_PUSH_HELP, PROFILE_MODEL_VERSION_HELP
-from hs.entities.cluster_config import get_cluster_connection
+from hs.cli.completion import MODEL_VERSIONS, complete
+from hs.cli.context import CONTEXT_SETTINGS, pass_connection
+from hs.cli.help import PROFILE_HELP, PROFILE_PUSH_HELP, PROFILE_MODEL_VERSION_HELP, PROFILE_FILENAME_HELP, \
+    PROFILE_ASYNC_HELP, PROFILE_STATUS_HELP, PROFILE_SAMPLE_HELP, PROFILE_SAMPLE_FRACTION_HELP, PROFILE_STRATIFY_BY_HELP, \
+    PROFILE_SEED_HELP, PROFILE_LOCAL_HELP, PROFILE_MODEL_FILE_HELP, PROFILE_WORKERS_HELP, PROFILE_DIFF_HELP, \
+    PROFILE_METRIC_HELP, PROFILE_THRESHOLD_HELP
+
+
+@click.group(help=PROFILE_HELP)
+def profile():
+    pass
+
+
+def find_model_version(conn, model_version: str):
+    from hydrosdk.modelversion import ModelVersion
+    try:
+        model, version = model_version.split(":")
+        version = int(version)
+    except ValueError:
+        raise click.BadParameter(f"{model_version} is not in \"model:version\" format", param_hint="model-version")
+    return ModelVersion.find(conn, model, version)
+
+
+def load_contract(obj, model_file: Optional[str], model_version: Optional[str]):
+    """
+    Contract of a model from a local model file, or of a model version from the cluster.
+    """
+    import yaml
+    from hs.entities.contract import Contract, contract_from_signature
+    if bool(model_file) == bool(model_version):
+        raise click.UsageError("Exactly one of --model-file and --model-version is needed to find the contract")
+    if model_version:
+        return contract_from_signature(find_model_version(obj.connection, model_version).signature)
+    with open(model_file) as f:
+        docs = [doc for doc in yaml.safe_load_all(f) if isinstance(doc, dict) and doc.get("kind") == "Model"]
+    if len(docs) != 1 or "contract" not in docs[0]:
+        raise click.ClickException(f"{model_file} should have a single Model with a contract")
+    return Contract.parse_obj(docs[0]["contract"])
+
+
+def write_profile_rows(rows: List[dict], fmt: str):
+    """
+    Tables are printed one per profile kind, since kinds have different statistics.
+    Histograms are too wide for a table and are printed by other formats only.
+    """
+    from hs.util.output import CSV, TABLE, write_rows
+    if fmt == TABLE:
+        kinds: Dict[str, List[dict]] = {}
+        for row in rows:
+            row = {k: v for k, v in row.items() if k != "histogram"}
+            kinds.setdefault(tuple(row), []).append(row)
+        for i, kind_rows in enumerate(kinds.values()):
+            if i:
+                click.echo()
+            write_rows(kind_rows, fmt)
+    else:
+        columns = list(dict.fromkeys(key for row in rows for key in row)) if fmt == CSV else None
+        write_rows(rows, fmt, columns=columns)
+
+
+@profile.command(help=PROFILE_LOCAL_HELP, context_settings=CONTEXT_SETTINGS)
+@click.argument('filename',
+                type=click.Path(exists=True, dir_okay=False, readable=True))
+@click.option('-f', '--model-file',
+              type=click.Path(exists=True, dir_okay=False, readable=True),
+              help=PROFILE_MODEL_FILE_HELP)
+@click.option('--model-version',
+              autocompletion=complete(MODEL_VERSIONS),
+              help=PROFILE_MODEL_VERSION_HELP)
+@click.option('--workers',
+              type=click.IntRange(min=1),
+              help=PROFILE_WORKERS_HELP)
+@click.option('--bins',
+              type=click.IntRange(min=1),
+              default=20,
+              show_default=True,
+              help="Number of histogram bins of numerical fields.")
+@click.pass_obj
+def local(obj, filename, model_file, model_version, workers, bins):
+    from hs.util.profiling import contract_fields, profile_file
+    contract = load_contract(obj, model_file, model_version)
+    try:
+        profiles = profile_file(filename, contract_fields(contract), workers)
+    except (ValueError, ImportError, OSError) as ex:
+        raise click.ClickException(str(ex))
+    write_profile_rows([p.to_row(bins) for p in profiles], obj.output)
 
 
-@hs_cli.group(help=PROFILE_HELP)
-@click.pass_context
-def profile(ctx):
-    ctx.obj = get_cluster_connection()
+@profile.command(help=PROFILE_DIFF_HELP, context_settings=CONTEXT_SETTINGS)
+@click.argument('old',
+                type=click.Path(exists=True, dir_okay=False, readable=True))
+@click.argument('new',
+                type=click.Path(exists=True, dir_okay=False, readable=True))
+@click.option('-f', '--model-file',
+              type=click.Path(exists=True, dir_okay=False, readable=True),
+              help=PROFILE_MODEL_FILE_HELP)
+@click.option('--model-version',
+              autocompletion=complete(MODEL_VERSIONS),
+              help=PROFILE_MODEL_VERSION_HELP)
+@click.option('--metric',
+              type=click.Choice(["ks", "psi", "js"]),
+              default="psi",
+              show_default=True,
+              help=PROFILE_METRIC_HELP)
+@click.option('--threshold',
+              type=click.FloatRange(min=0),
+              help=PROFILE_THRESHOLD_HELP)
+@click.option('--workers',
+              type=click.IntRange(min=1),
+              help=PROFILE_WORKERS_HELP)
+@click.option('--bins',
+              type=click.IntRange(min=1),
+              default=10,
+              show_default=True,
+              help="Number of shared bins of numerical fields, at quantiles of the OLD file.")
+@click.pass_obj
+def diff(obj, old, new, model_file, model_version, metric, threshold, workers, bins):
+    from hs.util.drift import drift_rows
+    from hs.util.output import write_rows
+    from hs.util.profiling import contract_fields, profile_files
+    contract = load_contract(obj, model_file, model_version)
+    try:
+        old_profiles, new_profiles = profile_files([old, new], contract_fields(contract), workers)
+    except (ValueError, ImportError, OSError) as ex:
+        raise click.ClickException(str(ex))
+    rows = drift_rows(old_profiles, new_profiles, metric, threshold, bins)
+    write_rows(rows, obj.output)
+    drifted = [row["name"] for row in rows if row["drift"]]
+    if drifted:
+        raise click.ClickException(f"Drift of {metric} is over the threshold for fields: {', '.join(drifted)}")
 
 
 @profile.command(help=PROFILE_PUSH_HELP, context_settings=CONTEXT_SETTINGS)
 @click.option('--model-version',
               required=True,
+              autocompletion=complete(MODEL_VERSIONS),
               help=PROFILE_MODEL_VERSION_HELP)
 @click.option('--filename',
-              type=click.File(mode='rb'),
-              required=False
-              )
+              type=click.Path(exists=True, dir_okay=False, readable=True),
+              required=False,
+              help=PROFILE_FILENAME_HELP)
 @click.option('--s3path',
               type=click.STRING,
               required=False)
-@click.option('--async', 'is_async', is_flag=True, default=False)
+@click.option('--async', 'is_async', is_flag=True, default=False, help=PROFILE_ASYNC_HELP)
+@click.option('--sample', 'sample_size',
+              type=click.IntRange(min=1),
+              help=PROFILE_SAMPLE_HELP)
+@click.option('--sample-fraction',
+              type=click.FloatRange(min=0, max=1),
+              help=PROFILE_SAMPLE_FRACTION_HELP)
+@click.option('--stratify-by',
+              metavar="COLUMN",
+              help=PROFILE_STRATIFY_BY_HELP)
+@click.option('--seed',
+              type=click.INT,
+              help=PROFILE_SEED_HELP)
 @click.pass_obj
-def push(obj, model_version, filename, s3path):
-    model, version = model_version.split(":")
-    mv = ModelVersion.find(obj, model, int(version))
+def push(obj, model_version, filename, s3path, is_async, sample_size, sample_fraction, stratify_by, seed):
+    import requests
+    from hydrosdk.exceptions import HydrosphereException
+    from hydrosdk.modelversion import _upload_s3_file
+    from hs.util.sampling import SampleOptions
+    from hs.util.columnar import is_columnar, require_pyarrow, signature_columns
+    from hs.util.training_data import TrainingDataUpload, needs_preparing, progress_path, start_background_upload, \
+        training_file, write_preparing_marker
+    from hs.util.upload import format_size
+    if sample_size is not None and sample_fraction is not None:
+        raise click.BadOptionUsage("sample", "Both --sample and --sample-fraction were provided. Need only one of them.")
+    if sample_fraction == 0:
+        raise click.BadParameter("must be greater than 0", param_hint="--sample-fraction")
+    if stratify_by is not None and sample_size is None:
+        raise click.BadOptionUsage("stratify_by", "--stratify-by needs --sample")
+    sample = None
+    if sample_size is not None or sample_fraction is not None:
+        if not filename:
+            raise click.BadOptionUsage("sample", "Only local files can be sampled, use --filename")
+        sample = SampleOptions(sample_size, sample_fraction, stratify_by, seed)
+    conn = obj.connection
+    mv = find_model_version(conn, model_version)
     if filename and s3path:
         raise click.ClickException("Both --filename and --s3path were provided. Need only one of them.")
     if filename:
-        click.echo("Uploading local file")
-        res = _upload_local_file(obj, mv.id, filename)
-        if res.ok:
-            click.echo("Data uploaded")
-        else:
-            raise click.ClickException(str(res))
+        progress_file = progress_path(model_version)
+        columns = signature_columns(mv.signature) if is_columnar(filename) else None
+        try:
+            if columns is not None:
+                require_pyarrow()
+            if is_async:
+                if not needs_preparing(filename, sample):
+                    TrainingDataUpload(conn, mv.id, model_version, filename, progress_file).prepare()
+                start_background_upload(obj.config_path, obj.cluster_name, mv.id, model_version, filename,
+                                        progress_file, sample, columns)
+                click.echo(f"Uploading {filename} in background. "
+                           f"Use `hs profile status {model_version}` to follow the progress")
+                return
+            write_preparing_marker(progress_file, None)
+            path = filename
+            if needs_preparing(filename, sample):
+                click.echo(f"{'Sampling' if sample is not None else 'Converting'} {filename}")
+                path = training_file(filename, progress_file, sample, columns)
+                click.echo(f"{format_size(os.path.getsize(path))} of CSV data is written to {path}")
+            click.echo("Uploading local file")
+            TrainingDataUpload(conn, mv.id, model_version, path, progress_file).run()
+        except (HydrosphereException, requests.RequestException, OSError, ValueError, ImportError) as ex:
+            raise click.ClickException(str(ex))
+        click.echo("Data uploaded")
     elif s3path:
         click.echo("Uploading S3 path")
-        res = _upload_s3_file(obj, mv.id, s3path)
+        res = _upload_s3_file(conn, mv.id, s3path)
         if res.ok:
             click.echo("Data uploaded")
         else:
             raise click.ClickException(str(res))
     else:
         raise click.ClickException("Neither S3 nor file was defined.")
-    click.echo(f"Data profile for {model_version} will be available: {obj.http_address}/models/{mv.name}/{mv.version}")
-
-
-# todo: not supported by SDK (GET /monitoring/profiles/batch/{model_version_id}/status)
-# @profile.command(context_settings=CONTEXT_SETTINGS)
-# @click.argument('model-version',
-#                 required=True)
-# @click.pass_obj
-# def status(obj, model_version):
-#     model, version = model_version.split(":")
-#     mv = ModelVersion.find(obj, model, int(version))
-#     res = obj.monitoring_service.get_data_processing_status(mv_id)
-#     logging.info("Looking for profiling status for model id=%s name=%s version=%s", mv_id, model, version)
-#     logging.info("Data profiling status: %s", res)
+    click.echo(f"Data profile for {model_version} will be available: {conn.http_address}/models/{mv.name}/{mv.version}")
+
+
+@profile.command(help=PROFILE_STATUS_HELP, context_settings=CONTEXT_SETTINGS)
+@click.argument('model-version',
+                required=True,
+                autocompletion=complete(MODEL_VERSIONS))
+@pass_connection
+def status(obj, model_version):
+    from hydrosdk.exceptions import HydrosphereException
+    from hydrosdk.modelversion import DataUploadResponse
+    from hs.util.training_data import DONE, progress_path, read_preparing_marker, read_progress
+    mv = find_model_version(obj, model_version)
+    marker = read_preparing_marker(progress_path(model_version))
+    if marker is not None:
+        if marker["error"]:
+            raise click.ClickException(f"Preparing {marker['path']} for upload failed: {marker['error']}")
+        click.echo(f"Preparing {marker['path']} for upload")
+        return
+    progress = read_progress(progress_path(model_version))
+    if progress is not None and (progress.cluster, progress.model_version_id) == (obj.http_address, mv.id):
+        click.echo(f"Upload of {progress.describe()}")
+        if progress.state != DONE:
+            return
+    try:
+        click.echo(f"Data profiling status: {DataUploadResponse(obj, mv.id).get_status().name}")
+    except HydrosphereException as ex:
+        raise click.ClickException(str(ex))
@@ -1,63 +1,101 @@
 import click
 
-from tabulate import tabulate
+from hs.cli.completion import APPLICATIONS, MODEL_VERSIONS, SERVABLES, complete
+from hs.cli.context import CONTEXT_SETTINGS, invalidate_listings, pass_connection
+from hs.cli.help import SERVABLE_HELP, SERVABLE_LOGS_HELP
+from hs.util.listing import SERVABLES_URL, stream_list
+from hs.util.logs import LOG_BUFFER_SIZE, LogMultiplexer, parse_since, servable_log_lines, since_filter, \
+    source_prefix
+from hs.util.output import filter_rows, list_options, write_rows
 
-from hs.cli.commands.hs import hs_cli
-from hs.cli.context import CONTEXT_SETTINGS
-from hs.entities.cluster_config import get_cluster_connection
-from hydrosdk.servable import Servable
 
+@click.group(help=SERVABLE_HELP)
+def servable():
+    pass
 
-@hs_cli.group()
-@click.pass_context
-def servable(ctx):
-    ctx.obj = get_cluster_connection()
+
+def servable_row(servable_json: dict) -> dict:
+    return {
+        'name': servable_json.get('fullName', 'unknown'),
+        'status': servable_json.get('status', 'Unknown'),
+        'message': servable_json.get('statusMessage'),
+    }
 
 
 @servable.command(context_settings=CONTEXT_SETTINGS)
+@list_options()
 @click.pass_obj
-def list(obj):
-    servables = Servable.list(obj)
-    
-    servables_view = []
-    for m in servables:
-        servables_view.append({
-            'name': m.name,
-            'status': m.status,
-            'message': m.status_message,
-        })
-    click.echo(tabulate(sorted(servables_view, key = lambda x: x['name']), headers="keys", tablefmt="github"))
+def list(obj, name, status, limit, cache_mode):
+    servables = stream_list(obj.connection, SERVABLES_URL, "Failed to list servables",
+                            obj.listing_cache, cache_mode)
+    rows = filter_rows(map(servable_row, servables), name, status, limit)
+    write_rows(rows, obj.output, sort_key=lambda x: x['name'])
 
 @servable.command(context_settings=CONTEXT_SETTINGS)
-@click.argument('model-name', required=True)
-@click.pass_obj
+@click.argument('model-name', required=True, autocompletion=complete(MODEL_VERSIONS))
+@pass_connection
 def deploy(obj, model_name):
+    from hydrosdk.servable import Servable
     (name, version) = model_name.split(':')
     version = int(version)
     servable = Servable.create(obj, name, version)
+    invalidate_listings()
     click.echo(f"Servable {servable.name} was created.")
 
 @servable.command(context_settings=CONTEXT_SETTINGS)
 @click.argument('servable-name',
-                required=True)
+                required=True,
+                autocompletion=complete(SERVABLES))
 @click.option('-y', default=False, is_flag=True)
-@click.pass_obj
+@pass_connection
 def rm(obj, servable_name, y):
+    from hydrosdk.servable import Servable
     if not y:
         click.confirm(f"Are you sure you want to delete the {servable_name} servable?", abort=True)
     Servable.delete(obj, servable_name)
+    invalidate_listings()
     click.echo(f"Servable {servable_name} was deleted")
 
 
-@servable.command(context_settings=CONTEXT_SETTINGS)
-@click.argument('servable-name', required=True)
+@servable.command(help=SERVABLE_LOGS_HELP, context_settings=CONTEXT_SETTINGS)
+@click.argument('servable-names', nargs=-1, autocompletion=complete(SERVABLES))
+@click.option('--app', 'apps', multiple=True, autocompletion=complete(APPLICATIONS),
+              help="Show logs of all servables of this application. Can be repeated.")
 @click.option('--follow', '-f', required=False, default=False, type=bool, is_flag=True)
-@click.pass_obj
-def logs(obj, servable_name, follow):
-    servable = Servable.find_by_name(obj, servable_name)
-    logs = servable.logs(follow)
-    for event in logs:
-        if event:
-            click.echo(event.data)
-    click.echo("End of logs")
+@click.option('--since', type=click.STRING, required=False,
+              help="Show lines newer than a duration like 10m or 2h, or an ISO 8601 timestamp. "
+                   "Only lines starting with a timestamp are compared.")
+@click.option('--buffer-size', type=click.IntRange(min=1), default=LOG_BUFFER_SIZE, show_default=True,
+              help="Max number of lines kept in memory for each servable.")
+@pass_connection
+def logs(obj, servable_names, apps, follow, since, buffer_size):
+    names = [*servable_names]
+    if apps:
+        from hydrosdk.application import Application
+        for app_name in apps:
+            app = Application.find(obj, app_name)
+            names.extend(variant.servableName for stage in app.execution_graph.stages
+                         for variant in stage.model_variants if variant.servableName)
+    names = [*dict.fromkeys(names)]
+    if not names:
+        raise click.UsageError("Specify servable names or an application with --app")
+    try:
+        since_time = parse_since(since) if since else None
+    except ValueError as ex:
+        raise click.BadParameter(str(ex), param_hint="--since")
 
+    def _stream(servable_name):
+        def _lines():
+            lines = servable_log_lines(obj, servable_name, follow)
+            return since_filter(lines, since_time) if since_time else lines
+        return _lines
+
+    multiplexer = LogMultiplexer({name: _stream(name) for name in names}, buffer_size=buffer_size)
+    prefix = source_prefix(names) if len(names) > 1 else lambda name: ""
+    for name, line in multiplexer:
+        click.echo(prefix(name) + line)
+    for name, ex in multiplexer.errors.items():
+        click.echo(f"Failed to read logs of {name}: {ex}", err=True)
+    if multiplexer.errors:
+        raise click.ClickException(f"Failed to read logs of {', '.join(multiplexer.errors)}")
+    click.echo("End of logs")
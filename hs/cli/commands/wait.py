@@ -0,0 +1,138 @@
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import click
+
+from hs.cli.context import CONTEXT_SETTINGS, CliContext
+from hs.cli.help import WAIT_HELP
+from hs.entities.apply_context import ApplyContext, PendingBuild, PendingBuilds
+from hs.util.listing import MODEL_VERSIONS_URL, stream_list
+from hs.util.logutils import echo
+
+EVENTS_URL = "/api/v2/events"
+RELEASED = "Released"
+FAILED = "Failed"
+NOT_FOUND = "NotFound"
+FINAL_STATUSES = {RELEASED, FAILED, NOT_FOUND}
+# seconds between status checks, in case the event stream drops or misses an update
+POLL_INTERVAL = 30
+
+BuildKey = Tuple[str, int]
+
+
+def build_key(build: PendingBuild) -> BuildKey:
+    return build.cluster, build.id
+
+
+def poll_statuses(conn, address: str, ids: Iterable[int]) -> Dict[BuildKey, str]:
+    """
+    Current statuses of model versions, fetched with a single listing request.
+    Model versions missing from the cluster get NOT_FOUND status.
+    """
+    ids = set(ids)
+    statuses = {(address, id_): NOT_FOUND for id_ in ids}
+    for mv in stream_list(conn, MODEL_VERSIONS_URL, "Failed to list model versions"):
+        if mv.get("id") in ids:
+            statuses[(address, mv["id"])] = mv.get("status")
+    return statuses
+
+
+def watch_events(conn, address: str, ids: Iterable[int], updates: queue.Queue):
+    """
+    Puts status updates of model versions from the cluster event stream to `updates`.
+    Returns when the stream can't be read anymore. Errors are ignored, statuses are polled anyway.
+    """
+    from hs.util.sse import resumable_events
+    ids = set(ids)
+    try:
+        for event in resumable_events(conn, EVENTS_URL):
+            if event.event == "ModelUpdate":
+                data = json.loads(event.data)
+                if data.get("id") in ids:
+                    updates.put({(address, data["id"]): data.get("status")})
+    except Exception:
+        logging.debug(f"Event stream of {address} failed", exc_info=True)
+
+
+@click.command(help=WAIT_HELP, context_settings=CONTEXT_SETTINGS)
+@click.option('-f', 'files',
+              type=click.Path(exists=True, dir_okay=False, readable=True),
+              multiple=True,
+              default=[ApplyContext.default_pending_path()],
+              show_default=True,
+              help="File written by `hs apply --no-wait`. Can be repeated.")
+@click.option('--timeout',
+              type=click.FloatRange(min=0),
+              default=3600,
+              show_default=True,
+              help="Seconds to wait for all builds.")
+@click.option('--poll-interval',
+              type=click.FloatRange(min=1),
+              default=POLL_INTERVAL,
+              show_default=True,
+              help="Seconds between status checks in addition to cluster events.")
+@click.pass_context
+def wait(ctx, files, timeout, poll_interval):
+    from hs.entities.cluster_config import get_connection_by_address
+    obj = ctx.find_object(CliContext) or CliContext()
+
+    def connect(address: str):
+        # builds may come from several clusters, each is requested with its own policy from the config
+        return get_connection_by_address(obj.config_path, address, obj.cluster_name)
+
+    builds: Dict[BuildKey, PendingBuild] = {}
+    for path in files:
+        for build in PendingBuilds.read(path):
+            builds[build_key(build)] = build
+    if not builds:
+        echo("No pending builds")
+        return
+    by_cluster: Dict[str, List[int]] = {}
+    for address, id_ in builds:
+        by_cluster.setdefault(address, []).append(id_)
+
+    updates = queue.Queue()
+    # events are followed before the first poll, so no update falls in between
+    for address, ids in by_cluster.items():
+        threading.Thread(target=watch_events, args=(connect(address), address, ids, updates),
+                         name=f"events-{address}", daemon=True).start()
+
+    statuses: Dict[BuildKey, str] = {}
+
+    def _update(changes: Dict[BuildKey, str]):
+        for key, status in changes.items():
+            if key in builds and statuses.get(key) != status and statuses.get(key) not in FINAL_STATUSES:
+                statuses[key] = status
+                done = sum(s in FINAL_STATUSES for s in statuses.values())
+                build = builds[key]
+                echo(f"[{done}/{len(builds)}] {build.name}:{build.version} {status}")
+
+    deadline = time.monotonic() + timeout
+    next_poll = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now >= next_poll:
+            for address, ids in by_cluster.items():
+                pending_ids = [id_ for id_ in ids if statuses.get((address, id_)) not in FINAL_STATUSES]
+                if pending_ids:
+                    _update(poll_statuses(connect(address), address, pending_ids))
+            next_poll = now + poll_interval
+        if all(statuses.get(key) in FINAL_STATUSES for key in builds) or now >= deadline:
+            break
+        try:
+            _update(updates.get(timeout=max(min(next_poll, deadline) - now, 0)))
+        except queue.Empty:
+            pass
+
+    failed = [b for key, b in builds.items() if statuses.get(key) in (FAILED, NOT_FOUND)]
+    pending = [b for key, b in builds.items() if statuses.get(key) not in FINAL_STATUSES]
+    released = len(builds) - len(failed) - len(pending)
+    echo(f"{released} released, {len(failed)} failed, {len(pending)} still building")
+    if failed or pending:
+        problems = [f"{b.name}:{b.version} {statuses.get(build_key(b))}" for b in failed]
+        problems += [f"{b.name}:{b.version} timed out" for b in pending]
+        raise click.ClickException("Some model versions were not released: " + ", ".join(problems))
@@ -0,0 +1,156 @@
+"""
+Shell completion of cluster resource names.
+
+Names are served from a small per-cluster index file, so completion never waits for the network.
+A stale index is refreshed by a detached background process, and the shell gets
+the names known so far.
+"""
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, List, Optional
+
+from hs.settings import COMPLETION_FOLDER, COMPLETION_INDEX_TTL, CONFIG_PATH
+
+MODEL_VERSIONS = "model-versions"
+SERVABLES = "servables"
+APPLICATIONS = "applications"
+DEPLOYMENT_CONFIGURATIONS = "deployment-configurations"
+
+# a refresh which holds the lock longer than this is considered dead
+REFRESH_LOCK_TIMEOUT = 60
+
+
+def index_path(config_path: str, cluster_name: Optional[str] = None) -> str:
+    key = f"{os.path.abspath(config_path)}\0{cluster_name or ''}"
+    return os.path.join(COMPLETION_FOLDER, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".json")
+
+
+def _config_version(config_path: str) -> Optional[List[int]]:
+    """
+    The index is tied to the config file version, since `hs cluster use` can point it to another cluster.
+    """
+    try:
+        stat = os.stat(config_path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_index(config_path: str, cluster_name: Optional[str] = None) -> Optional[dict]:
+    try:
+        with open(index_path(config_path, cluster_name), "r") as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if index.get("config") != _config_version(config_path):
+        return None
+    return index
+
+
+def _write_index(path: str, index: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def expire_index(config_path: str, cluster_name: Optional[str] = None):
+    """
+    Marks the index as stale, so the next completion refreshes it. Known names are still served meanwhile.
+    """
+    index = read_index(config_path, cluster_name)
+    if index is not None:
+        index["updated"] = 0
+        _write_index(index_path(config_path, cluster_name), index)
+
+
+def refresh_index(config_path: str, cluster_name: Optional[str] = None):
+    """
+    Fetches resource names from the cluster and rewrites the index.
+    """
+    from hs.entities.cluster_config import get_cluster_connection, read_current_cluster
+    from hs.util.listing import APPLICATIONS_URL, DEPLOYMENT_CONFIGURATIONS_URL, MODEL_VERSIONS_URL, \
+        SERVABLES_URL, stream_list
+    from hs.util.listing_cache import ListingCache, cluster_cache_dir
+
+    config = _config_version(config_path)
+    cluster = read_current_cluster(config_path, cluster_name)
+    conn = get_cluster_connection(config_path, cluster_name)
+    cache = ListingCache(cluster_cache_dir(cluster.name, cluster.cluster.server))
+
+    def _names(url: str, name: Callable[[dict], str]) -> List[str]:
+        return sorted({name(item) for item in stream_list(conn, url, f"Failed to list {url}", cache)})
+
+    index = {
+        "config": config,
+        "updated": time.time(),
+        MODEL_VERSIONS: _names(MODEL_VERSIONS_URL, lambda mv: f"{mv['model']['name']}:{mv['modelVersion']}"),
+        SERVABLES: _names(SERVABLES_URL, lambda s: s.get("fullName", "")),
+        APPLICATIONS: _names(APPLICATIONS_URL, lambda a: a.get("name", "")),
+        DEPLOYMENT_CONFIGURATIONS: _names(DEPLOYMENT_CONFIGURATIONS_URL, lambda d: d.get("name", "")),
+    }
+    _write_index(index_path(config_path, cluster_name), index)
+
+
+def start_refresh(config_path: str, cluster_name: Optional[str] = None):
+    """
+    Starts a detached process which refreshes the index, unless one is already running.
+    """
+    lock_path = index_path(config_path, cluster_name) + ".lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    try:
+        if time.time() - os.stat(lock_path).st_mtime > REFRESH_LOCK_TIMEOUT:
+            os.remove(lock_path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return
+    args = [sys.executable, "-m", "hs.cli.completion", config_path] + ([cluster_name] if cluster_name else [])
+    subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     close_fds=True, start_new_session=True)
+
+
+def complete(kind: str) -> Callable:
+    """
+    Makes a click `autocompletion` callback which completes names of `kind` resources.
+    """
+    def _complete(ctx, args, incomplete):
+        try:
+            root = ctx.find_root()
+            config_path = root.params.get("config_file") or CONFIG_PATH
+            cluster_name = root.params.get("cluster")
+            index = read_index(config_path, cluster_name)
+            if index is None or time.time() - index.get("updated", 0) > COMPLETION_INDEX_TTL:
+                start_refresh(config_path, cluster_name)
+            if index is None:
+                return []
+            return [name for name in index.get(kind, []) if name.startswith(incomplete)]
+        except Exception:
+            return []
+    return _complete
+
+
+def main(argv: List[str]):
+    config_path = argv[0]
+    cluster_name = argv[1] if len(argv) > 1 else None
+    try:
+        refresh_index(config_path, cluster_name)
+    except Exception:
+        logging.debug("Can't refresh completion index", exc_info=True)
+    finally:
+        try:
+            os.remove(index_path(config_path, cluster_name) + ".lock")
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
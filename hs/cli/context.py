@@ -1,2 +1,72 @@
+from functools import update_wrapper
+from typing import Optional
+
+import click
+
+from hs.settings import CONFIG_PATH
+
 CLI_ENV_PREFIX = "HYDROSERVING"
 CONTEXT_SETTINGS = {"auto_envvar_prefix": CLI_ENV_PREFIX}
+
+
+class CliContext:
+    """
+    State shared by all commands of a CLI invocation.
+
+    :param config_path: path to the cluster config file
+    :param cluster_name: cluster to use instead of the current cluster from config
+    :param output: output format of list commands
+    """
+    def __init__(self, config_path: str = CONFIG_PATH, cluster_name: Optional[str] = None,
+                 output: str = "table"):
+        self.config_path = config_path
+        self.cluster_name = cluster_name
+        self.output = output
+        self._connection = None
+        self._listing_cache = None
+
+    @property
+    def connection(self):
+        """
+        Connection to the cluster, created on first use.
+        """
+        if self._connection is None:
+            from hs.entities.cluster_config import get_cluster_connection
+            self._connection = get_cluster_connection(self.config_path, self.cluster_name)
+        return self._connection
+
+    @property
+    def listing_cache(self):
+        """
+        On-disk cache of listings of the cluster, None if the cluster is not configured.
+        """
+        if self._listing_cache is None:
+            from hs.entities.cluster_config import read_current_cluster
+            from hs.util.listing_cache import ListingCache, cluster_cache_dir
+            cluster = read_current_cluster(self.config_path, self.cluster_name)
+            if cluster is not None:
+                self._listing_cache = ListingCache(cluster_cache_dir(cluster.name, cluster.cluster.server))
+        return self._listing_cache
+
+
+def invalidate_listings():
+    """
+    Drops cached listings of the current cluster. Called by commands which change cluster resources.
+    """
+    ctx = click.get_current_context(silent=True)
+    obj = ctx.find_object(CliContext) if ctx is not None else None
+    if obj is not None and obj.listing_cache is not None:
+        from hs.cli.completion import expire_index
+        obj.listing_cache.invalidate()
+        expire_index(obj.config_path, obj.cluster_name)
+
+
+def pass_connection(f):
+    """
+    Passes the cluster connection of the current invocation as the first argument of a command.
+    """
+    @click.pass_context
+    def new_func(ctx, *args, **kwargs):
+        obj = ctx.find_object(CliContext) or CliContext()
+        return ctx.invoke(f, obj.connection, *args, **kwargs)
+    return update_wrapper(new_func, f)
@@ -22,6 +22,14 @@ APPLICATION_HELP = """
 Application API.
 """
 
+MODEL_HELP = """
+Model version API.
+"""
+
+SERVABLE_HELP = """
+Servable API.
+"""
+
 # PROFILER HELP
 PROFILE_HELP = """
 Working with data profiles
@@ -31,12 +39,73 @@ PROFILE_PUSH_HELP = """
 Upload training dataset to compute its profiles
 """
 
+PROFILE_ASYNC_HELP = """
+Upload in background and return immediately. Use `hs profile status` to follow the progress
+"""
+
+PROFILE_SAMPLE_HELP = """
+Upload a uniform random sample of N rows instead of the whole file.
+At most N rows are kept in memory
+"""
+
+PROFILE_SAMPLE_FRACTION_HELP = """
+Upload a random sample with about this fraction of rows, between 0 and 1
+"""
+
+PROFILE_STRATIFY_BY_HELP = """
+Keep proportions of values of this column in the --sample.
+The column can have up to 100 distinct values, the file is read twice
+"""
+
+PROFILE_SEED_HELP = """
+Seed of the sampling, the same seed gives the same sample
+"""
+
+PROFILE_LOCAL_HELP = """
+Compute data profiles of a CSV, Parquet or Arrow file locally, without uploading it.
+Fields and their profile types come from the model contract.
+The file is read in chunks by a pool of processes
+"""
+
+PROFILE_MODEL_FILE_HELP = """
+Model definition file with the contract, like the ones used by `hs apply`
+"""
+
+PROFILE_WORKERS_HELP = """
+Number of worker processes, all cores by default. A CSV file is split between
+workers by lines, use 1 worker for CSV files with line breaks inside quoted values
+"""
+
+PROFILE_DIFF_HELP = """
+Compare data profiles of OLD and NEW files locally and report distribution drift of
+contract fields: Kolmogorov-Smirnov distance, Population Stability Index and
+Jensen-Shannon divergence. Exits with code 1 if any field drifted
+"""
+
+PROFILE_METRIC_HELP = """
+Distance which decides whether a field drifted
+"""
+
+PROFILE_THRESHOLD_HELP = """
+A field drifted if its distance is over the threshold. Defaults to 0.1 for ks and js, 0.2 for psi
+"""
+
+PROFILE_STATUS_HELP = """
+Show upload progress of training data and data profiling status of a model version
+"""
+
 PROFILE_MODEL_VERSION_HELP = """
 Model version in "model:version" format
 """
 
 PROFILE_FILENAME_HELP = """
-Path to csv file with data
+Path to csv file with data. Parquet (.parquet, .pq) and Arrow (.arrow, .feather, .ipc) files
+are converted to csv with the columns of the model contract only, this needs `pyarrow` package
+"""
+
+MODEL_PAYLOAD_SIZE_HELP = """
+Show payload size of models and its biggest contributors.
+Takes .hsignore and `exclude` patterns into account
 """
 
 # CLUSTER HELP
@@ -64,8 +133,18 @@ CLUSTER_DEFAULT_HELP = """
 Show default cluster
 """
 
+SERVABLE_LOGS_HELP = """
+Show logs of servables. Logs of several servables are read concurrently
+and printed with a prefix of the servable name
+"""
+
 APPLY_HELP = """
-Apply resources from files or directory.
+Applies YAML definition files and creates resources on Hydrosphere serving cluster
+"""
+
+WAIT_HELP = """
+Waits for model versions applied with `hs apply --no-wait` to build.
+Fails if any of them fails to build or doesn't build in time
 """
 
 # DEV HELP
@@ -0,0 +1,59 @@
+import importlib
+from typing import Dict, NamedTuple, Optional
+
+import click
+from click.utils import make_default_short_help
+
+
+class LazyCommand(NamedTuple):
+    """
+    :param module: module which defines the command
+    :param attr: name of the command object in the module
+    :param help: short help shown in the list of commands
+    """
+    module: str
+    attr: str
+    help: str = ""
+
+
+class LazyGroup(click.Group):
+    """
+    Command group which imports subcommand modules only when a subcommand is invoked.
+    The list of commands in the group help is rendered from the registry,
+    so `--help` doesn't import any of them.
+    """
+    def __init__(self, *args, lazy_commands: Optional[Dict[str, LazyCommand]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        command = super().get_command(ctx, cmd_name)
+        if command is None and cmd_name in self.lazy_commands:
+            command = self.load_command(cmd_name)
+        return command
+
+    def load_command(self, cmd_name) -> click.Command:
+        entry = self.lazy_commands[cmd_name]
+        command = getattr(importlib.import_module(entry.module), entry.attr)
+        self.add_command(command, cmd_name)
+        return command
+
+    def format_commands(self, ctx, formatter):
+        names = self.list_commands(ctx)
+        if not names:
+            return
+        limit = formatter.width - 6 - max(len(name) for name in names)
+        rows = []
+        for name in names:
+            if name in self.commands:
+                command = self.commands[name]
+                if command.hidden:
+                    continue
+                rows.append((name, command.get_short_help_str(limit)))
+            else:
+                rows.append((name, make_default_short_help(self.lazy_commands[name].help, limit)))
+        with formatter.section("Commands"):
+            formatter.write_dl(rows)
@@ -1,13 +1,14 @@
 from hs.metadata_collectors.collected_metadata import CollectedMetadata
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from pydantic import root_validator
 
 from hydrosdk.cluster import Cluster
 from hydrosdk.exceptions import HydrosphereException
-from hydrosdk.modelversion import ModelVersion
 from hydrosdk.application import Application as HS_APP, ApplicationBuilder, ExecutionStage, ModelVariant
+from hs.entities.apply_context import ApplyContext
 from hs.entities.base_entity import BaseEntity
+from hs.entities.model_index import ModelVersionIndex, parse_model_ref
 
 class WeightedStage(BaseEntity):
     model: str
@@ -35,14 +36,39 @@ class Application(BaseEntity):
         assert not both_exist, "Invalid application: can't have both 'singular' and 'pipeline' fields"
         return values
 
-    def app_builder(self, conn: Cluster, metadata: Dict[str, str]) -> ApplicationBuilder:
+    def stages(self) -> List[Union[SingularStage, WeightedStage]]:
+        if self.singular:
+            return [self.singular]
+        return [variant for stage in self.pipeline or [] for variant in stage]
+
+    def model_refs(self) -> List[Tuple[str, int]]:
+        """
+        (name, version) pairs of model versions this application refers to.
+        """
+        return [parse_model_ref(stage.model) for stage in self.stages()]
+
+    def dependencies(self) -> List[Tuple[str, str]]:
+        """
+        (kind, name) pairs of resources this application refers to.
+        """
+        deps = []
+        for stage in self.stages():
+            deps.append(("Model", stage.model.split(":")[0]))
+            if stage.deployment_config:
+                deps.append(("DeploymentConfiguration", stage.deployment_config))
+        return deps
+
+    def app_builder(self, conn: Cluster, metadata: Dict[str, str],
+                    index: Optional[ModelVersionIndex] = None) -> ApplicationBuilder:
+        if index is None:
+            index = ModelVersionIndex(conn)
+            index.resolve(self.model_refs())
         builder = ApplicationBuilder(self.name)
         if self.metadata:
             metadata.update(self.metadata)
         builder.with_metadatas(metadata)
         if self.singular:
-            name, version = self.singular.model.split(":")
-            mv = ModelVersion.find(conn, name, version)
+            mv = index.find(*parse_model_ref(self.singular.model))
             builder.with_stage(ExecutionStage(signature = None, model_variants = [ModelVariant(
                 modelVersionId = mv.id,
                 weight = 100,
@@ -52,8 +78,7 @@ class Application(BaseEntity):
             for stage in self.pipeline:
                 variants: List[ModelVariant] = []
                 for model in stage:
-                    name, version = model.model.split(":")
-                    mv = ModelVersion.find(conn, name, version) 
+                    mv = index.find(*parse_model_ref(model.model))
                     variants.append(
                         ModelVariant(
                             modelVersionId = mv.id,
@@ -66,9 +91,10 @@ class Application(BaseEntity):
             raise ValueError("Invalid application: no 'singular' or 'pipeline' fields")
         return builder
 
-    def apply(self, conn: Cluster, cwd) -> HS_APP:
-        collected_meta = CollectedMetadata.collect(cwd).to_metadata()
-        builder = self.app_builder(conn, collected_meta)
+    def apply(self, conn: Cluster, cwd, ctx: Optional[ApplyContext] = None) -> HS_APP:
+        ctx = ctx or ApplyContext()
+        collected_meta = CollectedMetadata.collect(cwd, ctx.metadata_options).to_metadata()
+        builder = self.app_builder(conn, collected_meta, ctx.index)
         found_app = None
         try:
             found_app = HS_APP.find(conn, self.name)
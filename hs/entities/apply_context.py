@@ -0,0 +1,138 @@
+import os
+import threading
+from typing import Dict, List, Optional, Set
+
+from hs.entities.base_entity import BaseEntity
+from hs.entities.model_index import ModelVersionIndex
+from hs.metadata_collectors.collected_metadata import MetadataOptions
+from hs.settings import APPLY_LOCK_FILE, BUILD_LOGS_FOLDER, PENDING_BUILDS_FILE, TARGET_FOLDER
+from hs.util.compression import PackOptions
+
+
+class LockedModelVersion(BaseEntity):
+    version: int
+    content_hash: str
+    manifest: Optional[str]
+
+
+class LockedCluster(BaseEntity):
+    models: Dict[str, LockedModelVersion] = {}
+
+
+class ApplyLockFile(BaseEntity):
+    clusters: Dict[str, LockedCluster] = {}
+
+
+class ApplyLock:
+    """
+    Remembers which model version was created for each applied model document.
+    Entries are grouped by cluster address and keyed by model name.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._mutex = threading.Lock()
+        try:
+            self.data = ApplyLockFile.parse_file(path)
+        except FileNotFoundError:
+            self.data = ApplyLockFile()
+
+    def get(self, cluster: str, name: str) -> Optional[LockedModelVersion]:
+        with self._mutex:
+            return self.data.clusters.get(cluster, LockedCluster()).models.get(name)
+
+    def record(self, cluster: str, name: str, entry: LockedModelVersion):
+        with self._mutex:
+            self.data.clusters.setdefault(cluster, LockedCluster()).models[name] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(self.data.yaml(by_alias=True, exclude_none=True))
+            os.replace(tmp_path, self.path)
+
+
+class PendingBuild(BaseEntity):
+    cluster: str
+    id: int
+    name: str
+    version: int
+    manifest: Optional[str]
+
+
+class PendingBuildsFile(BaseEntity):
+    builds: List[PendingBuild] = []
+
+
+class PendingBuilds:
+    """
+    Model versions applied without waiting for their builds, to be awaited with `hs wait`.
+    The file is rewritten by every apply run, so it never refers to builds of previous runs.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._mutex = threading.Lock()
+        self.data = PendingBuildsFile()
+        self._write()
+
+    @staticmethod
+    def read(path: str) -> List[PendingBuild]:
+        return PendingBuildsFile.parse_file(path).builds
+
+    def add(self, build: PendingBuild):
+        with self._mutex:
+            self.data.builds = [b for b in self.data.builds if (b.cluster, b.id) != (build.cluster, build.id)]
+            self.data.builds.append(build)
+            self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.data.json(by_alias=True, exclude_none=True, indent=2))
+        os.replace(tmp_path, self.path)
+
+
+class ApplyContext:
+    """
+    Settings and state shared by all documents of a single `hs apply` run.
+
+    :param lock: lock file to reuse unchanged model versions, if any
+    :param force: rebuild model versions even if their content didn't change
+    :param upload_timeout: timeout of payload upload requests in seconds
+    :param pack_options: payload compression settings
+    :param index: model versions resolved for this run
+    :param metadata_options: settings of repository metadata collection
+    :param build_logs_folder: folder to save full build logs of model versions to, if any
+    :param wait: wait for model versions to build
+    :param wait_for: names of models to wait for even if `wait` is not set
+    :param pending: file to record model versions which weren't waited for
+    """
+    def __init__(self, lock: Optional[ApplyLock] = None, force: bool = False,
+                 upload_timeout: Optional[float] = None, pack_options: Optional[PackOptions] = None,
+                 index: Optional[ModelVersionIndex] = None, metadata_options: Optional[MetadataOptions] = None,
+                 build_logs_folder: Optional[str] = None, wait: bool = True,
+                 wait_for: Optional[Set[str]] = None, pending: Optional[PendingBuilds] = None):
+        self.lock = lock
+        self.index = index
+        self.force = force
+        self.upload_timeout = upload_timeout
+        self.pack_options = pack_options or PackOptions()
+        self.metadata_options = metadata_options or MetadataOptions()
+        self.build_logs_folder = build_logs_folder
+        self.wait = wait
+        self.wait_for = wait_for or set()
+        self.pending = pending
+
+    def should_wait(self, model_name: str) -> bool:
+        return self.wait or model_name in self.wait_for
+
+    @staticmethod
+    def default_lock_path() -> str:
+        return os.path.join(TARGET_FOLDER, APPLY_LOCK_FILE)
+
+    @staticmethod
+    def default_pending_path() -> str:
+        return os.path.join(TARGET_FOLDER, PENDING_BUILDS_FILE)
+
+    @staticmethod
+    def default_build_logs_folder() -> str:
+        return os.path.join(TARGET_FOLDER, BUILD_LOGS_FOLDER)
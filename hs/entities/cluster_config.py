@@ -2,43 +2,115 @@ import os
 from hs.entities.base_entity import BaseEntity
 from click.exceptions import ClickException
 from pydantic import AnyHttpUrl
-from typing import List
-from hydrosdk.cluster import Cluster
+import threading
+from typing import Dict, List, Optional, Tuple
 from hs.settings import CONFIG_PATH
 
 class ClusterServerDef(BaseEntity):
     server: AnyHttpUrl
 
+class RequestPolicyDef(BaseEntity):
+    """
+    Overrides of the default `hs.util.policy.RequestPolicy` for a cluster.
+    """
+    retries: Optional[int]
+    backoff: Optional[float]
+    max_backoff: Optional[float]
+    connect_timeout: Optional[float]
+    read_timeout: Optional[float]
+    rate_limit: Optional[float]
+    burst: Optional[int]
+    max_in_flight: Optional[int]
+    failure_threshold: Optional[int]
+    reset_timeout: Optional[float]
+
 class ClusterDef(BaseEntity):
     name: str
     cluster: ClusterServerDef
+    policy: Optional[RequestPolicyDef]
+
+    def dict(self, **kwargs):
+        # entries without a policy are written the same way as before policies were supported
+        d = super().dict(**kwargs)
+        if d.get("policy") is None:
+            d.pop("policy", None)
+        return d
+
+    def request_policy(self) -> "RequestPolicy":
+        from hs.util.policy import RequestPolicy
+        if self.policy is None:
+            return RequestPolicy()
+        return RequestPolicy(**self.policy.dict(exclude_none=True))
 
 class ClusterConfig(BaseEntity):
     current_cluster: str
     clusters: List[ClusterDef]
 
+# parsed configs keyed by path, along with (mtime, size) of the file they were read from
+_config_cache: Dict[str, Tuple[Tuple[int, int], ClusterConfig]] = {}
+_config_cache_lock = threading.Lock()
+
 def read_cluster_config(path: str) -> ClusterConfig:
+    """
+    Parses the config file once and reuses it until the file is modified.
+    Every call gets its own copy, so callers can modify it.
+    """
     try:
-        return ClusterConfig.parse_file(path)
+        stat = os.stat(path)
     except FileNotFoundError:
         return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _config_cache_lock:
+        cached = _config_cache.get(path)
+    if cached is None or cached[0] != version:
+        try:
+            cached = (version, ClusterConfig.parse_file(path))
+        except FileNotFoundError:
+            return None
+        with _config_cache_lock:
+            _config_cache[path] = cached
+    return cached[1].copy(deep=True)
 
-def read_current_cluster(path: str) -> ClusterDef:
+def read_current_cluster(path: str, name: Optional[str] = None) -> ClusterDef:
+    """
+    :param name: cluster to look up instead of the current cluster from config
+    """
     config = read_cluster_config(path)
     if config is not None:
         for cl in config.clusters:
-            if cl.name == config.current_cluster:
+            if cl.name == (name or config.current_cluster):
                 return cl
     return None
 
 def write_cluster_config(path: str, cluster_config: ClusterConfig):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, 'w') as f:
-        d = cluster_config.yaml()
+        d = cluster_config.yaml(exclude_none=True)
         f.write(d)
+    with _config_cache_lock:
+        _config_cache.pop(path, None)
 
-def get_cluster_connection(path: str = CONFIG_PATH) -> Cluster:
-    current_cluster = read_current_cluster(path)
+def get_cluster_connection(path: str = CONFIG_PATH, name: Optional[str] = None) -> "Cluster":
+    # hydrosdk takes a while to import, so it's loaded only by commands which talk to the cluster
+    from hs.util.session import connect
+    current_cluster = read_current_cluster(path, name)
     if current_cluster is None:
+        if name:
+            raise ClickException(f"Can't establish connection to Hydrosphere cluster: cluster {name} is not found in {path}.")
         raise ClickException("Can't establish connection to Hydrosphere cluster: cluster config is missing. Use `hs cluster` commands.")
-    return Cluster(http_address=current_cluster.cluster.server)
\ No newline at end of file
+    return connect(current_cluster.cluster.server, current_cluster.request_policy())
+
+def get_connection_by_address(path: str, address: str, name: Optional[str] = None) -> "Cluster":
+    """
+    Connection to the cluster at `address` with the request policy of its entry in the config:
+    the cluster `name` or the current cluster if it has this address, any other entry otherwise.
+    The default policy is used if no entry has this address.
+    """
+    from hs.util.policy import RequestPolicy
+    from hs.util.session import connect
+    config = read_cluster_config(path)
+    matching = [cl for cl in config.clusters if cl.cluster.server.rstrip("/") == address.rstrip("/")] \
+        if config is not None else []
+    preferred = [cl for cl in matching if cl.name == (name or config.current_cluster)]
+    cluster = next(iter(preferred + matching), None)
+    return connect(address, cluster.request_policy() if cluster is not None else RequestPolicy())
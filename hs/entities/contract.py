@@ -55,6 +55,10 @@ NAME_TO_DTYPES = {
     "complex128": DT_COMPLEX128,
 }
 
+# the first name of a type is used when several names map to it
+DTYPES_TO_NAME = {dtype: name for name, dtype in reversed(list(NAME_TO_DTYPES.items()))}
+
+
 def convert_dtype(type):
     return NAME_TO_DTYPES.get(type)
 
@@ -67,4 +71,22 @@ def _convert_field(name: str, field: Field):
         shape = convert_shape(field.shape),
         dtype = convert_dtype(field.type),
         profile = convert_profile(field.profile)
-    )
\ No newline at end of file
+    )
+
+
+def contract_from_signature(signature) -> Contract:
+    """
+    Contract of a model signature received from the cluster.
+    """
+    def _field(field) -> Field:
+        dims = list(field.shape.dims)
+        return Field(
+            shape = dims if dims else "scalar",
+            type = DTYPES_TO_NAME.get(field.dtype, DataType.Name(field.dtype)),
+            profile = DataProfileType.Name(field.profile).lower(),
+        )
+    return Contract(
+        name = signature.signature_name,
+        inputs = {f.name: _field(f) for f in signature.inputs},
+        outputs = {f.name: _field(f) for f in signature.outputs},
+    )
@@ -1,5 +1,5 @@
 from pydantic.main import BaseModel
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from hydrosdk.cluster import Cluster
 from hydrosdk.deployment_configuration import DeploymentConfigurationBuilder, ContainerSpec, \
@@ -21,6 +21,12 @@ class DeploymentConfig(BaseModel):
         alias_generator = to_camel_case
         allow_population_by_field_name = True
 
+    def model_refs(self) -> List[Tuple[str, int]]:
+        return []
+
+    def dependencies(self) -> List[Tuple[str, str]]:
+        return []
+
     def apply(self, conn: Cluster):
         builder = DeploymentConfigurationBuilder(self.name)
         builder._with_container_spec(self.container)
@@ -0,0 +1,71 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Tuple
+
+from click.exceptions import ClickException
+from hydrosdk.cluster import Cluster
+from hydrosdk.exceptions import HydrosphereException
+from hydrosdk.modelversion import ModelVersion as SDK_MV
+
+FIND_THREADS = 8
+
+
+def parse_model_ref(ref: str) -> Tuple[str, int]:
+    """
+    Parses `name:version` model reference.
+
+    :raises ClickException: if the reference is not in this format
+    """
+    try:
+        name, version = ref.split(":")
+        if not name:
+            raise ValueError(ref)
+        return name, int(version)
+    except ValueError:
+        raise ClickException(f"Invalid model reference \"{ref}\": should be in \"model:version\" format")
+
+
+class ModelVersionIndex:
+    """
+    In-memory index of model versions keyed by (name, version).
+    Resolves all references of an apply run at once, then serves lookups locally.
+    Versions that aren't known to the index are fetched one by one.
+    """
+    def __init__(self, conn: Cluster):
+        self.conn = conn
+        self._versions: Dict[Tuple[str, int], SDK_MV] = {}
+        self._mutex = threading.Lock()
+
+    def resolve(self, refs: Iterable[Tuple[str, int]]):
+        """
+        Fetches referenced model versions with concurrent lookups, so the traffic
+        depends on the number of references, not on the number of versions on the cluster.
+        Missing versions are skipped.
+        """
+        with self._mutex:
+            missing = sorted({(name, int(version)) for name, version in refs} - set(self._versions))
+        if not missing:
+            return
+
+        def _find(ref):
+            try:
+                self.add(SDK_MV.find(self.conn, *ref))
+            except HydrosphereException:
+                logging.debug(f"Can't find model version {ref[0]}:{ref[1]}", exc_info=True)
+
+        with ThreadPoolExecutor(max_workers=min(FIND_THREADS, len(missing))) as executor:
+            list(executor.map(_find, missing))
+
+    def add(self, mv: SDK_MV):
+        with self._mutex:
+            self._versions[(mv.name, int(mv.version))] = mv
+
+    def find(self, name: str, version: int) -> SDK_MV:
+        key = (name, int(version))
+        with self._mutex:
+            mv = self._versions.get(key)
+        if mv is None:
+            mv = SDK_MV.find(self.conn, name, key[1])
+            self.add(mv)
+        return mv
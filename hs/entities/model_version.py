@@ -1,16 +1,40 @@
-from hs.util.dockerutils import DockerLogHandler
+import hashlib
+import json
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from hydrosdk.image import DockerImage
 from hs.entities.base_entity import BaseEntity
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
+from hs.entities.apply_context import ApplyContext, LockedModelVersion
 from hs.entities.contract import Contract
+from hs.entities.model_index import ModelVersionIndex, parse_model_ref
 from hs.metadata_collectors.collected_metadata import CollectedMetadata
+from hs.settings import TARGET_FOLDER
+from hs.util.columnar import is_columnar, signature_columns
+from hs.util.dockerutils import DockerLogHandler
+from hs.util.ignore import IgnoreRules
+from hs.util.sse import STREAM_ERRORS, resumable_events
+from hs.util.payload import hash_payload, iter_payload_files, resolve_payload
+from hs.util.training_data import TrainingDataUpload, progress_path, training_file
+from hs.util.upload import upload_model_version
 
 from hydrosdk.cluster import Cluster
-from hydrosdk.modelversion import ModelVersionBuilder, ModelVersion as SDK_MV, MonitoringConfiguration as SDK_MC
+from hydrosdk.exceptions import HydrosphereException
+from hydrosdk.modelversion import ModelVersionBuilder, ModelVersion as SDK_MV, MonitoringConfiguration as SDK_MC, \
+    ModelVersionStatus, DataUploadResponse
 from hydrosdk.monitoring import MetricSpecConfig, MetricSpec
 
+CONTENT_HASH_KEY = "hydrosphere.cli.content-hash"
+# CLI working folder is never a part of a payload
+DEFAULT_EXCLUDE = [f"{TARGET_FOLDER}/"]
+# max number of concurrent requests made while a model version is being built
+POST_UPLOAD_WORKERS = 8
+# seconds between build status checks when build logs can't be read
+BUILD_POLL_INTERVAL = 5
+
 class MonitoringConfiguration(BaseEntity):
     batch_size: int
 
@@ -23,18 +47,156 @@ class Metric(BaseEntity):
     name: str
     config: MetricConfig
 
+def show_build_logs(mv: SDK_MV, logs_folder: Optional[str] = None):
+    """
+    Prints build logs of a model version, saving them in full to `logs_folder` if it's set.
+
+    Dropped connections are reopened until the build finishes. If the logs can't be read,
+    the build status is polled instead.
+
+    :raises SDK_MV.ReleaseFailed: if the build failed
+    """
+    status = mv.status
+
+    def _is_finished() -> bool:
+        nonlocal status
+        status = SDK_MV.find(mv.cluster, mv.name, mv.version).status
+        return status is not ModelVersionStatus.Assembling
+
+    tee = None
+    if logs_folder:
+        os.makedirs(logs_folder, exist_ok=True)
+        tee = open(os.path.join(logs_folder, f"{mv.name}-{mv.version}-build.log"), "w")
+    try:
+        with DockerLogHandler(tee=tee) as handler:
+            for ev in resumable_events(mv.cluster, f"/api/v2/model/version/{mv.id}/logs", _is_finished):
+                handler.show(ev.data)
+    except STREAM_ERRORS as ex:
+        logging.warning(f"Can't read build logs of {mv.name}:{mv.version}: {ex}. Waiting for the build to finish")
+    finally:
+        if tee is not None:
+            tee.close()
+    while not _is_finished():
+        time.sleep(BUILD_POLL_INTERVAL)
+    if status is ModelVersionStatus.Failed:
+        raise SDK_MV.ReleaseFailed(f"Model version {mv.name}:{mv.version} failed to build")
+
+def create_metric_spec(conn: Cluster, mv: SDK_MV, metric: Metric, monitoring_mv: SDK_MV) -> MetricSpec:
+    sdk_conf = MetricSpecConfig(
+        modelversion_id = monitoring_mv.id,
+        threshold = metric.config.threshold,
+        threshold_op = metric.config.operator
+    )
+    return MetricSpec.create(
+        cluster = conn,
+        name = metric.name,
+        modelversion_id = mv.id,
+        config = sdk_conf
+    )
+
+def upload_training_data(mv: SDK_MV) -> str:
+    """
+    Uploads training data of a model version and returns the url of its data profile.
+    Parquet and Arrow files are converted to CSV with the columns of the model contract first.
+    """
+    if not is_columnar(mv.training_data):
+        return mv.upload_training_data().url
+    model_version = f"{mv.name}:{mv.version}"
+    progress_file = progress_path(model_version)
+    path = training_file(mv.training_data, progress_file, columns=signature_columns(mv.signature))
+    TrainingDataUpload(mv.cluster, mv.id, model_version, path, progress_file).run()
+    return DataUploadResponse(mv.cluster, mv.id).url
+
 class ModelVersion(BaseEntity):
     name: str
     runtime: str
     install_command: Optional[str]
     training_data: Optional[str]
     payload: List[str]
+    exclude: Optional[List[str]]
     contract: Contract
     monitoring: Optional[List[Metric]]
     metadata: Optional[Dict[str, str]]
     monitoring_configuration: Optional[MonitoringConfiguration]
 
-    def apply(self, conn: Cluster, cwd):
+    def model_refs(self) -> List[Tuple[str, int]]:
+        """
+        (name, version) pairs of monitoring model versions.
+        """
+        return [parse_model_ref(mon.config.monitoring_model) for mon in self.monitoring or []]
+
+    def dependencies(self) -> List[Tuple[str, str]]:
+        """
+        (kind, name) pairs of resources this model version refers to.
+        """
+        return [("Model", mon.config.monitoring_model.split(":")[0]) for mon in self.monitoring or []]
+
+    def payload_files(self, cwd) -> List[Tuple[str, str]]:
+        """
+        Payload files without the ones excluded by `.hsignore` in the model folder
+        and `exclude` patterns.
+
+        :return: list of (path, archive_name) pairs
+        """
+        ignore = IgnoreRules.load(cwd, DEFAULT_EXCLUDE + (self.exclude or []))
+        return list(iter_payload_files(cwd, self.payload, ignore))
+
+    def content_hash(self, cwd, files: Optional[List[Tuple[str, str]]] = None) -> str:
+        """
+        Digest of everything that defines the built model version:
+        payload contents, runtime, install command, contract and the rest of the definition.
+        Metadata collected from git or DVC is not included.
+        """
+        definition = self.dict(exclude={"payload"})
+        definition["payload"] = hash_payload(files if files is not None else self.payload_files(cwd))
+        return hashlib.sha256(json.dumps(definition, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def find_unchanged(self, conn: Cluster, content_hash: str, ctx: ApplyContext) -> Optional[SDK_MV]:
+        """
+        Looks up a model version previously applied with the same content hash.
+        A build of it which is still running is waited for if the model should be waited for,
+        otherwise the building version is reused as is.
+        """
+        entry = ctx.lock.get(conn.http_address, self.name)
+        if entry is None or entry.content_hash != content_hash:
+            return None
+        try:
+            mv = ctx.index.find(self.name, entry.version)
+        except HydrosphereException:
+            logging.debug(f"Can't get a locked model version {self.name}:{entry.version} from cluster", exc_info=True)
+            return None
+        if mv.metadata.get(CONTENT_HASH_KEY) != content_hash:
+            return None
+        if mv.status is ModelVersionStatus.Assembling:
+            if not ctx.should_wait(self.name):
+                # not waiting for a build of the same content is no reason to start another one
+                return mv
+            logging.info(f"Waiting for the build of {mv.name}:{mv.version} with the same content")
+            try:
+                show_build_logs(mv, ctx.build_logs_folder)
+            except SDK_MV.ReleaseFailed:
+                return None
+            mv = SDK_MV.find(conn, mv.name, mv.version)
+        # a build which is still running may fail, so only released versions are up to date
+        return mv if mv.status is ModelVersionStatus.Released else None
+
+    def apply(self, conn: Cluster, cwd, ctx: Optional[ApplyContext] = None, manifest: Optional[str] = None) -> SDK_MV:
+        ctx = ctx or ApplyContext()
+        if ctx.index is None:
+            ctx.index = ModelVersionIndex(conn)
+            ctx.index.resolve(self.model_refs())
+        files = self.payload_files(cwd)
+        content_hash = self.content_hash(cwd, files)
+        if ctx.lock is not None and not ctx.force:
+            found_mv = self.find_unchanged(conn, content_hash, ctx)
+            if found_mv:
+                if found_mv.status is ModelVersionStatus.Assembling:
+                    logging.info(f"Model {found_mv.name}:{found_mv.version} with the same content is being built. "
+                                 f"Skipping the build.")
+                else:
+                    logging.info(f"Model {found_mv.name}:{found_mv.version} is up to date. Skipping the build.")
+                return found_mv
+
         mv_builder = ModelVersionBuilder(name = self.name,path = cwd) \
             .with_runtime(DockerImage.from_string(self.runtime)) \
             .with_payload(self.payload) \
@@ -46,9 +208,11 @@ class ModelVersion(BaseEntity):
         if self.training_data:
             mv_builder.with_training_data(self.training_data) 
 
-        collected_meta = CollectedMetadata.collect(cwd).to_metadata()
+        payload_paths = list(resolve_payload(cwd, self.payload))
+        collected_meta = CollectedMetadata.collect(cwd, ctx.metadata_options, payload_paths).to_metadata()
         if self.metadata:
             collected_meta.update(self.metadata)
+        collected_meta[CONTENT_HASH_KEY] = content_hash
         mv_builder.with_metadata(collected_meta)
 
         if self.monitoring_configuration:
@@ -57,33 +221,34 @@ class ModelVersion(BaseEntity):
 
         logging.debug(f"Model version builder:\n{mv_builder}")
 
-        mv = mv_builder.build(conn)
-        build_log_handler = DockerLogHandler()
-        logging.info("Build logs:")
-        for ev in mv.build_logs():
-            build_log_handler.show(ev.data)
-
-        if self.monitoring:
+        mv = upload_model_version(conn, mv_builder, files, timeout=ctx.upload_timeout, options=ctx.pack_options)
+        ctx.index.add(mv)
+        # metrics and training data only need the model version id, so they are uploaded during the build
+        monitoring = [(mon, ctx.index.find(*parse_model_ref(mon.config.monitoring_model)))
+                      for mon in self.monitoring or []]
+        if monitoring:
             logging.info(f"Uploading monitoring configuration for the model {mv.name}:{mv.version}")
-            for mon in self.monitoring:  
-                name, version = mon.config.monitoring_model.split(":")
-                mon_mv = SDK_MV.find(conn, name, int(version))
-                sdk_conf = MetricSpecConfig(
-                    modelversion_id = mon_mv.id,
-                    threshold = mon.config.threshold,
-                    threshold_op = mon.config.operator
-                )
-                sdk_ms = MetricSpec.create(
-                    cluster = conn,
-                    name = mon.name,
-                    modelversion_id = mv.id,
-                    config = sdk_conf
-                )
-                logging.debug(f"Created metric spec: {sdk_ms.name} with id {sdk_ms.id}")
-
         if mv.training_data:
             logging.info("Uploading training data")
-            resp = mv.upload_training_data()
-            logging.info(f"Training data profile is available at {resp.url}")
-
+        with ThreadPoolExecutor(max_workers=min(len(monitoring) + 1, POST_UPLOAD_WORKERS)) as pool:
+            metric_specs = [pool.submit(create_metric_spec, conn, mv, mon, mon_mv) for mon, mon_mv in monitoring]
+            training_data = pool.submit(upload_training_data, mv) if mv.training_data else None
+            if ctx.should_wait(self.name):
+                logging.info("Build logs:")
+                show_build_logs(mv, ctx.build_logs_folder)
+            else:
+                logging.info(f"Not waiting for the build of {mv.name}:{mv.version}")
+            for future in metric_specs:
+                sdk_ms = future.result()
+                logging.debug(f"Created metric spec: {sdk_ms.name} with id {sdk_ms.id}")
+            if training_data is not None:
+                url = training_data.result()
+                logging.info(f"Training data profile is available at {url}")
+
+        if ctx.lock is not None:
+            ctx.lock.record(conn.http_address, self.name, LockedModelVersion(
+                version = mv.version,
+                content_hash = content_hash,
+                manifest = manifest
+            ))
         return mv
\ No newline at end of file
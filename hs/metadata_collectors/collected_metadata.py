@@ -1,20 +1,107 @@
-from typing import Optional
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 from pydantic import BaseModel
 from hs.metadata_collectors.hs import HSInfo
 from hs.metadata_collectors.dvc import DvcInfo
 from hs.metadata_collectors.git import GitInfo
 
+REPOSITORY_MARKERS = [".git", ".dvc"]
+COLLECTOR_TIMEOUT = 10
+# collectors running at once, documents of the same repository share their results
+COLLECTOR_WORKERS = 4
+
+
+class MetadataOptions(NamedTuple):
+    """
+    :param dvc: collect DVC metrics
+    :param dvc_api: collect DVC metrics using `dvc` package instead of reading metrics files
+    :param timeout: time budget of each collector in seconds
+    """
+    dvc: bool = True
+    dvc_api: bool = False
+    timeout: float = COLLECTOR_TIMEOUT
+
+
+_pool = ThreadPoolExecutor(max_workers=COLLECTOR_WORKERS, thread_name_prefix="metadata-collector")
+_cache: Dict[Tuple, Future] = {}
+_cache_lock = threading.Lock()
+
+
+def _memoized(key: Tuple, func: Callable, *args) -> Future:
+    """
+    Submits a collector to the collector pool, unless it was already submitted with the same key.
+    """
+    with _cache_lock:
+        future = _cache.get(key)
+        if future is None:
+            future = _cache[key] = _pool.submit(func, *args)
+        return future
+
+
+def _result(name: str, future: Future, deadline: float):
+    try:
+        return future.result(timeout=max(deadline - time.monotonic(), 0))
+    except TimeoutError:
+        logging.warning(f"Skipping {name} metadata: collection took longer than the time budget")
+        return None
+
+
+def repository_root(path) -> str:
+    """
+    Finds the closest parent folder of `path` which is a git or DVC repository.
+    Returns `path` itself if there is none.
+    """
+    start = os.path.realpath(path or os.curdir)
+    current = start
+    while True:
+        if any(os.path.exists(os.path.join(current, marker)) for marker in REPOSITORY_MARKERS):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return start
+        current = parent
+
+
 class CollectedMetadata(BaseModel):
     hs: HSInfo
     git: Optional[GitInfo]
     dvc: Optional[DvcInfo]
 
     @staticmethod
-    def collect(path):
-        git = GitInfo.collect(path)
-        dvc = DvcInfo.collect(path)
-        hs = HSInfo.collect()
-        return CollectedMetadata(git = git, dvc = dvc, hs = hs)
+    def collect(path, options: Optional[MetadataOptions] = None,
+                paths: Optional[List[str]] = None) -> "CollectedMetadata":
+        """
+        Collects metadata of the repository containing `path`.
+        Collector results are memoized per repository root until `clear_cache` is called,
+        so documents of the same repository are scanned only once per apply run,
+        even when applied concurrently.
+
+        :param path: folder inside the repository
+        :param options: collection settings
+        :param paths: files and folders checked for uncommitted changes, `path` if not set
+        """
+        options = options or MetadataOptions()
+        root = repository_root(path)
+        paths = tuple(sorted(os.path.realpath(p) for p in paths or [path]))
+        deadline = time.monotonic() + options.timeout
+        hs = _pool.submit(HSInfo.collect)
+        git = _memoized(("git", root, paths), GitInfo.collect, root, list(paths))
+        dvc = _memoized(("dvc", root, options.dvc_api), DvcInfo.collect, root, options.dvc_api) \
+            if options.dvc else None
+        return CollectedMetadata(
+            git = _result("git", git, deadline),
+            dvc = _result("dvc", dvc, deadline) if dvc else None,
+            hs = hs.result()
+        )
+
+    @staticmethod
+    def clear_cache():
+        with _cache_lock:
+            _cache.clear()
 
     def to_metadata(self):
         d = self.hs.to_metadata()
@@ -22,4 +109,4 @@ class CollectedMetadata(BaseModel):
             d.update(self.git.to_metadata())
         if self.dvc:
             d.update(self.dvc.to_metadata())
-        return d
\ No newline at end of file
+        return d
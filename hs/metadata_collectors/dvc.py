@@ -1,25 +1,154 @@
+import csv
+import hashlib
+import json
 import logging
-from typing import Any, Optional
+import os
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
+import yaml
+
+DVC_FILE = "dvc.yaml"
+DVC_LOCK_FILE = "dvc.lock"
+# bytes DVC looks at to tell text files, whose line endings it normalizes before hashing
+TEXT_CHECK_SIZE = 512
+TEXT_CHARS = bytes(range(32, 127)) + b"\n\r\t\f\b"
+
+
+def flatten_metrics(metrics: Any, prefix: str = "") -> Dict[str, str]:
+    """
+    Flattens nested metrics into `{"a.b": "value"}` form. Lists are skipped.
+    """
+    result = {}
+    if isinstance(metrics, dict):
+        for k, v in metrics.items():
+            key = f"{prefix}.{k}" if prefix else str(k)
+            result.update(flatten_metrics(v, key))
+    elif isinstance(metrics, (str, int, float, bool)) and prefix:
+        result[prefix] = str(metrics)
+    return result
+
+
+def _read_yaml(path: str, name: str) -> dict:
+    with open(os.path.join(path, name), "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def declared_metrics(path: str) -> List[str]:
+    """
+    Reads paths of metrics files declared in `dvc.yaml`,
+    both in stages and in the top-level `metrics` section.
+    """
+    dvc_yaml = _read_yaml(path, DVC_FILE)
+    entries = list(dvc_yaml.get("metrics") or [])
+    for stage_name, stage in (dvc_yaml.get("stages") or {}).items():
+        stage_dir = (stage or {}).get("wdir", ".")
+        for entry in (stage or {}).get("metrics") or []:
+            if isinstance(entry, dict):
+                entry = next(iter(entry))
+            entries.append(os.path.normpath(os.path.join(stage_dir, entry)))
+    return list(dict.fromkeys(str(entry) for entry in entries))
+
+
+def locked_outs(path: str) -> Dict[str, str]:
+    """
+    md5 of stage outputs recorded in `dvc.lock`, by paths relative to the repository root.
+    Metrics are recorded there as plain outputs. Empty if there is no lock file.
+    """
+    try:
+        dvc_lock = _read_yaml(path, DVC_LOCK_FILE)
+    except FileNotFoundError:
+        return {}
+    stages = _read_yaml(path, DVC_FILE).get("stages") or {}
+    # dvc.lock of DVC 1.x has no schema field and lists stages at the top level
+    locked_stages = dvc_lock.get("stages", {}) if "schema" in dvc_lock else dvc_lock
+    outs = {}
+    for stage_name, stage in (locked_stages or {}).items():
+        # stages generated by `foreach` are locked as `name@key`
+        stage_dir = (stages.get(stage_name.split("@")[0]) or {}).get("wdir", ".")
+        for out in (stage or {}).get("outs") or []:
+            if out.get("md5") is not None:
+                outs[os.path.normpath(os.path.join(stage_dir, out["path"]))] = str(out["md5"])
+    return outs
+
+
+def file_md5(path: str) -> str:
+    """
+    md5 of a file computed the way DVC does: text files are hashed with Unix line endings.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    head = data[:TEXT_CHECK_SIZE]
+    is_text = b"\x00" not in head and (not head or len(head.translate(None, TEXT_CHARS)) / len(head) <= 0.3)
+    return hashlib.md5(data.replace(b"\r\n", b"\n") if is_text else data).hexdigest()
+
+
+def read_metrics_file(path: str) -> Any:
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r") as f:
+        if ext == ".json":
+            return json.load(f)
+        if ext in (".yaml", ".yml"):
+            return yaml.safe_load(f)
+        if ext in (".csv", ".tsv"):
+            rows = list(csv.DictReader(f, delimiter="\t" if ext == ".tsv" else ","))
+            return rows[-1] if rows else {}
+    raise ValueError(f"Unsupported metrics file format: {path}")
+
 
 class DvcInfo(BaseModel):
-    metrics: Any
+    metrics: Dict[str, Any]
 
     def to_metadata(self):
         d = {}
         for k, v in self.metrics.items():
-            metric_name = "dvc.metrics/"+k
-            d[metric_name] = v
+            for metric, value in flatten_metrics(v).items():
+                d[f"dvc.metrics/{k}/{metric}"] = value
         return d
 
     @staticmethod
-    def collect(path) -> Optional["DvcInfo"]:
+    def collect(path, use_api: bool = False) -> Optional["DvcInfo"]:
+        """
+        Reads metrics declared in `dvc.yaml` directly from the metrics files,
+        without importing DVC or touching its cache and remotes.
+        Metrics files which don't match their md5 in `dvc.lock` come from another run
+        than the locked pipeline, so they are skipped.
+
+        :param path: DVC repository root
+        :param use_api: use `dvc` package to collect metrics instead
+        """
+        if use_api:
+            return DvcInfo.collect_with_api(path)
+        try:
+            metrics = {}
+            outs = locked_outs(path)
+            for metrics_file in declared_metrics(path):
+                metrics_path = os.path.join(path, metrics_file)
+                try:
+                    if metrics_file in outs and file_md5(metrics_path) != outs[metrics_file]:
+                        logging.warning(f"DVC metrics file {metrics_file} changed since it was recorded in "
+                                        f"{DVC_LOCK_FILE}, skipping it. Run `dvc commit` or `dvc repro` to lock it")
+                        continue
+                    metrics[metrics_file] = read_metrics_file(metrics_path)
+                except FileNotFoundError:
+                    logging.debug(f"DVC metrics file {metrics_file} is missing")
+            return DvcInfo(metrics = metrics)
+        except FileNotFoundError:
+            logging.debug(f"No {DVC_FILE} in {path}")
+            return None
+        except Exception:
+            logging.debug("Can't extract DVC metadata", exc_info=True)
+            return None
+
+    @staticmethod
+    def collect_with_api(path) -> Optional["DvcInfo"]:
         try:
             from dvc.repo import Repo
             repo = Repo(path)
             all_metrics = repo.metrics.show()
             cur_metrics = all_metrics['']  # get metrics for current branch
-            return DvcInfo(cur_metrics)
-        except Exception as ex:
+            if 'data' in cur_metrics:  # dvc>=2.6 wraps results into 'data' fields
+                cur_metrics = {k: v.get('data', {}) for k, v in cur_metrics['data'].items()}
+            return DvcInfo(metrics = cur_metrics)
+        except Exception:
             logging.debug("Can't extract DVC metadata", exc_info=True)
             return None
@@ -1,44 +1,158 @@
 import logging
-from sys import exc_info
+import os
+import subprocess
 import time
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 
+# environment variables with the branch name of a CI build, in the order of preference
+CI_REF_VARIABLES = [
+    "GITHUB_HEAD_REF",
+    "GITHUB_REF_NAME",
+    "CI_COMMIT_REF_NAME",
+    "BRANCH_NAME",
+    "GIT_BRANCH",
+    "CIRCLE_BRANCH",
+    "TRAVIS_BRANCH",
+    "BUILDKITE_BRANCH",
+    "BITBUCKET_BRANCH",
+]
+DETACHED_HEAD = "HEAD"
+GIT_TIMEOUT = 10
+
+
+def run_git(cwd: str, args: List[str], input: Optional[bytes] = None) -> bytes:
+    return subprocess.run(
+        ["git", "--no-optional-locks"] + args, cwd=cwd, input=input, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=GIT_TIMEOUT
+    ).stdout
+
+
+def read_head(path: str) -> Tuple[str, Optional[str]]:
+    """
+    :return: (worktree, ref) of the repository containing `path`. ref is None if HEAD is detached.
+    """
+    path = path or os.curdir
+    cwd = path if os.path.isdir(path) else os.path.dirname(path)
+    worktree, ref = run_git(cwd, ["rev-parse", "--show-toplevel", "--symbolic-full-name", DETACHED_HEAD]) \
+        .decode("utf-8").splitlines()
+    return worktree, None if ref == DETACHED_HEAD else ref
+
+
+def read_commit(path: str, rev: str) -> Tuple[str, bytes]:
+    """
+    Reads a raw commit object with `git cat-file --batch`.
+
+    :return: (sha, body) of the commit
+    """
+    output = run_git(path, ["cat-file", "--batch"], input=f"{rev}^{{commit}}\n".encode("utf-8"))
+    header, _, rest = output.partition(b"\n")
+    fields = header.decode("utf-8").split()
+    if len(fields) != 3 or fields[1] != "commit":
+        raise ValueError(f"Can't read git commit {rev}: {header.decode('utf-8')}")
+    return fields[0], rest[:int(fields[2])]
+
+
+def parse_person(line: str) -> Tuple[str, str, int]:
+    """
+    Parses `Name <email> timestamp timezone` line of a commit header.
+
+    :return: (name, email, timestamp)
+    """
+    name, _, rest = line.partition(" <")
+    email, _, rest = rest.partition("> ")
+    return name, email, int(rest.split()[0])
+
+
+def parse_commit(body: bytes) -> Dict[str, str]:
+    headers = {}
+    for line in body.decode("utf-8", errors="replace").split("\n"):
+        if not line:
+            break
+        key, _, value = line.partition(" ")
+        headers.setdefault(key, value)
+    return headers
+
+
+def ci_ref() -> Optional[str]:
+    for variable in CI_REF_VARIABLES:
+        value = os.environ.get(variable)
+        if value:
+            return value
+    return None
+
+
+def is_dirty(worktree: str, paths: List[str]) -> Optional[bool]:
+    """
+    Checks tracked files under `paths` for uncommitted changes.
+    Only the given paths are compared, so the rest of the working tree isn't scanned.
+
+    :return: None if none of the paths is inside the repository
+    """
+    pathspecs = []
+    for path in paths:
+        rel = os.path.relpath(os.path.realpath(path), worktree)
+        if not rel.startswith(os.pardir):
+            pathspecs.append(rel)
+    if not pathspecs:
+        return None
+    status = run_git(worktree, ["status", "--porcelain", "--untracked-files=no", "--"] + pathspecs)
+    return bool(status.strip())
+
+
 class GitInfo(BaseModel):
     branch_name: str
     commit_sha: str
-    is_dirty: bool
-    author_name: str 
+    is_dirty: Optional[bool]
+    author_name: str
     author_email: str
     date: str
 
     def to_metadata(self):
-        return {'git.branch': self.branch_name,
+        d = {'git.branch': self.branch_name,
          'git.branch.head.sha': self.commit_sha,
          'git.branch.head.author.name': self.author_name,
          'git.branch.head.author.email': self.author_email,
-         'git.branch.head.date': self.date,
-         'git.is-dirty': str(self.is_dirty)}
+         'git.branch.head.date': self.date}
+        if self.is_dirty is not None:
+            d['git.is-dirty'] = str(self.is_dirty)
+        return d
 
     @staticmethod
-    def collect(path) -> Optional["GitInfo"]:
+    def collect(path, paths: Optional[List[str]] = None) -> Optional["GitInfo"]:
+        """
+        Reads HEAD and the head commit with git plumbing commands.
+        On detached HEAD the branch name is taken from CI environment variables.
+
+        :param path: folder inside the repository
+        :param paths: files and folders to check for uncommitted changes, `path` if not set
+        """
         try:
-            import git
-            repo = git.Repo(path, search_parent_directories=True)
-            cur_branch = repo.active_branch
-            cur_commit = cur_branch.commit
-            author = cur_commit.author
-            date = time.asctime(time.gmtime(cur_commit.committed_date))
-            cur_is_dirty = repo.is_dirty()
-            meta = GitInfo(
-                branch_name = cur_branch.name,
-                commit_sha = cur_commit.hexsha,
-                is_dirty = cur_is_dirty, 
-                author_name = author.name, 
-                author_email = author.email, 
-                date = date)
-            return meta
+            try:
+                worktree, ref = read_head(path)
+            except subprocess.CalledProcessError:
+                logging.debug(f"{path} is not inside a git repository")
+                return None
+            if ref and ref.startswith("refs/heads/"):
+                branch = ref[len("refs/heads/"):]
+            else:
+                branch = ci_ref() or DETACHED_HEAD
+            sha, body = read_commit(worktree, DETACHED_HEAD)
+            headers = parse_commit(body)
+            author_name, author_email, _ = parse_person(headers["author"])
+            _, _, committed_date = parse_person(headers["committer"])
+            try:
+                dirty = is_dirty(worktree, paths or [path])
+            except (OSError, subprocess.SubprocessError):
+                logging.debug("Can't check git working tree for changes", exc_info=True)
+                dirty = None
+            return GitInfo(
+                branch_name = branch,
+                commit_sha = sha,
+                is_dirty = dirty,
+                author_name = author_name,
+                author_email = author_email,
+                date = time.asctime(time.gmtime(committed_date)))
         except Exception:
             logging.debug("Error while extracting .git metadata", exc_info=True)
             return None
-
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic import BaseModel
 import importlib_metadata
 
@@ -14,7 +15,11 @@ class HSInfo(BaseModel):
         }
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def collect() -> "HSInfo":
+        """
+        Package versions don't change while the process runs, so they are read once.
+        """
         return HSInfo(
             sdk_version = importlib_metadata.version("hydrosdk"),
             cli_version = importlib_metadata.version("hs"),
@@ -4,8 +4,18 @@ HOME_PATH = "~/.hs"
 HOME_PATH_EXPANDED = os.path.expanduser(HOME_PATH)
 CONFIG_FILE = "config.yaml"
 CONFIG_PATH = os.path.join(HOME_PATH_EXPANDED, CONFIG_FILE)
+CACHE_FOLDER = os.path.join(HOME_PATH_EXPANDED, "cache")
+# seconds during which cached cluster listings are used without asking the cluster
+LISTING_CACHE_TTL = 10
+COMPLETION_FOLDER = os.path.join(HOME_PATH_EXPANDED, "completion")
+# seconds after which the shell completion index is refreshed in background
+COMPLETION_INDEX_TTL = 300
 
 TARGET_FOLDER = ".hs"
+APPLY_LOCK_FILE = "apply-lock.yaml"
+BUILD_LOGS_FOLDER = "logs"
+PENDING_BUILDS_FILE = "pending-builds.json"
+UPLOADS_FOLDER = "uploads"
 
 SEGMENT_DIVIDER = "================================"
 
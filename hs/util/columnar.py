@@ -0,0 +1,107 @@
+"""
+Parquet and Arrow training data.
+
+Data profiling takes CSV, so columnar files are converted before the upload. Only the columns
+of the model contract are read, batch by batch, so neither the whole table nor unused columns
+are ever loaded into memory. Requires `pyarrow`.
+"""
+import importlib.util
+import logging
+import os
+from typing import Iterator, List, Optional, Tuple
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+# rows converted at once, Parquet files are read by row groups anyway
+BATCH_SIZE = 64 * 1024
+
+
+def is_columnar(path) -> bool:
+    return isinstance(path, str) and path.lower().endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS)
+
+
+def require_pyarrow():
+    if importlib.util.find_spec("pyarrow") is None:
+        raise ImportError("Parquet and Arrow files require `pyarrow` package. Install it with `pip install hs[parquet]`")
+
+
+def signature_columns(signature) -> List[str]:
+    """
+    Names of input and output fields of a model signature, in contract order.
+    """
+    names = [field.name for field in signature.inputs] + [field.name for field in signature.outputs]
+    return list(dict.fromkeys(names))
+
+
+def _project(schema, columns: Optional[List[str]], path: str) -> List[str]:
+    """
+    Columns to read: contract columns found in the file which can be written to CSV.
+    """
+    import pyarrow.types as pat
+    names = schema.names
+    if columns is not None:
+        missing = [c for c in columns if c not in names]
+        if missing:
+            logging.warning(f"Contract fields missing from {path}: {', '.join(missing)}")
+        names = [c for c in columns if c in names]
+    nested = [n for n in names if pat.is_nested(schema.field(n).type)]
+    if nested:
+        logging.warning(f"Columns {', '.join(nested)} of {path} are not scalar and can't be profiled, skipping them")
+    names = [n for n in names if n not in nested]
+    if not names:
+        raise ValueError(f"{path} has no columns of the model contract")
+    return names
+
+
+def record_batches(path: str, columns: Optional[List[str]] = None,
+                   batch_size: int = BATCH_SIZE) -> Tuple["pyarrow.Schema", Iterator["pyarrow.RecordBatch"]]:
+    """
+    Opens a Parquet or Arrow IPC file and returns the schema of projected columns
+    and an iterator over their record batches.
+
+    :param columns: columns to read, all columns if None
+    """
+    require_pyarrow()
+    import pyarrow as pa
+    if path.lower().endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        names = _project(parquet.schema_arrow, columns, path)
+        schema = pa.schema([parquet.schema_arrow.field(n) for n in names])
+        return schema, parquet.iter_batches(batch_size=batch_size, columns=names)
+
+    source = pa.memory_map(path)
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        # not the file format, maybe the streaming format
+        source.seek(0)
+        reader = pa.ipc.open_stream(source)
+        batches = iter(reader)
+    names = _project(reader.schema, columns, path)
+    indices = [reader.schema.get_field_index(n) for n in names]
+    schema = pa.schema([reader.schema.field(i) for i in indices])
+
+    def _projected():
+        for batch in batches:
+            yield pa.RecordBatch.from_arrays([batch.column(i) for i in indices], schema=schema)
+    return schema, _projected()
+
+
+def columnar_to_csv(path: str, out_path: str, columns: Optional[List[str]] = None,
+                    batch_size: int = BATCH_SIZE) -> int:
+    """
+    Writes projected columns of a Parquet or Arrow file to a CSV file with a header.
+
+    :return: number of written rows
+    """
+    schema, batches = record_batches(path, columns, batch_size)
+    import pyarrow.csv as pacsv
+    rows = 0
+    with pacsv.CSVWriter(out_path, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    logging.debug(f"Converted {rows} rows of {os.path.basename(path)} with columns {', '.join(schema.names)}")
+    return rows
@@ -0,0 +1,156 @@
+import importlib.util
+import os
+import struct
+import tarfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+
+GZIP = "gzip"
+ZSTD = "zstd"
+CODECS = [GZIP, ZSTD]
+DEFAULT_LEVELS = {GZIP: 6, ZSTD: 3}
+BLOCK_SIZE = 1024 * 1024
+
+
+class PackOptions:
+    """
+    Settings of payload archive compression.
+
+    :param codec: `gzip` or `zstd`
+    :param level: compression level, codec default if not set
+    :param threads: number of compression threads, all cores if not set
+    :param reproducible: drop timestamps and ownership from archive entries,
+                         so the same files always produce the same archive
+    """
+    def __init__(self, codec: str = GZIP, level: Optional[int] = None, threads: Optional[int] = None,
+                 reproducible: bool = False):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown compression codec {codec}. Supported codecs: {', '.join(CODECS)}")
+        if codec == ZSTD and importlib.util.find_spec("zstandard") is None:
+            raise ImportError("zstd compression requires `zstandard` package. Install it with `pip install hs[zstd]`")
+        if codec == GZIP and level is not None and not 0 <= level <= 9:
+            raise ValueError(f"gzip compression level should be between 0 and 9, got {level}")
+        self.codec = codec
+        self.level = DEFAULT_LEVELS[codec] if level is None else level
+        self.threads = threads or os.cpu_count() or 1
+        self.reproducible = reproducible
+
+
+def _gzip_member(data: bytes, level: int) -> bytes:
+    """
+    Compresses data as a standalone gzip member with zero mtime.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    header = b"\x1f\x8b\x08\x00" + struct.pack("<I", 0) + b"\x00\xff"
+    body = compressor.compress(data) + compressor.flush()
+    trailer = struct.pack("<II", zlib.crc32(data) & 0xffffffff, len(data) & 0xffffffff)
+    return header + body + trailer
+
+
+class ParallelGzipWriter:
+    """
+    Write-only file object which splits the stream into blocks and compresses them
+    concurrently as independent gzip members, the same way pigz does.
+    Concatenated members form a valid gzip stream readable by any gzip decoder.
+    zlib releases the GIL while compressing, so threads use all cores.
+    """
+    def __init__(self, fileobj: BinaryIO, level: int = DEFAULT_LEVELS[GZIP], threads: int = 1,
+                 block_size: int = BLOCK_SIZE):
+        self.fileobj = fileobj
+        self.level = level
+        self.block_size = block_size
+        self.max_pending = threads * 2
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.pending = deque()
+        self.buffer = bytearray()
+        self.empty = True
+
+    def write(self, data: bytes) -> int:
+        self.buffer.extend(data)
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        try:
+            if self.buffer or self.empty:
+                self._submit(bytes(self.buffer))
+                self.buffer = bytearray()
+            while self.pending:
+                self.fileobj.write(self.pending.popleft().result())
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def abort(self):
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=True)
+
+    def _submit(self, block: bytes):
+        self.empty = False
+        self.pending.append(self.executor.submit(_gzip_member, block, self.level))
+        while len(self.pending) > self.max_pending:
+            self.fileobj.write(self.pending.popleft().result())
+
+
+class _UnclosableWriter:
+    """
+    Prevents zstandard stream writer from closing the wrapped file object.
+    """
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+
+    def write(self, data: bytes) -> int:
+        self.fileobj.write(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def compressed_writer(fileobj: BinaryIO, options: PackOptions):
+    if options.codec == ZSTD:
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=options.level, threads=options.threads)
+        return compressor.stream_writer(_UnclosableWriter(fileobj))
+    return ParallelGzipWriter(fileobj, level=options.level, threads=options.threads)
+
+
+def _reproducible_entry(info: tarfile.TarInfo) -> tarfile.TarInfo:
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    info.mode = 0o755 if info.mode & 0o111 else 0o644
+    return info
+
+
+def write_tarball(fileobj: BinaryIO, files, options: Optional[PackOptions] = None):
+    """
+    Writes compressed tar archive of `files` into `fileobj`.
+
+    :param fileobj: destination
+    :param files: list of (path, archive_name) pairs in the archive order
+    :param options: compression settings
+    """
+    options = options or PackOptions()
+    entry_filter = _reproducible_entry if options.reproducible else None
+    writer = compressed_writer(fileobj, options)
+    try:
+        with tarfile.open(fileobj=writer, mode="w|") as tar:
+            for path, arcname in files:
+                tar.add(path, arcname=arcname, recursive=False, filter=entry_filter)
+    except BaseException:
+        if isinstance(writer, ParallelGzipWriter):
+            writer.abort()
+        raise
+    writer.close()
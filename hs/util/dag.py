@@ -0,0 +1,95 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class CycleError(ValueError):
+    def __init__(self, nodes: List[int]):
+        super().__init__(f"Dependency cycle between nodes {nodes}")
+        self.nodes = nodes
+
+
+def _dependants(dependencies: Dict[int, Set[int]]) -> Dict[int, Set[int]]:
+    dependants: Dict[int, Set[int]] = {node: set() for node in dependencies}
+    for node, deps in dependencies.items():
+        for dep in deps:
+            dependants[dep].add(node)
+    return dependants
+
+
+def topological_order(dependencies: Dict[int, Set[int]]) -> List[int]:
+    """
+    Orders nodes so that every node comes after its dependencies.
+    Ties are broken by node index, so independent nodes keep their original order.
+
+    :param dependencies: node index -> set of node indexes it depends on
+    :raises CycleError: if dependencies contain a cycle
+    :return: list of node indexes
+    """
+    remaining = {node: set(deps) for node, deps in dependencies.items()}
+    dependants = _dependants(dependencies)
+    ready = [node for node, deps in remaining.items() if not deps]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        node = heapq.heappop(ready)
+        order.append(node)
+        for dependant in dependants[node]:
+            remaining[dependant].discard(node)
+            if not remaining[dependant]:
+                heapq.heappush(ready, dependant)
+    if len(order) != len(dependencies):
+        raise CycleError(sorted(set(dependencies) - set(order)))
+    return order
+
+
+def run_graph(nodes: List[T], dependencies: Dict[int, Set[int]], action: Callable[[T], None],
+              parallelism: int = 1):
+    """
+    Executes `action` for every node once all of its dependencies are done.
+
+    With `parallelism` 1 nodes are executed one by one in the current thread.
+    Otherwise independent nodes are executed concurrently on a bounded thread pool.
+    After the first failure no new nodes are started, already running nodes are awaited
+    and the failure is re-raised.
+
+    :param nodes: list of nodes
+    :param dependencies: node index -> set of node indexes it depends on
+    :param action: callback to execute for a node
+    :param parallelism: max number of concurrently executed nodes
+    """
+    order = topological_order(dependencies)
+    if parallelism <= 1:
+        for idx in order:
+            action(nodes[idx])
+        return
+
+    remaining = {node: set(deps) for node, deps in dependencies.items()}
+    dependants = _dependants(dependencies)
+    ready = sorted(node for node in order if not remaining[node])
+    error = None
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        running = {}
+        while ready or running:
+            while ready and error is None and len(running) < parallelism:
+                idx = ready.pop(0)
+                running[executor.submit(action, nodes[idx])] = idx
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for dependant in sorted(dependants[idx]):
+                    remaining[dependant].discard(idx)
+                    if not remaining[dependant]:
+                        ready.append(dependant)
+            ready.sort()
+            if error is not None:
+                ready = []
+    if error is not None:
+        raise error
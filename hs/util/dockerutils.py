@@ -1,17 +1,116 @@
-from typing import Dict, Optional
-import click
+import re
+import sys
+import threading
+import time
+from typing import List, Optional, TextIO
+
+from hs.util.logutils import echo, is_grouped
+
+# seconds between writes to the terminal
+FLUSH_INTERVAL = 0.2
+
+# progress bars, percentages and sizes like 12.5MB/40MB, as printed by docker and pip
+_PROGRESS = re.compile(r"\[[=#>\-. ]*\]|\d+(\.\d+)?\s*%|\d+(\.\d+)?\s*[kMG]?i?B?\s*/\s*\d+(\.\d+)?\s*[kMG]?i?B")
+_NUMBERS = re.compile(r"\d+(\.\d+)?")
+
+
+def progress_key(line: str) -> Optional[str]:
+    """
+    Key shared by consecutive updates of the same progress line, None if the line shows no progress.
+    """
+    if not _PROGRESS.search(line):
+        return None
+    return _NUMBERS.sub("#", _PROGRESS.sub("", line)).strip()
+
 
 class DockerLogHandler:
-    prev_msg: Optional[str] = None
-    first_line: bool = True
+    """
+    Renders build logs, batching terminal writes.
+
+    On a terminal repeated lines and updates of a progress line are collapsed into a single
+    line which is rewritten in place, with a counter of repeats. Otherwise every line is
+    printed once: repeats are dropped and only the last update of a progress line is kept.
+
+    :param tty: rewrite lines in place. Defaults to whether stdout is a terminal
+    :param flush_interval: seconds between writes
+    :param tee: file which gets all messages as they were received
+    """
+    def __init__(self, tty: Optional[bool] = None, flush_interval: float = FLUSH_INTERVAL,
+                 tee: Optional[TextIO] = None):
+        grouped = is_grouped()
+        self.tty = sys.stdout.isatty() and not grouped if tty is None else tty
+        self.flush_interval = flush_interval
+        self.tee = tee
+        self._line: Optional[str] = None
+        self._key: Optional[str] = None
+        self._count = 0
+        self._width = 0
+        self._pending: List[str] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        # grouped output is printed by the thread which owns it, it can't be flushed by a timer
+        self._timer_enabled = not grouped
+        self._timer: Optional[threading.Timer] = None
 
     def show(self, msg: str):
-        if self.prev_msg != msg:
-            if self.first_line:
-                self.first_line = False
+        if self.tee is not None:
+            self.tee.write(msg + "\n")
+        with self._lock:
+            for line in (msg.splitlines() or [""]):
+                self._show_line(line)
+
+    def _show_line(self, line: str):
+        key = progress_key(line)
+        if self._line is not None and (line == self._line or (key is not None and key == self._key)):
+            if line == self._line:
+                self._count += 1
             else:
-                click.echo()
-            click.echo(msg, nl=False)
-        else:
-            click.echo(".", nl=False)
-        self.prev_msg = msg
\ No newline at end of file
+                self._line, self._count = line, 1
+            if self.tty:
+                text = line + (f" (x{self._count})" if self._count > 1 else "")
+                # pad with spaces to erase the end of a longer previous line
+                self._write("\r" + text.ljust(self._width))
+                self._width = len(text)
+            return
+        self._end_line()
+        self._line, self._key, self._count = line, key, 1
+        self._width = len(line)
+        if self.tty:
+            self._write(line)
+
+    def _end_line(self):
+        if self._line is not None:
+            self._write("\n" if self.tty else self._line + "\n")
+            self._line = None
+
+    def _write(self, text: str):
+        self._pending.append(text)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        elif self._timer_enabled and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending:
+                echo("".join(self._pending), nl=False)
+                self._pending = []
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._end_line()
+            self.flush()
+        if self.tee is not None:
+            self.tee.flush()
+
+    def __enter__(self) -> 'DockerLogHandler':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,118 @@
+"""
+Distribution drift between two profiles of the same fields.
+
+Distances are computed from mergeable sketches of local profiles, so comparing datasets
+takes as little memory as profiling them. Numerical fields are compared by the
+Kolmogorov-Smirnov distance of their CDFs, and by the Population Stability Index and
+Jensen-Shannon divergence of histograms over shared bins: quantiles of the old data,
+widened to the range of both datasets. Categorical fields are compared by PSI and JS
+of category frequencies.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from hs.util.profiling import CATEGORICAL, NUMERICAL, FieldProfile
+
+KS = "ks"
+PSI = "psi"
+JS = "js"
+METRICS = [KS, PSI, JS]
+# common rules of thumb: PSI over 0.2 is a significant shift
+DEFAULT_THRESHOLDS = {KS: 0.1, PSI: 0.2, JS: 0.1}
+DRIFT_BINS = 10
+# proportion of an empty bin, so PSI of a bin found in one dataset only stays finite
+EPSILON = 1e-4
+
+
+def ks_distance(old: FieldProfile, new: FieldProfile) -> float:
+    """
+    Largest difference between the CDFs of two numerical profiles.
+    """
+    points = np.union1d(old.sketch.weighted_items()[0], new.sketch.weighted_items()[0])
+    return float(np.abs(old.sketch.cdf(points) - new.sketch.cdf(points)).max())
+
+
+def shared_edges(old: FieldProfile, new: FieldProfile, bins: int = DRIFT_BINS) -> np.ndarray:
+    """
+    Bin edges at quantiles of the old profile, the outer ones covering values of both profiles.
+    """
+    low = min(old.moments.min, new.moments.min)
+    high = max(old.moments.max, new.moments.max)
+    inner = old.sketch.quantiles(np.linspace(0, 1, bins + 1)[1:-1].tolist())
+    edges = np.unique([low] + [q for q in inner if low < q < high] + [high])
+    return edges if len(edges) > 1 else np.array([low, low + 1])
+
+
+def proportions(counts: np.ndarray) -> np.ndarray:
+    counts = np.asarray(counts, dtype=float)
+    shares = counts / counts.sum()
+    shares = np.maximum(shares, EPSILON)
+    return shares / shares.sum()
+
+
+def psi(old: np.ndarray, new: np.ndarray) -> float:
+    """
+    Population Stability Index of two distributions over the same bins.
+    """
+    return float(((new - old) * np.log(new / old)).sum())
+
+
+def js_divergence(old: np.ndarray, new: np.ndarray) -> float:
+    """
+    Jensen-Shannon divergence in bits of two distributions over the same bins, between 0 and 1.
+    """
+    middle = (old + new) / 2
+    return float((old * np.log2(old / middle)).sum() / 2 + (new * np.log2(new / middle)).sum() / 2)
+
+
+def distances(old: FieldProfile, new: FieldProfile, bins: int = DRIFT_BINS) -> Dict[str, Optional[float]]:
+    """
+    Distances between two profiles of a field, None for the ones which don't apply to its kind
+    or when either profile has no values.
+    """
+    result: Dict[str, Optional[float]] = dict.fromkeys(METRICS)
+    if old.kind == NUMERICAL and old.sketch.n and new.sketch.n:
+        edges = shared_edges(old, new, bins)
+        old_shares = proportions(old.sketch.histogram(edges))
+        new_shares = proportions(new.sketch.histogram(edges))
+        result[KS] = ks_distance(old, new)
+    elif old.kind == CATEGORICAL and old.categories.counts and new.categories.counts:
+        values = list(old.categories.counts.keys() | new.categories.counts.keys())
+        old_shares = proportions([old.categories.counts[v] for v in values])
+        new_shares = proportions([new.categories.counts[v] for v in values])
+    else:
+        return result
+    result[PSI] = psi(old_shares, new_shares)
+    result[JS] = js_divergence(old_shares, new_shares)
+    return result
+
+
+def drift_rows(old: List[FieldProfile], new: List[FieldProfile], metric: str = PSI,
+               threshold: Optional[float] = None, bins: int = DRIFT_BINS) -> List[Dict]:
+    """
+    Rows of distances for fields profiled in both datasets. A field drifted if its
+    `metric` is over `threshold`.
+    """
+    threshold = DEFAULT_THRESHOLDS[metric] if threshold is None else threshold
+    new_by_name = {profile.name: profile for profile in new}
+    rows = []
+    for old_profile in old:
+        new_profile = new_by_name.get(old_profile.name)
+        if new_profile is None:
+            continue
+        values = distances(old_profile, new_profile, bins)
+        row = {
+            "name": old_profile.name,
+            "profile": old_profile.profile,
+            "old_missing_rate": _missing_rate(old_profile),
+            "new_missing_rate": _missing_rate(new_profile),
+        }
+        row.update({name: None if value is None else round(value, 6) for name, value in values.items()})
+        row["drift"] = values[metric] is not None and values[metric] > threshold
+        rows.append(row)
+    return rows
+
+
+def _missing_rate(profile: FieldProfile) -> Optional[float]:
+    return round(profile.missing / profile.count, 4) if profile.count else None
@@ -0,0 +1,125 @@
+import os
+import re
+from typing import List, NamedTuple, Optional, Pattern
+
+IGNORE_FILE = ".hsignore"
+
+
+class _Rule(NamedTuple):
+    regex: Pattern
+    negated: bool
+    dir_only: bool
+
+
+def _translate(pattern: str) -> str:
+    """
+    Translates a gitignore glob into a regular expression matching a relative posix path.
+    """
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    i, n = 0, len(pattern)
+    res = ""
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            res += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            res += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            res += ".*"
+            i += 2
+        elif c == "*":
+            res += "[^/]*"
+            i += 1
+        elif c == "?":
+            res += "[^/]"
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern[i + 1:i + 2] in ("!", "]") else i + 1)
+            if end == -1:
+                res += re.escape(c)
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                res += "[" + body.replace("\\", "\\\\") + "]"
+                i = end + 1
+        elif c == "\\" and i + 1 < n:
+            res += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            res += re.escape(c)
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    return f"{prefix}{res}"
+
+
+class IgnoreRules:
+    """
+    Compiled gitignore-style patterns.
+
+    Supports comments, `!` negation, trailing `/` for directories only,
+    anchoring with a leading or inner `/`, and `*`, `?`, `[...]`, `**` wildcards.
+    The last matching pattern wins. As in git, files inside an ignored directory
+    can't be re-included, since ignored directories are not walked at all.
+    """
+    def __init__(self, patterns: List[str]):
+        self.rules: List[_Rule] = []
+        for line in patterns:
+            line = line.rstrip("\n").rstrip(" ")
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            self.rules.append(_Rule(re.compile(_translate(line) + r"\Z"), negated, dir_only))
+        self._has_negations = any(rule.negated for rule in self.rules)
+        if not self._has_negations:
+            self._files = self._combine([r for r in self.rules if not r.dir_only])
+            self._dirs = self._combine(self.rules)
+
+    @staticmethod
+    def _combine(rules: List[_Rule]) -> Optional[Pattern]:
+        if not rules:
+            return None
+        return re.compile("|".join(f"(?:{rule.regex.pattern})" for rule in rules))
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """
+        :param path: posix path relative to the payload root
+        :param is_dir: whether the path is a directory
+        """
+        if not self._has_negations:
+            regex = self._dirs if is_dir else self._files
+            return regex is not None and regex.match(path) is not None
+        for rule in reversed(self.rules):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(path):
+                return not rule.negated
+        return False
+
+    @staticmethod
+    def load(folder: str, extra: Optional[List[str]] = None) -> "IgnoreRules":
+        """
+        Reads `.hsignore` from the folder, if it exists, and appends `extra` patterns.
+        """
+        patterns = []
+        try:
+            with open(os.path.join(folder, IGNORE_FILE), "r") as f:
+                patterns = f.readlines()
+        except FileNotFoundError:
+            pass
+        return IgnoreRules(patterns + list(extra or []))
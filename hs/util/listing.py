@@ -0,0 +1,115 @@
+import codecs
+import json
+import logging
+from typing import Dict, Iterator, Optional
+
+from hs.util.listing_cache import AUTO, CACHED, REFRESH, ListingCache
+
+READ_CHUNK_SIZE = 64 * 1024
+
+MODEL_VERSIONS_URL = "/api/v2/model/version"
+SERVABLES_URL = "/api/v2/servable"
+APPLICATIONS_URL = "/api/v2/application"
+DEPLOYMENT_CONFIGURATIONS_URL = "/api/v2/deployment_configuration"
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(chunks: Iterator[bytes]) -> Iterator:
+    """
+    Incrementally parses a JSON array, yielding elements as soon as they are received,
+    so neither the response body nor the parsed list are kept in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    finished = False
+    exhausted = False
+    chunks = iter(chunks)
+    while not finished:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE + ",":
+            if buffer[pos] == "," and not started:
+                raise ValueError("Expected a JSON array")
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                finished = True
+                continue
+            try:
+                element, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(buffer) or exhausted or isinstance(element, (dict, list, str)):
+                    yield element
+                    pos = end
+                    continue
+        if exhausted:
+            raise ValueError("Unexpected end of JSON array")
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer += decoder.decode(b"", final=True)
+        else:
+            buffer += decoder.decode(chunk)
+
+
+def stream_list(cluster: "Cluster", url: str, error_message: str, cache: Optional[ListingCache] = None,
+                cache_mode: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Requests a list of resources and yields raw JSON objects while the response is being read.
+    The response is closed as soon as the caller stops iterating.
+
+    :param cache: cache of cluster listings, if any
+    :param cache_mode: how the cache is used, see `hs.util.listing_cache`. AUTO if not set
+    :raises requests.ConnectionError: if the cluster is unreachable and nothing is cached
+    """
+    import requests
+    cache_mode = cache_mode or AUTO
+    entry = cache.get(url) if cache is not None and cache_mode != REFRESH else None
+    if entry is not None and (cache_mode == CACHED or cache.is_fresh(entry)):
+        logging.debug(f"Using cached {url}, fetched {entry.age():.0f}s ago")
+        yield from iter_json_array(entry.read())
+        return
+    headers = entry.validators() if entry is not None else {}
+    try:
+        resp = cluster.request("GET", url, stream=True, headers=headers)
+    except requests.ConnectionError as ex:
+        if entry is None:
+            raise
+        logging.warning(f"Can't reach the cluster ({ex}), showing the listing cached {entry.age():.0f}s ago")
+        yield from iter_json_array(entry.read())
+        return
+    try:
+        if resp.status_code == 304 and entry is not None:
+            logging.debug(f"Cached {url} is up to date")
+            cache.touch(url, entry)
+            yield from iter_json_array(entry.read())
+            return
+        if not resp.ok:
+            from hydrosdk.utils import handle_request_error
+            handle_request_error(resp, f"{error_message}. {resp.status_code} {resp.text}")
+        chunks = resp.iter_content(chunk_size=READ_CHUNK_SIZE)
+        if cache is not None:
+            chunks = cache.store(url, chunks, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        try:
+            yield from iter_json_array(chunks)
+            # read up to the end, so the whole response gets cached
+            for _ in chunks:
+                pass
+        finally:
+            chunks.close()
+    finally:
+        resp.close()
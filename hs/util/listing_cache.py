@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Iterator, Optional
+
+from hs.settings import CACHE_FOLDER, LISTING_CACHE_TTL
+
+# use a fresh entry without asking the cluster, revalidate a stale one,
+# use it as is if the cluster can't be reached
+AUTO = "auto"
+# fetch from the cluster and update the cache
+REFRESH = "refresh"
+# use an entry of any age, fetch only if there is none
+CACHED = "cached"
+CACHE_MODES = [AUTO, REFRESH, CACHED]
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def cluster_cache_dir(name: str, server: str, root: Optional[str] = None) -> str:
+    """
+    Cache folder of a cluster entry. Pointing an entry to another server starts a new cache.
+    """
+    digest = hashlib.sha1(server.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(root or CACHE_FOLDER, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}-{digest}")
+
+
+def _tmp_path(path: str) -> str:
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class CacheEntry:
+    """
+    Cached response body of a listing endpoint and validators to revalidate it.
+    """
+    def __init__(self, body_path: str, fetched: float, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None):
+        self.body_path = body_path
+        self.fetched = fetched
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def age(self) -> float:
+        return time.time() - self.fetched
+
+    def validators(self) -> dict:
+        """
+        Conditional request headers to revalidate the entry.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def read(self) -> Iterator[bytes]:
+        with open(self.body_path, "rb") as f:
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+
+class ListingCache:
+    """
+    On-disk cache of cluster listing responses.
+
+    Each endpoint is stored as the raw response body and a small JSON file with
+    the fetch time and ETag/Last-Modified validators. Files are replaced atomically,
+    so concurrent CLI processes never see partially written entries.
+
+    :param folder: cache folder of a cluster, see `cluster_cache_dir`
+    :param ttl: seconds during which an entry is used without revalidation
+    """
+    def __init__(self, folder: str, ttl: float = LISTING_CACHE_TTL):
+        self.folder = folder
+        self.ttl = ttl
+
+    def _paths(self, url: str):
+        key = re.sub(r"[^A-Za-z0-9_.-]", "-", url.strip("/"))
+        base = os.path.join(self.folder, key)
+        return f"{base}.json", f"{base}.meta.json"
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        return CacheEntry(body_path, meta.get("fetched", 0), meta.get("etag"), meta.get("last_modified"))
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age() < self.ttl
+
+    def touch(self, url: str, entry: CacheEntry):
+        """
+        Marks an entry as fetched now, after the cluster confirmed it didn't change.
+        """
+        self._write_meta(url, entry.etag, entry.last_modified)
+
+    def store(self, url: str, chunks: Iterator[bytes], etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Passes response chunks through, saving them on the way.
+        The entry is saved only if the caller reads the whole response.
+        """
+        body_path, _ = self._paths(url)
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = _tmp_path(body_path)
+        complete = False
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmp_path, body_path)
+                self._write_meta(url, etag, last_modified)
+            else:
+                os.remove(tmp_path)
+
+    def _write_meta(self, url: str, etag: Optional[str], last_modified: Optional[str]):
+        _, meta_path = self._paths(url)
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = _tmp_path(meta_path)
+        with open(tmp_path, "w") as f:
+            json.dump({"url": url, "fetched": time.time(), "etag": etag, "last_modified": last_modified}, f)
+        os.replace(tmp_path, meta_path)
+
+    def invalidate(self):
+        """
+        Drops all cached listings of the cluster.
+        """
+        shutil.rmtree(self.folder, ignore_errors=True)
@@ -0,0 +1,163 @@
+import datetime
+import re
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import click
+
+# lines kept in memory for every source while the output is behind
+LOG_BUFFER_SIZE = 1000
+# lines printed from one source before switching to the next one
+LOG_BATCH_SIZE = 50
+
+SOURCE_COLORS = ["cyan", "green", "yellow", "magenta", "blue", "red"]
+
+_DURATION = re.compile(r"^(\d+)([smhd])$")
+_DURATION_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+# ISO 8601 timestamp at the start of a line, as printed by docker with timestamps and by python logging
+_LINE_TIMESTAMP = re.compile(r"^\[?(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})(?:[.,](\d+))?(Z|[+-]\d{2}:?\d{2})?")
+
+
+def parse_since(value: str, now: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """
+    Parses `--since` value: a duration like 30s, 10m, 2h, 1d, or an ISO 8601 timestamp.
+    Returned time is in UTC.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    match = _DURATION.match(value.strip())
+    if match:
+        return now - datetime.timedelta(**{_DURATION_UNITS[match.group(2)]: int(match.group(1))})
+    since = _parse_timestamp(value.strip())
+    if since is None:
+        raise ValueError(f"Expected a duration like 10m or an ISO 8601 timestamp, got {value}")
+    return since
+
+
+def _parse_timestamp(text: str) -> Optional[datetime.datetime]:
+    match = _LINE_TIMESTAMP.match(text)
+    if not match:
+        return None
+    timestamp = datetime.datetime.strptime(match.group(1).replace(" ", "T"), "%Y-%m-%dT%H:%M:%S")
+    if match.group(2):
+        timestamp = timestamp.replace(microsecond=int(match.group(2)[:6].ljust(6, "0")))
+    zone = match.group(3)
+    if zone and zone != "Z":
+        sign = -1 if zone[0] == "-" else 1
+        zone = zone[1:].replace(":", "")
+        offset = datetime.timedelta(hours=int(zone[:2]), minutes=int(zone[2:]))
+        timestamp = timestamp.replace(tzinfo=datetime.timezone(sign * offset))
+    else:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return timestamp.astimezone(datetime.timezone.utc)
+
+
+def since_filter(lines: Iterable[str], since: datetime.datetime) -> Iterator[str]:
+    """
+    Skips lines with a leading timestamp older than `since`, and lines without a timestamp
+    which follow them, like stack traces. Once a recent enough line is found, the rest is passed as is.
+    """
+    lines = iter(lines)
+    for line in lines:
+        timestamp = _parse_timestamp(line)
+        if timestamp is not None and timestamp >= since:
+            yield line
+            break
+    yield from lines
+
+
+def servable_log_lines(cluster: "Cluster", servable_name: str, follow: bool = False) -> Iterator[str]:
+    """
+    Yields log lines of a servable. With `follow` keeps yielding new lines until the servable stops.
+    Dropped connections are reopened without repeating lines.
+    """
+    from hs.util.sse import resumable_events
+    url = f"/api/v2/servable/{servable_name}/logs" + ("?follow=true" if follow else "")
+    for event in resumable_events(cluster, url):
+        if event.data:
+            yield from event.data.splitlines()
+
+
+class _Source:
+    def __init__(self, name: str):
+        self.name = name
+        self.lines = deque()
+        self.done = False
+
+
+class LogMultiplexer:
+    """
+    Reads several log streams concurrently and merges them into one stream of (source, line) pairs.
+
+    Every stream is read by its own thread into a buffer of at most `buffer_size` lines.
+    A reader whose buffer is full waits for the output to catch up, so memory stays bounded
+    however noisy a source is. Sources are drained in turns of at most `batch_size` lines,
+    so a noisy source can't hold back the others.
+
+    Errors of a stream end that stream only, they are collected in `errors`.
+
+    :param streams: source name -> function which opens the stream
+    """
+    def __init__(self, streams: Dict[str, Callable[[], Iterable[str]]], buffer_size: int = LOG_BUFFER_SIZE,
+                 batch_size: int = LOG_BATCH_SIZE):
+        self.streams = streams
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.errors: Dict[str, Exception] = {}
+        self._sources = [_Source(name) for name in streams]
+        self._changed = threading.Condition()
+        self._closed = False
+
+    def _read(self, source: _Source):
+        try:
+            for line in self.streams[source.name]():
+                with self._changed:
+                    while len(source.lines) >= self.buffer_size and not self._closed:
+                        self._changed.wait()
+                    if self._closed:
+                        return
+                    source.lines.append(line)
+                    self._changed.notify_all()
+        except Exception as ex:
+            self.errors[source.name] = ex
+        finally:
+            with self._changed:
+                source.done = True
+                self._changed.notify_all()
+
+    def _next_batch(self) -> List[Tuple[str, str]]:
+        with self._changed:
+            while not any(source.lines for source in self._sources):
+                if all(source.done for source in self._sources):
+                    return []
+                self._changed.wait()
+            batch = []
+            for source in self._sources:
+                for _ in range(min(self.batch_size, len(source.lines))):
+                    batch.append((source.name, source.lines.popleft()))
+            self._changed.notify_all()
+            return batch
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for source in self._sources:
+            threading.Thread(target=self._read, args=(source,), name=f"logs-{source.name}", daemon=True).start()
+        try:
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    return
+                yield from batch
+        finally:
+            with self._changed:
+                self._closed = True
+                self._changed.notify_all()
+
+
+def source_prefix(names: List[str]) -> Callable[[str], str]:
+    """
+    Makes colored `name | ` prefixes, aligned by the longest name.
+    """
+    width = max(map(len, names), default=0)
+    prefixes = {name: click.style(f"{name:<{width}} | ", fg=SOURCE_COLORS[i % len(SOURCE_COLORS)])
+                for i, name in enumerate(names)}
+    return prefixes.__getitem__
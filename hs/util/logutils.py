@@ -1,10 +1,52 @@
 import logging
+import threading
+from contextlib import contextmanager
+
 import click
 
+_local = threading.local()
+_output_lock = threading.Lock()
+
+
+def echo(message=None, nl=True):
+    """
+    Drop-in replacement for `click.echo` which respects `grouped_output`.
+    """
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        click.echo(message, nl=nl)
+    else:
+        buffer.append((message, nl))
+
+
+def is_grouped() -> bool:
+    """
+    Whether output of the current thread is collected by `grouped_output`.
+    """
+    return getattr(_local, "buffer", None) is not None
+
+
+@contextmanager
+def grouped_output():
+    """
+    Collects everything printed with `echo` in the current thread
+    and writes it out at once when the block exits.
+    Used to keep output of concurrently applied documents from interleaving.
+    """
+    _local.buffer = []
+    try:
+        yield
+    finally:
+        buffer, _local.buffer = _local.buffer, None
+        with _output_lock:
+            for message, nl in buffer:
+                click.echo(message, nl=nl)
+
+
 class StdoutLogHandler(logging.Handler):
     def emit(self, record):
         try:
             msg = self.format(record)
-            click.echo(msg)
+            echo(msg)
         except Exception:
-            self.handleError(record)
\ No newline at end of file
+            self.handleError(record)
@@ -0,0 +1,107 @@
+import csv
+import fnmatch
+import itertools
+import json
+import sys
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+import click
+
+from hs.util.listing_cache import CACHED, REFRESH
+
+TABLE = "table"
+JSON = "json"
+NDJSON = "ndjson"
+CSV = "csv"
+OUTPUT_FORMATS = [TABLE, JSON, NDJSON, CSV]
+
+
+def filter_rows(rows: Iterable[Dict], name: Optional[str] = None, status: Optional[str] = None,
+                limit: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Lazily filters rows, stopping as soon as `limit` rows are found.
+
+    :param name: glob pattern matched against `name` column
+    :param status: case-insensitive value of `status` column
+    :param limit: max number of rows
+    """
+    if name:
+        rows = (row for row in rows if fnmatch.fnmatchcase(str(row.get("name")), name))
+    if status:
+        rows = (row for row in rows if str(row.get("status", "")).lower() == status.lower())
+    if limit is not None:
+        rows = itertools.islice(rows, limit)
+    return rows
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
+
+
+def write_rows(rows: Iterable[Dict], fmt: str = TABLE, columns: Optional[List[str]] = None,
+               sort_key: Optional[Callable[[Dict], object]] = None, out: Optional[TextIO] = None):
+    """
+    Renders rows in the requested format.
+
+    Tables need all rows to compute column widths, so they are rendered at once and sorted by `sort_key`.
+    JSON, NDJSON and CSV rows are written as soon as they are produced, in the order they come.
+
+    :param rows: dicts with the same keys
+    :param fmt: one of OUTPUT_FORMATS
+    :param columns: CSV header, keys of the first row if not set
+    :param sort_key: order of table rows
+    :param out: destination, stdout if not set
+    """
+    out = out or sys.stdout
+    if fmt == TABLE:
+        from tabulate import tabulate
+        rows = list(rows)
+        if sort_key:
+            rows.sort(key=sort_key)
+        click.echo(tabulate(rows, headers="keys", tablefmt="github"), file=out)
+    elif fmt == NDJSON:
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+    elif fmt == JSON:
+        out.write("[")
+        for i, row in enumerate(rows):
+            out.write(("," if i else "") + "\n  " + json.dumps(row))
+        out.write("\n]\n")
+    elif fmt == CSV:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=columns or list(row), extrasaction="ignore",
+                                        lineterminator="\n")
+                writer.writeheader()
+            writer.writerow({k: _cell(v) for k, v in row.items()})
+        if writer is None and columns:
+            csv.DictWriter(out, fieldnames=columns, lineterminator="\n").writeheader()
+    else:
+        raise ValueError(f"Unknown output format {fmt}. Supported formats: {', '.join(OUTPUT_FORMATS)}")
+
+
+def list_options(with_status: bool = True):
+    """
+    Adds `--name`, `--status` and `--limit` filters to a list command,
+    and `--refresh`/`--cached` flags which set `cache_mode` argument.
+    """
+    def decorator(f):
+        f = click.option('--cached', 'cache_mode', flag_value=CACHED,
+                         help="Use cached listing of any age. The cluster is asked only if nothing is cached.")(f)
+        f = click.option('--refresh', 'cache_mode', flag_value=REFRESH,
+                         help="Ignore cached listing and fetch it from the cluster.")(f)
+        f = click.option('--limit', type=click.IntRange(min=0), required=False,
+                         help="Show at most this number of rows.")(f)
+        if with_status:
+            f = click.option('--status', type=click.STRING, required=False,
+                             help="Show only rows with this status.")(f)
+        f = click.option('--name', type=click.STRING, required=False,
+                         help="Show only rows with names matching this glob pattern.")(f)
+        return f
+    return decorator
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from hs.util.compression import PackOptions, write_tarball
+from hs.util.ignore import IgnoreRules
+
+HASH_CHUNK_SIZE = 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAM_QUEUE_SIZE = 8
+
+
+def resolve_payload(cwd: str, payload: List[str]) -> Dict[str, str]:
+    """
+    Resolves payload entries against model folder the same way hydrosdk does.
+
+    :param cwd: model folder
+    :param payload: list of relative or absolute paths
+    :return: dict with {resolved_path: archive_name}
+    """
+    return {os.path.normpath(os.path.join(cwd, v)): v for v in payload}
+
+
+def iter_payload_files(cwd: str, payload: List[str],
+                       ignore: Optional[IgnoreRules] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Walks payload entries in a deterministic order.
+    Ignored directories are pruned without being walked.
+    Ignore rules are matched against paths relative to the model folder,
+    or relative to the payload entry for entries outside of it.
+    Payload entries themselves are never ignored.
+
+    :param cwd: model folder
+    :param payload: list of relative or absolute paths
+    :param ignore: rules of excluded paths
+    :return: iterator over (path, archive_name) pairs of regular files
+    """
+    for source, target in sorted(resolve_payload(cwd, payload).items(), key=lambda x: x[1]):
+        if os.path.isdir(source):
+            base = os.path.abspath(cwd)
+            if os.path.relpath(os.path.abspath(source), base).startswith(os.pardir):
+                base = os.path.abspath(source)
+            for root, dirs, files in os.walk(source):
+                rel_root = os.path.relpath(os.path.abspath(root), base)
+                rel_root = "" if rel_root == os.curdir else rel_root.replace(os.sep, "/") + "/"
+                if ignore:
+                    dirs[:] = [d for d in dirs if not ignore.is_ignored(rel_root + d, is_dir=True)]
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    if ignore and ignore.is_ignored(rel_root + name):
+                        continue
+                    if os.path.isfile(path):
+                        rel = os.path.relpath(path, source)
+                        yield path, os.path.normpath(os.path.join(target, rel))
+        elif os.path.isfile(source):
+            yield source, os.path.normpath(target)
+        else:
+            raise FileNotFoundError(f"Can't find payload path {source}")
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_payload(files: List[Tuple[str, str]], threads: Optional[int] = None) -> str:
+    """
+    Computes a digest of payload contents. Files are hashed concurrently.
+    The digest depends on file names, contents and executable bits,
+    but not on timestamps or the payload location.
+
+    :param files: list of (path, archive_name) pairs, see `iter_payload_files`
+    :param threads: number of hashing threads
+    :return: hex digest
+    """
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        digests = executor.map(lambda x: hash_file(x[0]), files)
+        result = hashlib.sha256()
+        for (path, arcname), file_digest in zip(files, digests):
+            executable = "x" if os.access(path, os.X_OK) else "-"
+            result.update(f"{arcname}\0{executable}\0{file_digest}\n".encode("utf-8"))
+    return result.hexdigest()
+
+
+class _QueueWriter:
+    """
+    Write-only file object which passes fixed-size chunks to a bounded queue.
+    Blocks while the queue is full, so at most a few chunks are kept in memory.
+    """
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event, chunk_size: int):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.buffer.extend(data)
+        while len(self.buffer) >= self.chunk_size:
+            self._put(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.buffer:
+            self._put(bytes(self.buffer))
+            self.buffer = bytearray()
+
+    def _put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                raise _Cancelled()
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+class _Cancelled(Exception):
+    pass
+
+
+_DONE = object()
+
+
+def stream_tarball(files: List[Tuple[str, str]], options: Optional[PackOptions] = None,
+                   chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Produces a compressed tar archive of `files` on the fly.
+    The archive is written by a background thread, so compression overlaps
+    with whatever the consumer does with the chunks, e.g. sending them over network.
+    Closing the iterator early stops the writer.
+
+    :param files: list of (path, archive_name) pairs, see `iter_payload_files`
+    :param options: compression settings
+    :param chunk_size: size of produced chunks
+    :return: iterator over compressed chunks
+    """
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    cancelled = threading.Event()
+    writer = _QueueWriter(chunks, cancelled, chunk_size)
+
+    def _write():
+        try:
+            write_tarball(writer, files, options)
+            writer.close()
+            writer._put(_DONE)
+        except _Cancelled:
+            pass
+        except BaseException as ex:
+            try:
+                writer._put(ex)
+            except _Cancelled:
+                pass
+
+    thread = threading.Thread(target=_write, name="payload-writer", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        thread.join()
@@ -0,0 +1,137 @@
+import email.utils
+import random
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+import requests
+
+# methods which can be sent again without side effects
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+# gateway errors returned while the cluster restarts or is overloaded
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+# Retry-After longer than this is not honored
+MAX_RETRY_AFTER = 60.0
+
+
+class RequestPolicy(NamedTuple):
+    """
+    How requests to a cluster are sent.
+
+    :param retries: retries of idempotent requests after connection errors and gateway errors
+    :param backoff: upper bound of the first retry delay in seconds, doubled on every next retry.
+        Actual delays are random below the bound, so concurrent clients don't retry in lockstep
+    :param max_backoff: upper bound of a retry delay in seconds
+    :param connect_timeout: seconds to establish a connection
+    :param read_timeout: seconds to wait for response data, no limit if None
+    :param rate_limit: max requests per second, no limit if None
+    :param burst: requests which can be sent at once before `rate_limit` applies
+    :param max_in_flight: max concurrent requests, no limit if None.
+        A streamed response frees its slot once its headers are received
+    :param failure_threshold: consecutive failures which open the circuit breaker
+    :param reset_timeout: seconds an open circuit breaker rejects requests before letting one through
+    """
+    retries: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 10.0
+    connect_timeout: Optional[float] = 10.0
+    read_timeout: Optional[float] = None
+    rate_limit: Optional[float] = None
+    burst: int = 10
+    max_in_flight: Optional[int] = 16
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of sending a request while the cluster is considered unavailable.
+    """
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average and up to `burst` at once.
+    """
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns seconds to wait before it may be used.
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects requests for `reset_timeout` seconds.
+    Then a single trial request is let through: its success closes the breaker, its failure opens it again.
+    """
+    def __init__(self, threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._trial and self.clock() - self.opened_at >= self.reset_timeout:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+                self._trial = False
+
+
+def retry_after(resp: requests.Response) -> Optional[float]:
+    """
+    Delay requested by Retry-After header of a response, in seconds.
+    """
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            parsed = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if parsed is None:
+            return None
+        delay = parsed.timestamp() - time.time()
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+def backoff_delay(policy: RequestPolicy, attempt: int) -> float:
+    """
+    Random delay before retry number `attempt`, counting from 0.
+    """
+    return random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** attempt))
@@ -0,0 +1,311 @@
+"""
+Local data profiling of training data.
+
+A file is split into pieces: byte ranges of whole lines of a CSV file, or row groups of
+a Parquet file. Pieces are profiled by a process pool, each reading its rows in chunks,
+and profiles of the pieces are merged. Memory use depends on the chunk size and the number
+of workers, not on the file size.
+
+Profiles are computed for the fields of a model contract, with the kind of profile
+chosen by the `profile` of each field.
+"""
+import csv
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from hs.entities.contract import Contract
+from hs.util.columnar import ARROW_EXTENSIONS, PARQUET_EXTENSIONS, is_columnar, require_pyarrow
+from hs.util.sketches import Categories, Moments, QuantileSketch
+
+# rows read at once by a worker
+CHUNK_ROWS = 100000
+# size of a piece of a CSV file profiled by one worker
+PIECE_BYTES = 64 * 1024 * 1024
+HISTOGRAM_BINS = 20
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.99]
+TOP_CATEGORIES = 5
+
+NUMERICAL = "numerical"
+CATEGORICAL = "categorical"
+TEXT = "text"
+BASIC = "basic"
+# profile types of contract fields by the kind of their local profile
+PROFILE_KINDS = {
+    "numerical": NUMERICAL, "continuous": NUMERICAL, "interval": NUMERICAL, "ratio": NUMERICAL,
+    "categorical": CATEGORICAL, "nominal": CATEGORICAL, "ordinal": CATEGORICAL,
+    "text": TEXT,
+}
+
+
+def profile_kind(profile: str) -> str:
+    return PROFILE_KINDS.get(str(profile).lower(), BASIC)
+
+
+class FieldProfile:
+    """
+    Profile of a column: counts of values and missing values, and statistics of the profile kind.
+    Numeric values which can't be parsed are counted as missing.
+    """
+    def __init__(self, name: str, profile: str):
+        self.name = name
+        self.profile = profile
+        self.kind = profile_kind(profile)
+        self.count = 0
+        self.missing = 0
+        self.moments = Moments()
+        self.sketch = QuantileSketch() if self.kind == NUMERICAL else None
+        self.categories = Categories() if self.kind == CATEGORICAL else None
+        self.lengths = Moments() if self.kind == TEXT else None
+        self.tokens = Moments() if self.kind == TEXT else None
+
+    def update(self, column: "pandas.Series"):
+        import pandas as pd
+        self.count += len(column)
+        if self.kind == NUMERICAL:
+            values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+            present = values[~np.isnan(values)]
+            self.missing += len(values) - len(present)
+            self.moments.update(present)
+            self.sketch.update(present)
+            return
+        present = column.dropna()
+        self.missing += len(column) - len(present)
+        if self.kind == CATEGORICAL:
+            self.categories.update(present.astype(str).value_counts().to_dict())
+        elif self.kind == TEXT:
+            text = present.astype(str)
+            self.lengths.update(text.str.len().to_numpy(dtype=float))
+            self.tokens.update(text.str.split().str.len().to_numpy(dtype=float))
+
+    def merge(self, other: "FieldProfile"):
+        self.count += other.count
+        self.missing += other.missing
+        self.moments.merge(other.moments)
+        for mine, theirs in ((self.sketch, other.sketch), (self.categories, other.categories),
+                             (self.lengths, other.lengths), (self.tokens, other.tokens)):
+            if mine is not None:
+                mine.merge(theirs)
+
+    def histogram(self, bins: int = HISTOGRAM_BINS) -> Optional[Dict[str, List[float]]]:
+        if self.sketch is None or self.sketch.n == 0:
+            return None
+        if self.moments.min == self.moments.max:
+            return {"edges": [self.moments.min, self.moments.max], "counts": [self.sketch.n]}
+        edges = np.linspace(self.moments.min, self.moments.max, bins + 1)
+        return {"edges": edges.tolist(), "counts": np.rint(self.sketch.histogram(edges)).astype(int).tolist()}
+
+    def to_row(self, bins: int = HISTOGRAM_BINS) -> Dict:
+        row = {
+            "name": self.name,
+            "profile": self.profile,
+            "count": self.count,
+            "missing": self.missing,
+            "missing_rate": round(self.missing / self.count, 4) if self.count else None,
+        }
+        if self.kind == NUMERICAL:
+            row.update(min=self.moments.min, max=self.moments.max, mean=_round(self.moments.mean),
+                       std=_round(self.moments.std))
+            quantiles = self.sketch.quantiles(QUANTILES)
+            row.update({f"p{int(q * 100)}": value for q, value in zip(QUANTILES, quantiles)})
+            row["histogram"] = self.histogram(bins)
+        elif self.kind == CATEGORICAL:
+            row["distinct"] = len(self.categories.counts)
+            if self.categories.truncated:
+                row["distinct"] = f">={row['distinct']}"
+            row["top"] = [[value, count] for value, count in self.categories.counts.most_common(TOP_CATEGORIES)]
+        elif self.kind == TEXT:
+            for prefix, moments in (("length", self.lengths), ("tokens", self.tokens)):
+                row.update({f"{prefix}_min": moments.min, f"{prefix}_max": moments.max,
+                            f"{prefix}_mean": _round(moments.mean if moments.n else None)})
+        return row
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
+
+
+def contract_fields(contract: Contract) -> Dict[str, str]:
+    """
+    Profile types of input and output fields of a contract by field name.
+    """
+    fields = {name: field.profile for name, field in contract.inputs.items()}
+    for name, field in contract.outputs.items():
+        fields.setdefault(name, field.profile)
+    return fields
+
+
+class Piece(NamedTuple):
+    """
+    Part of a file profiled by one worker.
+
+    :param start: first byte of a CSV piece, lines starting before it belong to the previous piece
+    :param end: end of a CSV piece, the line which crosses it belongs to this piece
+    :param row_groups: Parquet row groups of the piece
+    """
+    path: str
+    fields: Dict[str, str]
+    header: Optional[List[str]] = None
+    start: int = 0
+    end: int = 0
+    row_groups: Optional[List[int]] = None
+
+
+class LineRange(io.RawIOBase):
+    """
+    Bytes of the lines of a file which start between `start` and `end`.
+    """
+    def __init__(self, path: str, start: int, end: int):
+        self._file = open(path, "rb")
+        if start > 0:
+            # a line starting right at `start` is preceded by a newline, which is all readline skips then
+            self._file.seek(start - 1)
+            self._file.readline()
+        self._end = end
+        self._pending = b""
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._pending:
+            position = self._file.tell()
+            if self._done or position >= self._end:
+                return 0
+            data = self._file.read(min(len(buffer), self._end - position))
+            if not data:
+                self._done = True
+                return 0
+            if self._file.tell() >= self._end:
+                if not data.endswith(b"\n"):
+                    data += self._file.readline()
+                self._done = True
+            self._pending = data
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _chunks(piece: Piece) -> Iterator["pandas.DataFrame"]:
+    import pandas as pd
+    columns = list(piece.fields)
+    lower = piece.path.lower()
+    if lower.endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(piece.path).iter_batches(batch_size=CHUNK_ROWS, row_groups=piece.row_groups,
+                                                             columns=columns):
+            yield batch.to_pandas()
+    elif lower.endswith(ARROW_EXTENSIONS):
+        from hs.util.columnar import record_batches
+        _, batches = record_batches(piece.path, columns, CHUNK_ROWS)
+        for batch in batches:
+            yield batch.to_pandas()
+    else:
+        dtypes = {name: object for name, profile in piece.fields.items() if profile_kind(profile) != NUMERICAL}
+        with io.TextIOWrapper(io.BufferedReader(LineRange(piece.path, piece.start, piece.end)),
+                              encoding="utf-8", newline="") as text:
+            try:
+                yield from pd.read_csv(text, header=None, names=piece.header, usecols=columns, dtype=dtypes,
+                                       chunksize=CHUNK_ROWS)
+            except pd.errors.EmptyDataError:
+                # all lines of the piece belong to the previous one
+                return
+
+
+def profile_piece(piece: Piece) -> Dict[str, FieldProfile]:
+    profiles = {name: FieldProfile(name, profile) for name, profile in piece.fields.items()}
+    for chunk in _chunks(piece):
+        for name, profile in profiles.items():
+            profile.update(chunk[name])
+    return profiles
+
+
+def split_file(path: str, fields: Dict[str, str], pieces: int, piece_bytes: int = PIECE_BYTES) -> List[Piece]:
+    """
+    Splits a file into pieces for `pieces` workers. Fields missing from the file are dropped.
+    """
+    lower = path.lower()
+    if is_columnar(path):
+        require_pyarrow()
+    if lower.endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        fields = _present(fields, parquet.schema_arrow.names, path)
+        groups = list(range(parquet.num_row_groups))
+        count = max(min(len(groups), pieces * 4), 1)
+        return [Piece(path, fields, row_groups=groups[i::count]) for i in range(count)]
+    if lower.endswith(ARROW_EXTENSIONS):
+        from hs.util.columnar import record_batches
+        schema, _ = record_batches(path)
+        return [Piece(path, _present(fields, schema.names, path))]
+    with open(path, newline="", encoding="utf-8") as f:
+        header_line = f.readline()
+        header_end = len(header_line.encode("utf-8"))
+    header = next(csv.reader([header_line]), None)
+    if not header:
+        raise ValueError(f"{path} is empty")
+    fields = _present(fields, header, path)
+    size = os.path.getsize(path)
+    count = max(-(-(size - header_end) // piece_bytes), 1)
+    bounds = np.linspace(header_end, size, count + 1).astype(int).tolist()
+    return [Piece(path, fields, header, start, end) for start, end in zip(bounds, bounds[1:])]
+
+
+def _present(fields: Dict[str, str], columns: List[str], path: str) -> Dict[str, str]:
+    missing = [name for name in fields if name not in columns]
+    if missing:
+        logging.warning(f"Contract fields missing from {path}: {', '.join(missing)}")
+    present = {name: profile for name, profile in fields.items() if name in columns}
+    if not present:
+        raise ValueError(f"{path} has no columns of the model contract")
+    return present
+
+
+def profile_files(paths: List[str], fields: Dict[str, str], workers: Optional[int] = None,
+                  piece_bytes: int = PIECE_BYTES) -> List[List[FieldProfile]]:
+    """
+    Profiles columns of CSV, Parquet or Arrow files. Pieces of all files share one process pool,
+    so files are profiled in parallel.
+
+    :param fields: profile types of columns by column name
+    :param workers: number of worker processes, all cores if not set. 1 profiles in this process
+    :return: profiles of the fields found in each file, in the order of `fields`
+    """
+    workers = workers or os.cpu_count() or 1
+    split = [split_file(path, fields, workers, piece_bytes) for path in paths]
+    pieces = [(i, piece) for i, file_pieces in enumerate(split) for piece in file_pieces]
+    merged: List[Dict[str, FieldProfile]] = [{} for _ in paths]
+
+    def _merge(i: int, profiles: Dict[str, FieldProfile]):
+        for name, profile in profiles.items():
+            if name in merged[i]:
+                merged[i][name].merge(profile)
+            else:
+                merged[i][name] = profile
+
+    if workers == 1 or len(pieces) == 1:
+        for i, piece in pieces:
+            _merge(i, profile_piece(piece))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pieces))) as pool:
+            for (i, _), profiles in zip(pieces, pool.map(profile_piece, [piece for _, piece in pieces])):
+                _merge(i, profiles)
+    return [[profiles[name] for name in file_pieces[0].fields] for profiles, file_pieces in zip(merged, split)]
+
+
+def profile_file(path: str, fields: Dict[str, str], workers: Optional[int] = None,
+                 piece_bytes: int = PIECE_BYTES) -> List[FieldProfile]:
+    """
+    Profiles columns of a CSV, Parquet or Arrow file, see `profile_files`.
+    """
+    return profile_files([path], fields, workers, piece_bytes)[0]
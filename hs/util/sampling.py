@@ -0,0 +1,151 @@
+"""
+Sampling of CSV training data before it's uploaded.
+
+Only the sample is kept in memory, at most `size` rows. A uniform sample reads the file once
+into a reservoir of `size` rows. A stratified sample reads it twice: first to count rows of
+every stratum, then to fill a reservoir per stratum sized to its share of `size`. Fraction
+samples keep every row with the given probability and need no memory at all.
+"""
+import csv
+import math
+import random
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+Row = List[str]
+
+# distinct values of a stratification column, more of them don't make a meaningful proportion
+MAX_STRATA = 100
+
+
+class SampleOptions(NamedTuple):
+    """
+    :param size: number of rows in the sample
+    :param fraction: probability of a row to get into the sample, used if `size` is None
+    :param stratify_by: column whose values keep their proportions in the sample
+    :param seed: seed of the random generator, the same seed gives the same sample of the same file
+    """
+    size: Optional[int] = None
+    fraction: Optional[float] = None
+    stratify_by: Optional[str] = None
+    seed: Optional[int] = None
+
+
+class Reservoir:
+    """
+    Uniform sample of `size` items of a stream of unknown length, kept with Li's algorithm L.
+    Items between replacements are skipped without calling the random generator.
+    """
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.items: List = []
+        self.seen = 0
+        self._w = 1.0
+        self._next = 0
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            if len(self.items) == self.size:
+                self._advance()
+        elif self.seen == self._next:
+            self.items[self.rng.randrange(self.size)] = item
+            self._advance()
+
+    def _advance(self):
+        self._w *= math.exp(math.log(self.rng.random() or 1e-300) / self.size)
+        skip = math.floor(math.log(self.rng.random() or 1e-300) / math.log1p(-self._w)) if self._w < 1 else 0
+        self._next = self.seen + skip + 1
+
+
+def allocate(counts: Dict[str, int], size: int) -> Dict[str, int]:
+    """
+    Splits `size` rows between strata proportionally to their row counts, by largest remainders.
+    """
+    total = sum(counts.values())
+    if total <= size:
+        return dict(counts)
+    quotas = {key: size * count / total for key, count in counts.items()}
+    shares = {key: int(quota) for key, quota in quotas.items()}
+    rest = size - sum(shares.values())
+    for key in sorted(quotas, key=lambda k: quotas[k] - shares[k], reverse=True)[:rest]:
+        shares[key] += 1
+    return shares
+
+
+def _stratum(row: Row, column: Optional[int]) -> str:
+    return row[column] if column is not None and column < len(row) else ""
+
+
+def count_strata(rows: Iterable[Row], column: int) -> Dict[str, int]:
+    """
+    Numbers of rows with every value of the stratification column.
+
+    :raises ValueError: if the column has more than MAX_STRATA distinct values
+    """
+    counts: Dict[str, int] = {}
+    for row in rows:
+        key = _stratum(row, column)
+        if key not in counts and len(counts) == MAX_STRATA:
+            raise ValueError(f"Stratification column has more than {MAX_STRATA} distinct values, "
+                             f"use a column with fewer values or a sample without --stratify-by")
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def sample_rows(rows: Iterable[Row], options: SampleOptions, column: Optional[int] = None,
+                counts: Optional[Dict[str, int]] = None) -> Iterator[Row]:
+    """
+    Yields sampled rows in the order they come in.
+
+    :param column: index of the stratification column
+    :param counts: rows of every stratum in `rows`, see `count_strata`, required with `column`
+    """
+    rng = random.Random(options.seed)
+    if options.size is None:
+        yield from (row for row in rows if rng.random() < options.fraction)
+        return
+    if column is not None and counts is None:
+        raise ValueError("Counts of strata are required for a stratified sample")
+    shares = allocate(counts, options.size) if column is not None else {"": options.size}
+    reservoirs = {key: Reservoir(share, rng) for key, share in shares.items()}
+    for index, row in enumerate(rows):
+        reservoir = reservoirs.get(_stratum(row, column))
+        if reservoir is not None:
+            reservoir.add((index, row))
+    sample: List[Tuple[int, Row]] = [item for reservoir in reservoirs.values() for item in reservoir.items]
+    sample.sort(key=lambda item: item[0])
+    yield from (row for _, row in sample)
+
+
+def sample_csv(path: str, out_path: str, options: SampleOptions) -> int:
+    """
+    Writes the header and sampled rows of CSV file `path` to `out_path`.
+
+    :return: number of sampled rows
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{path} is empty")
+        column = None
+        counts = None
+        if options.stratify_by is not None:
+            if options.stratify_by not in header:
+                raise ValueError(f"Column {options.stratify_by} is not found in {path}")
+            column = header.index(options.stratify_by)
+            counts = count_strata(reader, column)
+            f.seek(0)
+            reader = csv.reader(f)
+            next(reader)
+        count = 0
+        with open(out_path, "w", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            for row in sample_rows(reader, options, column, counts):
+                writer.writerow(row)
+                count += 1
+    return count
+
@@ -0,0 +1,100 @@
+import contextlib
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib import parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from hydrosdk.cluster import Cluster
+
+from hs.util.policy import IDEMPOTENT_METHODS, RETRY_STATUSES, CircuitBreaker, CircuitOpenError, RequestPolicy, \
+    TokenBucket, backoff_delay, retry_after
+
+# enough for concurrent apply workers and model version lookups
+POOL_SIZE = 16
+
+_clusters: Dict[Tuple[str, RequestPolicy], "SessionCluster"] = {}
+_clusters_lock = threading.Lock()
+
+
+def new_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SessionCluster(Cluster):
+    """
+    Cluster which sends HTTP requests through a single keep-alive session,
+    so SDK calls reuse pooled connections instead of opening a new one per request.
+
+    Requests follow the cluster `RequestPolicy`: idempotent requests are retried after
+    connection and gateway errors, requests are rate limited and their concurrency is bounded,
+    and a circuit breaker stops sending requests to a cluster which keeps failing.
+    """
+    def __init__(self, http_address: str, session: requests.Session = None,
+                 policy: Optional[RequestPolicy] = None, **kwargs):
+        super().__init__(http_address, **kwargs)
+        self.policy = policy or RequestPolicy()
+        self.session = session or new_session(max(POOL_SIZE, self.policy.max_in_flight or 0))
+        self.breaker = CircuitBreaker(self.policy.failure_threshold, self.policy.reset_timeout)
+        self.bucket = TokenBucket(self.policy.rate_limit, self.policy.burst) if self.policy.rate_limit else None
+        self._in_flight = threading.BoundedSemaphore(self.policy.max_in_flight) \
+            if self.policy.max_in_flight else contextlib.nullcontext()
+        self._sleep = time.sleep
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        url = parse.urljoin(self.http_address, url)
+        kwargs.setdefault("timeout", (self.policy.connect_timeout, self.policy.read_timeout))
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Not sending {method} {url}: {self.http_address} failed "
+                                       f"{self.breaker.failures} times in a row, retrying in {self.policy.reset_timeout}s")
+            if self.bucket is not None:
+                delay = self.bucket.reserve()
+                if delay > 0:
+                    self._sleep(delay)
+            resp, error = None, None
+            with self._in_flight:
+                try:
+                    resp = self.session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as ex:
+                    error = ex
+            if error is not None or resp.status_code >= 500:
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+            if error is None and resp.status_code not in RETRY_STATUSES:
+                return resp
+            # a request which never reached the cluster can be sent again whatever the method is
+            retriable = idempotent or isinstance(error, requests.exceptions.ConnectTimeout)
+            if not retriable or attempt >= self.policy.retries:
+                if error is not None:
+                    raise error
+                return resp
+            delay = retry_after(resp) if resp is not None else None
+            if delay is None:
+                delay = backoff_delay(self.policy, attempt)
+            logging.debug(f"{method} {url} failed ({error or resp.status_code}), retrying in {delay:.1f}s")
+            if resp is not None:
+                resp.close()
+            self._sleep(delay)
+            attempt += 1
+
+
+def connect(http_address: str, policy: Optional[RequestPolicy] = None) -> SessionCluster:
+    """
+    Returns the connection to a cluster, shared by the whole process.
+    """
+    policy = policy or RequestPolicy()
+    with _clusters_lock:
+        cluster = _clusters.get((http_address, policy))
+        if cluster is None:
+            cluster = _clusters[(http_address, policy)] = SessionCluster(http_address, policy=policy)
+        return cluster
@@ -0,0 +1,168 @@
+"""
+Mergeable summaries of data streams.
+
+Every summary is updated with NumPy arrays chunk by chunk, and summaries of different
+chunks merge into the summary of their union, so files can be profiled in parallel
+and in memory which doesn't depend on their size.
+"""
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# items of the top level of a quantile sketch, rank error is about 1.7 / SKETCH_SIZE
+SKETCH_SIZE = 200
+# distinct values counted exactly by a categorical summary
+MAX_CATEGORIES = 10000
+
+
+class Moments:
+    """
+    Count, min, max, mean and variance, merged with Chan's parallel algorithm.
+    """
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def update(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        chunk = Moments()
+        chunk.n = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        self.merge(chunk)
+
+    def merge(self, other: "Moments"):
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.min, self.max = other.n, other.mean, other.m2, other.min, other.max
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> Optional[float]:
+        return (self.m2 / self.n) ** 0.5 if self.n else None
+
+
+class QuantileSketch:
+    """
+    KLL sketch: approximate quantiles, CDF and histograms of a stream in O(size) memory.
+
+    Items are kept in levels, an item of level h stands for 2^h stream values. A level which
+    outgrows its capacity is sorted and every other item of it, starting at a random offset,
+    moves to the next level.
+    """
+    def __init__(self, size: int = SKETCH_SIZE, seed: Optional[int] = None):
+        self.size = size
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(self.size * (2 / 3) ** depth), 2)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def _compress(self):
+        while True:
+            full = [h for h in range(len(self.levels)) if len(self.levels[h]) > self._capacity(h)]
+            if not full:
+                return
+            h = full[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[h])
+            # an odd item stays, so the total weight is exactly n
+            kept, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[h] = kept
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def weighted_items(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sorted items and their weights.
+        """
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_), 2.0 ** h) for h, items_ in enumerate(self.levels)])
+        order = np.argsort(items, kind="mergesort")
+        return items[order], weights[order]
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        if self.n == 0:
+            return [None] * len(qs)
+        items, weights = self.weighted_items()
+        ranks = np.cumsum(weights)
+        positions = np.searchsorted(ranks, np.asarray(qs) * ranks[-1], side="left")
+        return [float(items[min(p, len(items) - 1)]) for p in positions]
+
+    def cdf(self, points: np.ndarray) -> np.ndarray:
+        """
+        Approximate fraction of values less than or equal to each of `points`.
+        """
+        if self.n == 0:
+            return np.zeros(len(points))
+        items, weights = self.weighted_items()
+        ranks = np.concatenate([[0.0], np.cumsum(weights)])
+        return ranks[np.searchsorted(items, points, side="right")] / ranks[-1]
+
+    def histogram(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Approximate counts of values between `edges`, the last bin includes its right edge.
+        """
+        items, weights = self.weighted_items()
+        counts, _ = np.histogram(items, bins=edges, weights=weights)
+        return counts
+
+
+class Categories:
+    """
+    Counts of distinct values. Beyond MAX_CATEGORIES values only the most frequent ones
+    are kept and the counts become approximate.
+    """
+    def __init__(self, limit: int = MAX_CATEGORIES):
+        self.limit = limit
+        self.counts: Counter = Counter()
+        self.truncated = False
+
+    def update(self, counts: Dict[str, int]):
+        self.counts.update(counts)
+        self._trim()
+
+    def merge(self, other: "Categories"):
+        self.counts.update(other.counts)
+        self.truncated = self.truncated or other.truncated
+        self._trim()
+
+    def _trim(self):
+        if len(self.counts) > self.limit:
+            self.counts = Counter(dict(self.counts.most_common(self.limit)))
+            self.truncated = True
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Iterator, Optional
+
+import requests
+
+# reconnects in a row without receiving an event before giving up
+RECONNECT_RETRIES = 8
+# seconds before the first reconnect, doubled on every next one
+RECONNECT_BACKOFF = 1.0
+MAX_RECONNECT_BACKOFF = 30.0
+# ids or fingerprints of delivered events remembered to drop replayed ones
+SEEN_EVENT_IDS = 10000
+
+try:
+    from urllib3.exceptions import HTTPError as _Urllib3Error
+    STREAM_ERRORS = (requests.RequestException, _Urllib3Error, ConnectionError)
+except ImportError:  # pragma: no cover
+    STREAM_ERRORS = (requests.RequestException, ConnectionError)
+
+
+def _fingerprint(event) -> bytes:
+    return hashlib.sha1(f"{event.event}\0{event.data}".encode("utf-8")).digest()[:8]
+
+
+def resumable_events(cluster: "Cluster", url: str, is_finished: Optional[Callable[[], bool]] = None,
+                     retries: int = RECONNECT_RETRIES, backoff: float = RECONNECT_BACKOFF,
+                     sleep: Callable[[float], None] = time.sleep) -> Iterator:
+    """
+    Yields server-sent events of `url`, reconnecting when the connection drops.
+
+    Reconnects send `Last-Event-ID` of the last received event. Events replayed by the
+    server are dropped: by id if the server sends ids, otherwise by comparing the
+    beginning of the new stream with the events delivered so far. Only the first and
+    the last SEEN_EVENT_IDS events are remembered: once a new stream starts with the first
+    event, the ones in between are taken as replayed without comparing.
+
+    A stream which ends without an error is complete, unless `is_finished` says the
+    producer is still working, in which case it's reopened too.
+
+    :param is_finished: tells whether the producer of events is done, e.g. a build has finished
+    :param retries: reconnects in a row without new events before the last error is raised
+    :param backoff: seconds before the first reconnect, doubled on every next one
+    """
+    import sseclient
+    last_id: Optional[str] = None
+    seen_ids = set()
+    seen_order = deque()
+    # fingerprints of the last delivered events without ids, in order
+    delivered: Deque[bytes] = deque(maxlen=SEEN_EVENT_IDS)
+    delivered_count = 0
+    first: Optional[bytes] = None
+    attempt = 0
+    while True:
+        headers = {"Last-Event-ID": last_id} if last_id else {}
+        replayed = 0
+        error: Optional[Exception] = None
+        try:
+            resp = cluster.request("GET", url, stream=True, headers=headers)
+            try:
+                if resp.status_code >= 500:
+                    # proxies answer 502/504 while the upstream is unavailable, worth retrying
+                    raise requests.HTTPError(f"{resp.status_code} {resp.reason}", response=resp)
+                if not resp.ok:
+                    from hydrosdk.utils import handle_request_error
+                    handle_request_error(resp, f"Failed to read events of {url}. {resp.status_code} {resp.text}")
+                for event in sseclient.SSEClient(resp).events():
+                    if event.id:
+                        if event.id in seen_ids:
+                            continue
+                        last_id = event.id
+                        seen_ids.add(event.id)
+                        seen_order.append(event.id)
+                        if len(seen_order) > SEEN_EVENT_IDS:
+                            seen_ids.discard(seen_order.popleft())
+                    else:
+                        fingerprint = _fingerprint(event)
+                        if replayed is not None and replayed < delivered_count:
+                            # position of the replayed event in the window of remembered ones
+                            index = replayed - (delivered_count - len(delivered))
+                            if index >= 0:
+                                is_replayed = delivered[index] == fingerprint
+                            else:
+                                is_replayed = replayed > 0 or first == fingerprint
+                            if is_replayed:
+                                replayed += 1
+                                continue
+                        # the stream doesn't repeat delivered events anymore
+                        replayed = None
+                        delivered.append(fingerprint)
+                        delivered_count += 1
+                        first = first or fingerprint
+                    attempt = 0
+                    yield event
+            finally:
+                resp.close()
+        except STREAM_ERRORS as ex:
+            error = ex
+        if is_finished is None:
+            if error is None:
+                return
+        elif is_finished():
+            return
+        attempt += 1
+        if attempt > retries:
+            if error is not None:
+                raise error
+            return
+        delay = min(backoff * 2 ** (attempt - 1), MAX_RECONNECT_BACKOFF)
+        logging.debug(f"Event stream {url} was interrupted ({error or 'closed'}), reconnecting in {delay:.0f}s")
+        sleep(delay)
@@ -0,0 +1,280 @@
+"""
+Upload of local training data.
+
+The file is streamed to the cluster in a single request, read in fixed-size chunks, so memory
+use doesn't depend on the file size. Progress is kept in a file under `.hs/uploads`, so
+`hs profile status` can report the progress of an upload running in background.
+
+Parquet and Arrow files are converted to CSV before the upload, see `hs.util.columnar`,
+and large files can be sampled, see `hs.util.sampling`.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Iterator, List, Optional
+
+from hs.entities.base_entity import BaseEntity
+from hs.settings import TARGET_FOLDER, UPLOADS_FOLDER
+from hs.util.columnar import columnar_to_csv, is_columnar
+from hs.util.sampling import SampleOptions, sample_csv
+from hs.util.upload import ProgressReporter, format_size
+
+CHUNK_SIZE = 8 * 1024 * 1024
+# an upload in progress which didn't report for this many seconds is considered interrupted
+STALE_PROGRESS = 120
+
+UPLOADING = "uploading"
+DONE = "done"
+FAILED = "failed"
+
+
+class UploadProgress(BaseEntity):
+    cluster: str
+    model_version_id: int
+    model_version: str
+    path: str
+    size: int
+    mtime_ns: int
+    offset: int = 0
+    state: str = UPLOADING
+    # bytes per second sent by the current run
+    rate: Optional[float]
+    error: Optional[str]
+    updated: float = 0
+
+    def is_stale(self) -> bool:
+        return self.state == UPLOADING and time.time() - self.updated > STALE_PROGRESS
+
+    def describe(self) -> str:
+        percent = 100 * self.offset / self.size if self.size else 100
+        text = f"{os.path.basename(self.path)}: {format_size(self.offset)} of {format_size(self.size)} ({percent:.0f}%)"
+        if self.rate and self.state == UPLOADING:
+            text += f", {format_size(self.rate)}/s"
+        if self.is_stale():
+            return text + ", interrupted. Run `hs profile push` again"
+        if self.state == FAILED:
+            return text + f", failed: {self.error}"
+        return text + f", {self.state}"
+
+
+def progress_path(model_version: str, folder: str = TARGET_FOLDER) -> str:
+    return os.path.join(folder, UPLOADS_FOLDER, model_version.replace(":", "-") + ".json")
+
+
+def read_progress(path: str) -> Optional[UploadProgress]:
+    try:
+        return UploadProgress.parse_file(path)
+    except FileNotFoundError:
+        return None
+
+
+def write_progress(path: str, progress: UploadProgress):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    progress.updated = time.time()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(progress.json())
+    os.replace(tmp_path, path)
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                return
+            yield data
+
+
+class TrainingDataUpload:
+    """
+    Uploads a local file with training data of a model version.
+
+    :param progress_file: where the progress is saved
+    """
+    def __init__(self, cluster: "Cluster", model_version_id: int, model_version: str, path: str,
+                 progress_file: str, chunk_size: int = CHUNK_SIZE):
+        self.cluster = cluster
+        self.path = os.path.abspath(path)
+        self.progress_file = progress_file
+        self.chunk_size = chunk_size
+        self.url = f"/monitoring/profiles/batch/{model_version_id}"
+        stat = os.stat(self.path)
+        self.progress = UploadProgress(cluster=cluster.http_address, model_version_id=model_version_id,
+                                       model_version=model_version, path=self.path,
+                                       size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        self.reporter = ProgressReporter(f"Uploading {os.path.basename(self.path)}")
+
+    def run(self):
+        self.prepare()
+        try:
+            self._upload()
+        except Exception as ex:
+            self.progress.state = FAILED
+            self.progress.error = str(ex)
+            self._save()
+            raise
+
+    def prepare(self):
+        """
+        Saves the initial progress, replacing the one of a previous upload.
+        """
+        self._save()
+
+    def _upload(self):
+        from hydrosdk.utils import handle_request_error
+        self.reporter.started_at = self.reporter.reported_at = time.monotonic()
+        resp = self.cluster.request("POST", self.url, data=self._tracked(), stream=True)
+        handle_request_error(resp, f"Failed to upload {self.path}: {resp.status_code} {resp.text}")
+        self._report(self.progress.size, DONE)
+        logging.info(f"{self.reporter.title} finished: {self.reporter.status(time.monotonic())}")
+
+    def _tracked(self) -> Iterator[bytes]:
+        offset = 0
+        for chunk in read_chunks(self.path, self.chunk_size):
+            yield chunk
+            offset += len(chunk)
+            self.reporter.total += len(chunk)
+            self._report(offset)
+
+    def _report(self, offset: int, state: str = UPLOADING):
+        now = time.monotonic()
+        self.progress.offset = offset
+        self.progress.state = state
+        if now > self.reporter.started_at:
+            self.progress.rate = self.reporter.total / (now - self.reporter.started_at)
+        # progress of a running upload is saved once per report, the final state always
+        if state == UPLOADING:
+            if now - self.reporter.reported_at < self.reporter.interval:
+                return
+            self.reporter.reported_at = now
+            logging.info(f"{self.reporter.title}: {format_size(offset)} of "
+                         f"{format_size(self.progress.size)}, {self.reporter.status(now)}")
+        self._save()
+
+    def _save(self):
+        write_progress(self.progress_file, self.progress)
+
+
+def preparing_marker(progress_file: str) -> str:
+    """
+    File which exists while a background upload converts or samples its file,
+    holds the source file and the error if preparation failed.
+    """
+    return progress_file + ".preparing"
+
+
+def read_preparing_marker(progress_file: str) -> Optional[dict]:
+    try:
+        with open(preparing_marker(progress_file)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_preparing_marker(progress_file: str, path: Optional[str], error: Optional[str] = None):
+    marker = preparing_marker(progress_file)
+    if path is None:
+        try:
+            os.remove(marker)
+        except FileNotFoundError:
+            pass
+        return
+    os.makedirs(os.path.dirname(marker), exist_ok=True)
+    with open(marker, "w") as f:
+        json.dump({"path": path, "error": error}, f)
+
+
+def derived_file(path: str, kind: str, params, folder: str, prefix: str, write: Callable[[str, str], object]) -> str:
+    """
+    Path of a file made from `path` by `write(path, out_path)`, made unless it's already in `folder`.
+
+    Derived files are named after the version of `path` and `params`, so a file is made once
+    while neither changes. Older files of the same `prefix` and `kind` are removed.
+    """
+    stat = os.stat(path)
+    key = json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns, params])
+    out_path = os.path.join(folder, f"{prefix}-{kind}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.csv")
+    if os.path.exists(out_path):
+        return out_path
+    os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        write(path, tmp_path)
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    for old in glob.glob(os.path.join(folder, glob.escape(f"{prefix}-{kind}-") + "*.csv")):
+        if old != out_path:
+            os.remove(old)
+    return out_path
+
+
+def needs_preparing(path: str, sample: Optional[SampleOptions]) -> bool:
+    return sample is not None or is_columnar(path)
+
+
+def training_file(path: str, progress_file: str, sample: Optional[SampleOptions] = None,
+                  columns: Optional[List[str]] = None) -> str:
+    """
+    The file to upload, kept next to the progress file if it's not `path` itself.
+    Parquet and Arrow files are converted to CSV with `columns` only, then sampled if `sample` is set.
+    """
+    folder = os.path.dirname(progress_file)
+    prefix = os.path.splitext(os.path.basename(progress_file))[0]
+    if is_columnar(path):
+        path = derived_file(path, "columns", columns, folder, prefix,
+                            lambda src, dst: columnar_to_csv(src, dst, columns))
+    if sample is not None:
+        path = derived_file(path, "sample", sample, folder, prefix, lambda src, dst: sample_csv(src, dst, sample))
+    return path
+
+
+def start_background_upload(config_path: str, cluster_name: Optional[str], model_version_id: int,
+                            model_version: str, path: str, progress_file: str,
+                            sample: Optional[SampleOptions] = None, columns: Optional[List[str]] = None):
+    """
+    Starts a detached process which prepares and uploads the file, its progress is written to `progress_file`.
+    """
+    progress_file = os.path.abspath(progress_file)
+    path = os.path.abspath(path)
+    write_preparing_marker(progress_file, path if needs_preparing(path, sample) else None)
+    options = {"sample": sample._asdict() if sample else None, "columns": columns}
+    args = [sys.executable, "-m", "hs.util.training_data", config_path, cluster_name or "",
+            str(model_version_id), model_version, path, progress_file, json.dumps(options)]
+    subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     close_fds=True, start_new_session=True)
+
+
+def main(argv: List[str]):
+    from hs.entities.cluster_config import get_cluster_connection
+    config_path, cluster_name, model_version_id, model_version, path, progress_file, options = argv
+    options = json.loads(options)
+    sample = SampleOptions(**options["sample"]) if options["sample"] else None
+    preparing = needs_preparing(path, sample)
+    try:
+        conn = get_cluster_connection(config_path, cluster_name or None)
+        upload_path = training_file(path, progress_file, sample, options["columns"])
+        write_preparing_marker(progress_file, None)
+        preparing = False
+        TrainingDataUpload(conn, int(model_version_id), model_version, upload_path, progress_file).run()
+    except Exception as ex:
+        logging.debug("Background upload failed", exc_info=True)
+        if preparing:
+            write_preparing_marker(progress_file, path, str(ex))
+            return
+        progress = read_progress(progress_file)
+        if progress is not None and progress.state == UPLOADING:
+            progress.state = FAILED
+            progress.error = str(ex)
+            write_progress(progress_file, progress)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
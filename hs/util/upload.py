@@ -0,0 +1,124 @@
+import json
+import logging
+import time
+import uuid
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from hydrosdk.cluster import Cluster
+from hydrosdk.modelversion import ModelVersion, ModelVersionBuilder
+from hydrosdk.signature import ModelSignature_to_signature_dict
+from hydrosdk.utils import handle_request_error
+
+from hs.util.compression import GZIP, ZSTD, PackOptions
+from hs.util.payload import stream_tarball
+
+PROGRESS_INTERVAL = 5
+PAYLOAD_CONTENT_TYPES = {GZIP: "application/gzip", ZSTD: "application/zstd"}
+
+
+def format_size(size: float) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+class ProgressReporter:
+    """
+    Counts bytes passing through an iterator and periodically logs throughput.
+    """
+    def __init__(self, title: str, interval: float = PROGRESS_INTERVAL):
+        self.title = title
+        self.interval = interval
+        self.total = 0
+        self.started_at = None
+        self.reported_at = None
+
+    def track(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        self.started_at = self.reported_at = time.monotonic()
+        for chunk in chunks:
+            self.total += len(chunk)
+            now = time.monotonic()
+            if now - self.reported_at >= self.interval:
+                self.reported_at = now
+                logging.info(f"{self.title}: {self.status(now)}")
+            yield chunk
+        logging.info(f"{self.title} finished: {self.status(time.monotonic())}")
+
+    def status(self, now: float) -> str:
+        elapsed = max(now - self.started_at, 1e-6)
+        return f"{format_size(self.total)} in {elapsed:.1f}s ({format_size(self.total / elapsed)}/s)"
+
+
+def multipart_stream(fields: List[Tuple[str, Optional[str], Optional[str], Iterable[bytes]]],
+                     boundary: str) -> Iterator[bytes]:
+    """
+    Encodes multipart/form-data body without knowing sizes of the parts in advance.
+
+    :param fields: list of (name, filename, content_type, chunks) tuples
+    :param boundary: multipart boundary
+    """
+    for name, filename, content_type, chunks in fields:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        headers = f"Content-Disposition: {disposition}\r\n"
+        if content_type is not None:
+            headers += f"Content-Type: {content_type}\r\n"
+        yield f"--{boundary}\r\n{headers}\r\n".encode("utf-8")
+        yield from chunks
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("utf-8")
+
+
+def upload_model_version(cluster: Cluster, builder: ModelVersionBuilder, files: List[Tuple[str, str]],
+                         timeout: Optional[float] = None, options: Optional[PackOptions] = None) -> ModelVersion:
+    """
+    Uploads a model version like `ModelVersionBuilder.build` does, but streams the
+    payload archive directly into the request body instead of creating it on disk.
+    The body is sent with chunked transfer encoding, because its size is unknown
+    until the archive is complete.
+
+    :param cluster: active cluster
+    :param builder: builder with the model version definition
+    :param files: list of (path, archive_name) pairs, see `iter_payload_files`
+    :param timeout: request timeout in seconds
+    :param options: payload compression settings
+    :return: ModelVersion object
+    """
+    if builder.runtime is None:
+        raise ValueError("runtime is not specified for the model")
+    if builder.signature is None:
+        raise ValueError("signature is not specified for the model")
+
+    meta = {
+        "name": builder.name,
+        "runtime": builder.runtime.dict(),
+        "modelSignature": ModelSignature_to_signature_dict(builder.signature),
+        "installCommand": builder.install_command,
+        "metadata": builder.metadata
+    }
+    if builder.monitoring_configuration:
+        meta.update({"monitoringConfiguration": builder.monitoring_configuration.to_dict()})
+
+    progress = ProgressReporter(f"Uploading {builder.name} payload")
+    boundary = uuid.uuid4().hex
+    tarball = stream_tarball(files, options)
+    codec = options.codec if options is not None else GZIP
+    body = multipart_stream([
+        ("payload", "filename", PAYLOAD_CONTENT_TYPES[codec], progress.track(tarball)),
+        ("metadata", None, None, [json.dumps(meta).encode("utf-8")]),
+    ], boundary)
+    try:
+        resp = cluster.request("POST", "/api/v2/model/upload", data=body, timeout=timeout,
+                               headers={'Content-Type': f"multipart/form-data; boundary={boundary}"})
+    finally:
+        body.close()
+        tarball.close()
+    handle_request_error(
+        resp, f"Failed to upload local model. {resp.status_code} {resp.text}")
+
+    modelversion = ModelVersion._from_json(cluster, resp.json())
+    modelversion.training_data = builder.training_data
+    return modelversion
@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+import requests_mock
+
+from hs.cli import completion
+from hs.cli.completion import MODEL_VERSIONS, SERVABLES, complete, expire_index, read_index, refresh_index
+from hs.entities.cluster_config import ClusterConfig, ClusterDef, ClusterServerDef
+
+
+@pytest.fixture
+def config_path(tmpdir, monkeypatch):
+    monkeypatch.setattr("hs.cli.completion.COMPLETION_FOLDER", str(tmpdir.join("completion")))
+    monkeypatch.setattr("hs.util.listing_cache.CACHE_FOLDER", str(tmpdir.join("cache")))
+    path = str(tmpdir.join("config.yaml"))
+    config = ClusterConfig(current_cluster="test",
+                           clusters=[ClusterDef(name="test", cluster=ClusterServerDef(server="http://localhost"))])
+    with open(path, "w") as f:
+        f.write(config.to_yaml())
+    return path
+
+
+class FakeContext:
+    def __init__(self, params):
+        self.params = params
+
+    def find_root(self):
+        return self
+
+
+def fill_index(config_path):
+    with requests_mock.Mocker() as mock:
+        mock.get("http://localhost/api/v2/model/version", json=[
+            {"model": {"name": "claims"}, "modelVersion": 1},
+            {"model": {"name": "claims"}, "modelVersion": 2},
+            {"model": {"name": "census"}, "modelVersion": 1},
+        ])
+        mock.get("http://localhost/api/v2/servable", json=[{"fullName": "claims-1-abc"}])
+        mock.get("http://localhost/api/v2/application", json=[{"name": "claims-app"}])
+        mock.get("http://localhost/api/v2/deployment_configuration", json=[])
+        refresh_index(config_path)
+
+
+def test_complete_from_index(config_path, monkeypatch):
+    fill_index(config_path)
+    monkeypatch.setattr(completion, "start_refresh", lambda *args: pytest.fail("fresh index was refreshed"))
+    ctx = FakeContext({"config_file": config_path, "cluster": None})
+    assert complete(MODEL_VERSIONS)(ctx, [], "cl") == ["claims:1", "claims:2"]
+    assert complete(SERVABLES)(ctx, [], "") == ["claims-1-abc"]
+
+
+def test_complete_refreshes_in_background(config_path, monkeypatch):
+    refreshes = []
+    monkeypatch.setattr(completion, "start_refresh", lambda *args: refreshes.append(args))
+    ctx = FakeContext({"config_file": config_path, "cluster": None})
+    assert complete(MODEL_VERSIONS)(ctx, [], "") == []
+    assert refreshes == [(config_path, None)]
+
+    fill_index(config_path)
+    expire_index(config_path)
+    assert complete(MODEL_VERSIONS)(ctx, [], "census") == ["census:1"]
+    assert len(refreshes) == 2
+
+
+def test_index_follows_config_changes(config_path):
+    fill_index(config_path)
+    assert read_index(config_path) is not None
+    with open(config_path, "a") as f:
+        f.write("\n# changed\n")
+    assert read_index(config_path) is None
+
+
+def test_start_refresh_once(config_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(completion.subprocess, "Popen", lambda args, **kwargs: started.append(args))
+    completion.start_refresh(config_path)
+    completion.start_refresh(config_path)
+    assert len(started) == 1
+    assert started[0][1:] == ["-m", "hs.cli.completion", config_path]
@@ -0,0 +1,75 @@
+import os
+
+from hs.entities.cluster_config import ClusterConfig, ClusterDef, ClusterServerDef, \
+    get_connection_by_address, read_cluster_config, read_current_cluster, write_cluster_config
+from hs.util.policy import RequestPolicy
+
+
+def make_config(*names):
+    return ClusterConfig(
+        current_cluster = names[0],
+        clusters = [ClusterDef(name = n, cluster = ClusterServerDef(server = f"http://{n}")) for n in names]
+    )
+
+
+def test_config_cache_is_invalidated_on_change(tmpdir):
+    path = os.path.join(str(tmpdir), "config.yaml")
+    write_cluster_config(path, make_config("local"))
+    first = read_cluster_config(path)
+    first.clusters.clear()
+    assert [c.name for c in read_cluster_config(path).clusters] == ["local"]
+
+    write_cluster_config(path, make_config("local", "prod"))
+    assert [c.name for c in read_cluster_config(path).clusters] == ["local", "prod"]
+
+
+def test_read_current_cluster_override(tmpdir):
+    path = os.path.join(str(tmpdir), "config.yaml")
+    write_cluster_config(path, make_config("local", "prod"))
+    assert read_current_cluster(path).name == "local"
+    assert read_current_cluster(path, "prod").name == "prod"
+    assert read_current_cluster(path, "missing") is None
+
+
+def test_cluster_request_policy(tmpdir):
+    path = os.path.join(str(tmpdir), "config.yaml")
+    with open(path, "w") as f:
+        f.write("""
+current_cluster: local
+clusters:
+  - name: local
+    cluster:
+      server: http://localhost
+    policy:
+      retries: 5
+      rate-limit: 20
+      max-in-flight: 4
+""")
+    policy = read_current_cluster(path).request_policy()
+    assert (policy.retries, policy.rate_limit, policy.max_in_flight) == (5, 20, 4)
+    assert policy.backoff == RequestPolicy().backoff
+
+    write_cluster_config(path, make_config("local"))
+    assert "policy" not in open(path).read()
+    assert read_current_cluster(path).request_policy() == RequestPolicy()
+
+
+def test_connection_by_address_uses_cluster_policy(tmpdir):
+    path = os.path.join(str(tmpdir), "config.yaml")
+    with open(path, "w") as f:
+        f.write("""
+current_cluster: local
+clusters:
+  - name: local
+    cluster:
+      server: http://localhost
+  - name: prod
+    cluster:
+      server: http://prod/
+    policy:
+      retries: 7
+""")
+    assert get_connection_by_address(path, "http://prod").policy.retries == 7
+    assert get_connection_by_address(path, "http://localhost").policy == RequestPolicy()
+    assert get_connection_by_address(path, "http://unknown").policy == RequestPolicy()
+    assert get_connection_by_address(os.path.join(str(tmpdir), "missing.yaml"), "http://prod").policy == RequestPolicy()
@@ -1,10 +1,18 @@
+import os
 import pytest
 import pathlib
+import threading
+from hydro_serving_grpc.serving.contract.signature_pb2 import ModelSignature
 from hydrosdk.cluster import Cluster
+from hydrosdk.image import DockerImage
+from hydrosdk.modelversion import ModelVersion as SDK_MV, ModelVersionStatus
 
-from hs.entities.model_version import ModelVersion
+from hs.cli.commands.apply import ApplyDocument, apply_document
+from hs.entities.apply_context import ApplyContext, ApplyLock, LockedModelVersion, PendingBuilds
+from hs.entities.model_index import ModelVersionIndex
+from hs.entities.model_version import ModelVersion, CONTENT_HASH_KEY
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 @pytest.fixture()
 def model_yaml_path():
@@ -16,11 +24,116 @@ def test_model_parse(model_yaml_path):
     print(model_version)
     #todo: implement assertions. they are better than manual check 👀
 
+@patch('hs.entities.model_version.resumable_events')
 @patch('hydrosdk.monitoring.MetricSpec.create')
 @patch('hydrosdk.modelversion.ModelVersion.find')
-@patch('hydrosdk.modelversion.ModelVersionBuilder.build')
-def test_model_apply(mock_builder, mock_find, mock_metric_create, model_yaml_path):
+@patch('hs.entities.model_version.upload_model_version')
+def test_model_apply(mock_builder, mock_find, mock_metric_create, mock_events, model_yaml_path):
     conn = Cluster("http://")
 
     model_version = ModelVersion.parse_file(model_yaml_path)
     model_version.apply(conn, "./examples/full-apply-example/")
+
+@patch('hs.entities.model_version.resumable_events')
+@patch('hydrosdk.monitoring.MetricSpec.create')
+@patch('hydrosdk.modelversion.ModelVersion.find')
+@patch('hs.entities.model_version.upload_model_version')
+def test_model_apply_uploads_during_build(mock_builder, mock_find, mock_metric_create, mock_events,
+                                          model_yaml_path):
+    conn = Cluster("http://")
+    metric_created = threading.Event()
+    training_data_uploaded = threading.Event()
+    mock_metric_create.side_effect = lambda **kwargs: metric_created.set() or MagicMock()
+    mv = mock_builder.return_value
+    mv.upload_training_data.side_effect = lambda: training_data_uploaded.set() or MagicMock()
+
+    def build_logs():
+        # the build finishes only after the uploads, which would hang a serial apply
+        assert metric_created.wait(5) and training_data_uploaded.wait(5)
+        yield MagicMock(data="Done")
+
+    mock_events.side_effect = lambda *args: build_logs()
+    model_version = ModelVersion.parse_file(model_yaml_path)
+    assert model_version.apply(conn, "./examples/full-apply-example/") is mv
+    assert mock_metric_create.call_args[1]["modelversion_id"] == mv.id
+
+@patch('hs.entities.model_version.resumable_events')
+@patch('hydrosdk.monitoring.MetricSpec.create')
+@patch('hydrosdk.modelversion.ModelVersion.find')
+@patch('hs.entities.model_version.upload_model_version')
+def test_model_apply_no_wait(mock_builder, mock_find, mock_metric_create, mock_events, model_yaml_path):
+    conn = Cluster("http://")
+    model_version = ModelVersion.parse_file(model_yaml_path)
+    model_version.apply(conn, "./examples/full-apply-example/", ApplyContext(wait=False))
+    mock_events.assert_not_called()
+    mock_metric_create.assert_called_once()
+
+@patch('hydrosdk.modelversion.ModelVersion.find')
+@patch('hs.entities.model_version.upload_model_version')
+def test_model_apply_unchanged(mock_builder, mock_find, model_yaml_path, tmpdir):
+    conn = Cluster("http://")
+    cwd = "./examples/full-apply-example/"
+    model_version = ModelVersion.parse_file(model_yaml_path)
+    content_hash = model_version.content_hash(cwd)
+
+    lock = ApplyLock(os.path.join(str(tmpdir), "apply-lock.yaml"))
+    lock.record(conn.http_address, model_version.name, LockedModelVersion(version=3, content_hash=content_hash))
+    mock_find.return_value = SDK_MV(
+        cluster=conn,
+        id=3,
+        model_id=1,
+        name=model_version.name,
+        version=3,
+        signature=ModelSignature(),
+        status=ModelVersionStatus.Released,
+        image=DockerImage(name="aaa", tag="aaa"),
+        runtime=DockerImage(name="aaa", tag="aaa"),
+        is_external=False,
+        metadata={CONTENT_HASH_KEY: content_hash}
+    )
+
+    result = model_version.apply(conn, cwd, ApplyContext(lock=lock))
+    assert result.version == 3
+    mock_builder.assert_not_called()
+
+    assert ApplyLock(lock.path).get(conn.http_address, model_version.name).version == 3
+
+
+@patch('hs.entities.model_version.show_build_logs')
+@patch('hydrosdk.modelversion.ModelVersion.find')
+@patch('hs.entities.model_version.upload_model_version')
+def test_model_apply_unchanged_but_building(mock_builder, mock_find, mock_logs, model_yaml_path, tmpdir):
+    conn = Cluster("http://")
+    cwd = "./examples/full-apply-example/"
+    model_version = ModelVersion.parse_file(model_yaml_path)
+    content_hash = model_version.content_hash(cwd)
+    lock = ApplyLock(os.path.join(str(tmpdir), "apply-lock.yaml"))
+    lock.record(conn.http_address, model_version.name, LockedModelVersion(version=3, content_hash=content_hash))
+
+    def locked_version(status):
+        return SDK_MV(cluster=conn, id=3, model_id=1, name=model_version.name, version=3,
+                      signature=ModelSignature(), status=status, image=DockerImage(name="aaa", tag="aaa"),
+                      runtime=DockerImage(name="aaa", tag="aaa"), is_external=False,
+                      metadata={CONTENT_HASH_KEY: content_hash})
+
+    def context(wait):
+        ctx = ApplyContext(lock=lock, wait=wait, pending=PendingBuilds(str(tmpdir.join("pending.json"))))
+        ctx.index = ModelVersionIndex(conn)
+        return ctx
+
+    mock_find.return_value = locked_version(ModelVersionStatus.Assembling)
+    ctx = context(wait=False)
+    apply_document(conn, ApplyDocument("model.yml", cwd, "Model", model_version), ctx)
+    mock_builder.assert_not_called()
+    mock_logs.assert_not_called()
+    assert [(b.id, b.version) for b in PendingBuilds.read(ctx.pending.path)] == [(3, 3)]
+
+    mock_find.side_effect = [locked_version(ModelVersionStatus.Assembling), locked_version(ModelVersionStatus.Released)]
+    found = model_version.find_unchanged(conn, content_hash, context(wait=True))
+    assert found.status is ModelVersionStatus.Released
+    mock_logs.assert_called_once()
+
+    mock_find.side_effect = None
+    mock_find.return_value = locked_version(ModelVersionStatus.Assembling)
+    mock_logs.side_effect = SDK_MV.ReleaseFailed("failed")
+    assert model_version.find_unchanged(conn, content_hash, context(wait=True)) is None
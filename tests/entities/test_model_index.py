@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import pytest
+from click.exceptions import ClickException
+from hydro_serving_grpc.serving.contract.signature_pb2 import ModelSignature
+from hydrosdk.cluster import Cluster
+from hydrosdk.exceptions import BadRequestException
+from hydrosdk.image import DockerImage
+from hydrosdk.modelversion import ModelVersion
+
+from hs.entities.model_index import ModelVersionIndex, parse_model_ref
+
+
+def make_mv(conn, name, version):
+    return ModelVersion(
+        cluster=conn,
+        id=version,
+        model_id=1,
+        name=name,
+        version=version,
+        signature=ModelSignature(),
+        status="Released",
+        image=DockerImage(name="aaa", tag="aaa"),
+        runtime=DockerImage(name="aaa", tag="aaa"),
+        is_external=False
+    )
+
+def test_parse_model_ref():
+    assert parse_model_ref("claims-model:2") == ("claims-model", 2)
+    for ref in ("claims-model", "claims-model:2:3", "claims-model:latest", ":2"):
+        with pytest.raises(ClickException, match=ref):
+            parse_model_ref(ref)
+
+@patch('hydrosdk.modelversion.ModelVersion.find')
+@patch('hydrosdk.modelversion.ModelVersion.list')
+def test_resolve_many_refs_without_listing(mock_list, mock_find):
+    conn = Cluster("http://")
+    mock_find.side_effect = lambda cluster, name, version: make_mv(conn, name, version)
+    index = ModelVersionIndex(conn)
+    index.resolve([("model", v) for v in range(1, 20)])
+    assert mock_find.call_count == 19
+    assert index.find("model", 15).id == 15
+    assert mock_find.call_count == 19
+    mock_list.assert_not_called()
+
+@patch('hydrosdk.modelversion.ModelVersion.find')
+@patch('hydrosdk.modelversion.ModelVersion.list')
+def test_resolve_with_find(mock_list, mock_find):
+    conn = Cluster("http://")
+
+    def _find(cluster, name, version):
+        if name == "missing":
+            raise BadRequestException("not found")
+        return make_mv(conn, name, version)
+
+    mock_find.side_effect = _find
+    index = ModelVersionIndex(conn)
+    index.resolve([("a", 1), ("b", 2), ("a", 1), ("missing", 1)])
+    assert mock_find.call_count == 3
+    assert index.find("b", 2).version == 2
+    assert mock_find.call_count == 3
+    mock_list.assert_not_called()
@@ -0,0 +1,44 @@
+import os
+import threading
+from unittest.mock import patch
+
+from hs.metadata_collectors.collected_metadata import CollectedMetadata, MetadataOptions, repository_root
+
+
+def test_repository_root(tmpdir):
+    root = str(tmpdir.mkdir("repo"))
+    os.makedirs(os.path.join(root, ".git"))
+    nested = os.path.join(root, "models", "claims")
+    os.makedirs(nested)
+    assert repository_root(nested) == os.path.realpath(root)
+
+@patch('hs.metadata_collectors.dvc.DvcInfo.collect')
+@patch('hs.metadata_collectors.git.GitInfo.collect')
+def test_collect_is_memoized_per_repository(mock_git, mock_dvc, tmpdir):
+    mock_git.return_value = None
+    mock_dvc.return_value = None
+    root = str(tmpdir.mkdir("repo"))
+    os.makedirs(os.path.join(root, ".git"))
+    os.makedirs(os.path.join(root, "a"))
+    os.makedirs(os.path.join(root, "b"))
+    CollectedMetadata.clear_cache()
+    first = CollectedMetadata.collect(os.path.join(root, "a"), paths=[root])
+    CollectedMetadata.collect(os.path.join(root, "b"), paths=[root])
+    mock_git.assert_called_once_with(os.path.realpath(root), [os.path.realpath(root)])
+    mock_dvc.assert_called_once_with(os.path.realpath(root), False)
+    assert "hydrosphere.cli.version" in first.to_metadata()
+
+
+@patch('hs.metadata_collectors.dvc.DvcInfo.collect')
+@patch('hs.metadata_collectors.git.GitInfo.collect')
+def test_collect_skips_slow_collectors(mock_git, mock_dvc, tmpdir):
+    release = threading.Event()
+    mock_git.return_value = None
+    mock_dvc.side_effect = lambda *args: release.wait(5)
+    CollectedMetadata.clear_cache()
+    try:
+        result = CollectedMetadata.collect(str(tmpdir), MetadataOptions(timeout=0.1))
+    finally:
+        release.set()
+    assert result.dvc is None
+    assert "hydrosphere.cli.version" in result.to_metadata()
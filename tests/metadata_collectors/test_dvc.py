@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+
+from hs.metadata_collectors.dvc import DvcInfo, file_md5, flatten_metrics
+
+
+def test_flatten_metrics():
+    assert flatten_metrics({"a": {"b": 1, "c": [1, 2]}, "d": "x"}) == {"a.b": "1", "d": "x"}
+
+
+def test_collect_declared_metrics(tmpdir):
+    root = str(tmpdir)
+    with open(os.path.join(root, "dvc.yaml"), "w") as f:
+        f.write(
+            "metrics:\n"
+            "  - summary.yaml\n"
+            "stages:\n"
+            "  train:\n"
+            "    cmd: python train.py\n"
+            "    wdir: model\n"
+            "    metrics:\n"
+            "      - scores.json:\n"
+            "          cache: false\n"
+            "      - history.csv\n"
+            "      - missing.json\n"
+        )
+    os.makedirs(os.path.join(root, "model"))
+    with open(os.path.join(root, "summary.yaml"), "w") as f:
+        f.write("rows: 100\n")
+    with open(os.path.join(root, "model", "scores.json"), "w") as f:
+        json.dump({"test": {"auc": 0.9}}, f)
+    with open(os.path.join(root, "model", "history.csv"), "w") as f:
+        f.write("epoch,loss\n1,0.5\n2,0.3\n")
+
+    metadata = DvcInfo.collect(root).to_metadata()
+    assert metadata == {
+        "dvc.metrics/summary.yaml/rows": "100",
+        "dvc.metrics/model/scores.json/test.auc": "0.9",
+        "dvc.metrics/model/history.csv/epoch": "2",
+        "dvc.metrics/model/history.csv/loss": "0.3",
+    }
+
+
+def test_metrics_changed_since_dvc_lock_are_skipped(tmpdir):
+    root = str(tmpdir)
+    with open(os.path.join(root, "dvc.yaml"), "w") as f:
+        f.write(
+            "stages:\n"
+            "  train:\n"
+            "    cmd: python train.py\n"
+            "    wdir: model\n"
+            "    metrics:\n"
+            "      - scores.json\n"
+            "      - loss.json\n"
+        )
+    os.makedirs(os.path.join(root, "model"))
+    with open(os.path.join(root, "model", "scores.json"), "wb") as f:
+        f.write(b'{"auc": 0.9}\r\n')
+    with open(os.path.join(root, "model", "loss.json"), "w") as f:
+        json.dump({"loss": 0.1}, f)
+    scores_md5 = hashlib.md5(b'{"auc": 0.9}\n').hexdigest()
+    assert file_md5(os.path.join(root, "model", "scores.json")) == scores_md5
+    with open(os.path.join(root, "dvc.lock"), "w") as f:
+        f.write(
+            "schema: '2.0'\n"
+            "stages:\n"
+            "  train:\n"
+            "    cmd: python train.py\n"
+            "    outs:\n"
+            f"    - path: scores.json\n      md5: {scores_md5}\n"
+            "    - path: loss.json\n      md5: 0123456789abcdef0123456789abcdef\n"
+        )
+
+    assert DvcInfo.collect(root).to_metadata() == {"dvc.metrics/model/scores.json/auc": "0.9"}
+
+
+def test_collect_without_dvc_yaml(tmpdir):
+    assert DvcInfo.collect(str(tmpdir)) is None
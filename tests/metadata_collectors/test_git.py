@@ -0,0 +1,70 @@
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from hs.metadata_collectors.git import GitInfo
+
+
+def git(repo, *args):
+    return subprocess.run(["git", "-C", repo] + list(args), check=True,
+                          stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmpdir):
+    root = str(tmpdir.mkdir("repo"))
+    git(root, "init", "-q")
+    git(root, "checkout", "-q", "-b", "main")
+    os.makedirs(os.path.join(root, "model"))
+    os.makedirs(os.path.join(root, "other"))
+    for name in ("model/weights.txt", "other/notes.txt"):
+        with open(os.path.join(root, name), "w") as f:
+            f.write("v1")
+    git(root, "add", ".")
+    git(root, "-c", "user.name=Jane Doe", "-c", "user.email=jane@example.com", "commit", "-q", "-m", "init")
+    return root
+
+
+def test_collect_loose_objects(repo):
+    info = GitInfo.collect(repo, [os.path.join(repo, "model")])
+    assert info.branch_name == "main"
+    assert info.commit_sha == git(repo, "rev-parse", "HEAD")
+    assert info.author_name == "Jane Doe"
+    assert info.author_email == "jane@example.com"
+    assert info.is_dirty is False
+
+
+def test_collect_packed_objects(repo):
+    git(repo, "gc", "-q")
+    assert not os.path.exists(os.path.join(repo, ".git", "refs", "heads", "main"))
+    info = GitInfo.collect(repo)
+    assert info.commit_sha == git(repo, "rev-parse", "HEAD")
+    assert info.author_email == "jane@example.com"
+
+
+def test_dirty_check_is_scoped_to_paths(repo):
+    with open(os.path.join(repo, "other", "notes.txt"), "w") as f:
+        f.write("v2")
+    assert GitInfo.collect(repo, [os.path.join(repo, "model")]).is_dirty is False
+    assert GitInfo.collect(repo, [os.path.join(repo, "other")]).is_dirty is True
+
+
+def test_dirty_check_sees_edits_of_tracked_files(repo):
+    assert GitInfo.collect(repo).is_dirty is False
+    with open(os.path.join(repo, "model", "weights.txt"), "w") as f:
+        f.write("v2")
+    assert GitInfo.collect(repo).is_dirty is True
+
+
+@patch.dict(os.environ, {"CI_COMMIT_REF_NAME": "release"})
+def test_detached_head_uses_ci_ref(repo):
+    git(repo, "checkout", "-q", "--detach")
+    info = GitInfo.collect(repo)
+    assert info.branch_name == "release"
+    assert info.commit_sha == git(repo, "rev-parse", "HEAD")
+
+
+def test_collect_outside_repository(tmpdir):
+    assert GitInfo.collect(str(tmpdir)) is None
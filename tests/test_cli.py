@@ -1,4 +1,5 @@
 import json
+import os
 import tempfile
 from tests.testutils import mock_sse_response
 import pytest
@@ -12,6 +13,12 @@ from hs.entities.cluster_config import ClusterConfig, ClusterDef, ClusterServerD
 
 logging.root.setLevel(logging.DEBUG)
 
+@pytest.fixture(autouse=True)
+def listing_cache_folder(tmpdir, monkeypatch):
+    monkeypatch.setattr("hs.util.listing_cache.CACHE_FOLDER", str(tmpdir.join("cache")))
+    monkeypatch.setattr("hs.cli.completion.COMPLETION_FOLDER", str(tmpdir.join("completion")))
+    return str(tmpdir.join("cache"))
+
 @pytest.yield_fixture(scope="module")
 def cluster_config():
     with tempfile.NamedTemporaryFile("w+", suffix=".yaml") as f:
@@ -36,7 +43,182 @@ def test_hs():
     print(result)
     assert result.exit_code == 0
 
-def test_model_apply(cluster_config: str):
+def test_model_payload_size(tmpdir):
+    root = str(tmpdir)
+    os.makedirs(os.path.join(root, "weights"))
+    with open(os.path.join(root, "weights", "model.bin"), "wb") as f:
+        f.write(b"0" * 2048)
+    with open(os.path.join(root, "notes.txt"), "w") as f:
+        f.write("notes")
+    with open(os.path.join(root, "serving.yaml"), "w") as f:
+        f.write("""
+kind: Model
+name: test
+runtime: python:latest
+payload:
+  - ./
+exclude:
+  - "*.txt"
+contract:
+  inputs:
+    x: {shape: scalar, type: int64, profile: numerical}
+  outputs:
+    y: {shape: scalar, type: int64, profile: numerical}
+""")
+    runner = CliRunner()
+    result = runner.invoke(hs_cli, ["model", "payload-size", "-f", os.path.join(root, "serving.yaml")])
+    print(result.output)
+    assert result.exit_code == 0
+    assert "weights/model.bin" in result.output
+    assert "notes.txt" not in result.output
+
+def test_model_list_ndjson(cluster_config: str):
+    versions = [
+        {"id": i, "model": {"id": 1, "name": name}, "modelVersion": i, "status": "Released",
+         "runtime": {"name": "hydrosphere/serving-runtime-python-3.7", "tag": "3.0.0"}, "applications": []}
+        for i, name in enumerate(["census", "claims", "claims", "claims"], start=1)
+    ]
+    with requests_mock.Mocker() as req_mock:
+        req_mock.get("http://localhost/api/v2/model/version", json=versions)
+        runner = CliRunner()
+        result = runner.invoke(hs_cli, ["--config-file", cluster_config, "--output", "ndjson",
+                                        "model", "list", "--name", "claims", "--limit", "2"])
+        print(result.output)
+        assert result.exit_code == 0
+        rows = [json.loads(line) for line in result.output.splitlines()]
+        assert [(r["name"], r["version"]) for r in rows] == [("claims", 2), ("claims", 3)]
+        assert rows[0]["runtime"] == "hydrosphere/serving-runtime-python-3.7:3.0.0"
+
+def test_model_list_cache(cluster_config: str, listing_cache_folder: str):
+    versions = [{"id": 1, "model": {"id": 1, "name": "claims"}, "modelVersion": 1, "status": "Released",
+                 "runtime": {"name": "hydrosphere/serving-runtime-python-3.7", "tag": "3.0.0"},
+                 "modelSignature": {"signatureName": "predict", "inputs": [], "outputs": []},
+                 "monitoringConfiguration": {"batchSize": 10}, "metadata": {}, "applications": []}]
+    runner = CliRunner()
+    args = ["--config-file", cluster_config, "--output", "json", "model", "list"]
+    with requests_mock.Mocker() as req_mock:
+        req_mock.get("http://localhost/api/v2/model/version", json=versions, headers={"ETag": '"v1"'})
+        assert runner.invoke(hs_cli, args).exit_code == 0
+        assert runner.invoke(hs_cli, args).exit_code == 0
+        assert req_mock.call_count == 1
+
+        result = runner.invoke(hs_cli, args + ["--refresh"])
+        assert result.exit_code == 0
+        assert req_mock.call_count == 2
+        assert json.loads(result.output)[0]["name"] == "claims"
+
+        req_mock.post("http://localhost/api/v2/servable", json={"fullName": "claims-1-x", "modelVersionId": 1})
+        result = runner.invoke(hs_cli, ["--config-file", cluster_config, "servable", "deploy", "claims:1"])
+        assert result.exit_code == 0, result.output
+        assert not os.listdir(listing_cache_folder)
+
+def test_wait(tmpdir):
+    pending = str(tmpdir.join("pending.json"))
+    with open(pending, "w") as f:
+        json.dump({"builds": [
+            {"cluster": "http://localhost", "id": 1, "name": "claims", "version": 1},
+            {"cluster": "http://localhost", "id": 2, "name": "census", "version": 4},
+        ]}, f)
+    events = "event: ModelUpdate\ndata: " + json.dumps({"id": 2, "status": "Failed"}) + "\n\n"
+    with requests_mock.Mocker() as req_mock:
+        req_mock.get("http://localhost/api/v2/model/version",
+                     json=[{"id": 1, "status": "Released"}, {"id": 2, "status": "Assembling"}])
+        req_mock.get("http://localhost/api/v2/events", content=events.encode("utf-8"),
+                     headers={"Content-Type": "text/event-stream"})
+        runner = CliRunner()
+        result = runner.invoke(hs_cli, ["wait", "-f", pending, "--timeout", "5"])
+        print(result.output)
+        assert result.exit_code == 1
+        assert "claims:1 Released" in result.output
+        assert "census:4 Failed" in result.output
+        assert "1 released, 1 failed, 0 still building" in result.output
+
+def test_profile_push_sample(cluster_config: str, tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    tmpdir.join("train.csv").write("x,label\n" + "".join(f"{i},{i % 2}\n" for i in range(1000)))
+    version = {"id": 1, "model": {"id": 1, "name": "claims"}, "modelVersion": 1, "status": "Released",
+               "runtime": {"name": "hydrosphere/serving-runtime-python-3.7", "tag": "3.0.0"},
+               "modelSignature": {"signatureName": "predict", "inputs": [], "outputs": []},
+               "monitoringConfiguration": {"batchSize": 10}, "metadata": {}, "applications": []}
+    with requests_mock.Mocker() as req_mock:
+        req_mock.get("http://localhost/api/v2/model/version/claims/1", json=version)
+        received = []
+        # the body is read while the request is sent, as a real connection does
+        req_mock.post("http://localhost/monitoring/profiles/batch/1",
+                      text=lambda request, context: received.append(b"".join(request.body)) or "")
+        runner = CliRunner()
+        result = runner.invoke(hs_cli, ["--config-file", cluster_config, "profile", "push",
+                                        "--model-version", "claims:1", "--filename", "train.csv",
+                                        "--sample", "10", "--stratify-by", "label"])
+        print(result.output)
+        assert result.exit_code == 0
+        lines = received[-1].decode("utf-8").splitlines()
+        assert lines[0] == "x,label" and len(lines) == 11
+
+        result = runner.invoke(hs_cli, ["--config-file", cluster_config, "profile", "status", "claims:1"])
+        assert result.output.startswith("Upload of claims-1-sample-")
+        assert "(100%), done" in result.output
+
+def test_profile_local(tmpdir):
+    path = str(tmpdir.join("train.csv"))
+    with open(path, "w") as f:
+        f.write("amount,client_profile\n" + "".join(f"{i},word {i}\n" for i in range(100)))
+    runner = CliRunner()
+    result = runner.invoke(hs_cli, ["--output", "json", "profile", "local", path, "--workers", "1",
+                                    "-f", "./examples/full-apply-example/3-claims-model.yml"])
+    assert result.exit_code == 0, result.output
+    rows = {row["name"]: row for row in json.loads(result.output)}
+    assert rows["amount"]["p50"] in (49, 50) and rows["client_profile"]["tokens_mean"] == 2
+
+    result = runner.invoke(hs_cli, ["profile", "local", path])
+    assert result.exit_code == 2
+
+def test_profile_diff(tmpdir):
+    old, new = str(tmpdir.join("old.csv")), str(tmpdir.join("new.csv"))
+    for path, shift in ((old, 0), (new, 50)):
+        with open(path, "w") as f:
+            f.write("amount,client_profile\n" + "".join(f"{i + shift},word {i}\n" for i in range(100)))
+    runner = CliRunner()
+    args = ["--output", "json", "profile", "diff", old, "--workers", "1",
+            "-f", "./examples/full-apply-example/3-claims-model.yml"]
+    result = runner.invoke(hs_cli, args[:4] + [old] + args[4:])
+    assert result.exit_code == 0, result.output
+    rows = {row["name"]: row for row in json.loads(result.output)}
+    assert rows["amount"]["psi"] == 0 and rows["client_profile"]["psi"] is None
+
+    result = runner.invoke(hs_cli, args[:4] + [new] + args[4:])
+    assert result.exit_code == 1
+    assert "amount" in result.output.splitlines()[-1]
+
+def test_servable_logs_of_application(cluster_config: str):
+    app = {"id": 1, "name": "pipeline", "status": "Ready", "kafkaStreaming": [],
+           "signature": {"signatureName": "predict", "inputs": [], "outputs": []},
+           "executionGraph": {"stages": [
+               {"signature": {"signatureName": "predict", "inputs": [], "outputs": []},
+                "modelVariants": [{"modelVersionId": i, "servableName": f"stage-{i}",
+                                   "deploymentConfigurationName": None, "weight": 100}]}
+               for i in (1, 2)]}}
+    with requests_mock.Mocker() as req_mock:
+        req_mock.get("http://localhost/api/v2/application/pipeline", json=app)
+        for name in ("stage-1", "stage-2", "extra"):
+            req_mock.get(f"http://localhost/api/v2/servable/{name}/logs?follow=true",
+                         content=f"data: {name} started\n\ndata: {name} ready\n\n".encode("utf-8"),
+                         headers={"Content-Type": "text/event-stream"})
+        runner = CliRunner()
+        result = runner.invoke(hs_cli, ["--config-file", cluster_config, "servable", "logs", "extra",
+                                        "--app", "pipeline", "--follow"])
+        print(result.output)
+        assert result.exit_code == 0
+        lines = result.output.splitlines()
+        assert lines[-1] == "End of logs"
+        assert sorted(lines[:-1]) == sorted(f"{name:<7} | {name} {state}" for name in ("stage-1", "stage-2", "extra")
+                                            for state in ("started", "ready"))
+
+def test_model_apply(cluster_config: str, tmpdir, monkeypatch):
+    example = os.path.abspath("./examples/full-apply-example/3-claims-model.yml")
+    # apply keeps its lock and build logs in .hs of the working directory
+    monkeypatch.chdir(tmpdir)
+
     def _upload_matcher(request):
         resp = None
         if request.path_url == "/api/v2/model/upload":
@@ -138,9 +320,10 @@ def test_model_apply(cluster_config: str):
     with requests_mock.Mocker() as req_mock:
         req_mock.add_matcher(_upload_matcher)
         runner = CliRunner()
-        result = runner.invoke(hs_cli, ["-v", "--config-file", cluster_config, "apply", "-f", "./examples/full-apply-example/3-claims-model.yml"], catch_exceptions=False)
+        result = runner.invoke(hs_cli, ["-v", "--config-file", cluster_config, "apply", "-f", example], catch_exceptions=False)
         print(result.output)
         assert result.exit_code == 0
+        assert tmpdir.join(".hs", "apply-lock.yaml").check()
 
 def test_application_singular_apply(cluster_config):
     t = 1
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ["hydrosdk", "grpc", "google.protobuf", "pandas", "tabulate", "yaml", "pydantic", "git"]
+
+HELP_SCRIPT = """
+import sys
+from hs.cli.commands import hs_cli
+try:
+    hs_cli(["--help"])
+except SystemExit:
+    pass
+heavy = {heavy}
+print("loaded:" + ",".join(sorted(m for m in heavy if m in sys.modules)), file=sys.stderr)
+"""
+
+
+def run_help():
+    script = HELP_SCRIPT.format(heavy=HEAVY_MODULES)
+    return subprocess.run([sys.executable, "-c", script], check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def test_help_does_not_import_subcommands():
+    result = run_help()
+    loaded = result.stderr.strip().splitlines()[-1][len("loaded:"):]
+    assert loaded == "", f"hs --help imported heavy modules: {loaded}"
+    assert "Commands:" in result.stdout
+    assert "apply" in result.stdout
+    assert "Application API" in result.stdout and "Model version API" in result.stdout
+
+
+def test_import_does_not_load_heavy_modules():
+    script = f"import sys, hs.cli.commands.hs; print(sorted(m for m in {HEAVY_MODULES} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", script], check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_lazy_commands_resolve():
+    import click
+    from hs.cli.commands import hs_cli
+    ctx = click.Context(hs_cli)
+    for name in hs_cli.lazy_commands:
+        command = hs_cli.get_command(ctx, name)
+        assert command is not None and command.name == name
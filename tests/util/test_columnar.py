@@ -0,0 +1,71 @@
+import csv
+
+import pytest
+from hydro_serving_grpc.serving.contract.signature_pb2 import ModelSignature
+from hydro_serving_grpc.serving.contract.field_pb2 import ModelField
+
+from hs.util.columnar import columnar_to_csv, is_columnar, record_batches, signature_columns
+
+pa = pytest.importorskip("pyarrow")
+
+
+def table():
+    return pa.table({
+        "age": pa.array(range(100), type=pa.int64()),
+        "unused": pa.array(["x"] * 100),
+        "income": pa.array([i * 1.5 for i in range(100)]),
+        "embedding": pa.array([[0.1, 0.2]] * 100),
+    })
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_is_columnar():
+    assert is_columnar("data/train.parquet") and is_columnar("train.ARROW")
+    assert not is_columnar("train.csv") and not is_columnar(None)
+
+
+def test_signature_columns():
+    signature = ModelSignature(inputs=[ModelField(name="age"), ModelField(name="income")],
+                               outputs=[ModelField(name="label"), ModelField(name="age")])
+    assert signature_columns(signature) == ["age", "income", "label"]
+
+
+def test_parquet_is_read_by_batches_with_contract_columns(tmpdir):
+    import pyarrow.parquet as pq
+    path = str(tmpdir.join("train.parquet"))
+    pq.write_table(table(), path, row_group_size=30)
+    schema, batches = record_batches(path, ["income", "age", "label", "embedding"], batch_size=30)
+    assert schema.names == ["income", "age"]
+    assert [b.num_rows for b in batches] == [30, 30, 30, 10]
+
+    out_path = str(tmpdir.join("train.csv"))
+    assert columnar_to_csv(path, out_path, ["income", "age"]) == 100
+    rows = read_csv(out_path)
+    assert rows[0] == ["income", "age"]
+    assert rows[3] == ["3", "2"]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_arrow_files(tmpdir, stream):
+    path = str(tmpdir.join("train.arrow"))
+    data = table()
+    with pa.OSFile(path, "wb") as sink:
+        new_writer = pa.ipc.new_stream if stream else pa.ipc.new_file
+        with new_writer(sink, data.schema) as writer:
+            for batch in data.to_batches(max_chunksize=40):
+                writer.write_batch(batch)
+    out_path = str(tmpdir.join("train.csv"))
+    assert columnar_to_csv(path, out_path, ["age"]) == 100
+    assert read_csv(out_path)[-1] == ["99"]
+
+
+def test_file_without_contract_columns(tmpdir):
+    import pyarrow.parquet as pq
+    path = str(tmpdir.join("train.parquet"))
+    pq.write_table(table(), path)
+    with pytest.raises(ValueError):
+        record_batches(path, ["label"])
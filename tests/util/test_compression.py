@@ -0,0 +1,49 @@
+import gzip
+import io
+import os
+import shutil
+import tarfile
+
+import pytest
+
+from hs.util.compression import PackOptions, ParallelGzipWriter, write_tarball
+from hs.util.payload import iter_payload_files
+
+
+def test_parallel_gzip_roundtrip():
+    data = os.urandom(100000) + b"a" * 100000
+    out = io.BytesIO()
+    writer = ParallelGzipWriter(out, threads=4, block_size=4096)
+    for i in range(0, len(data), 1000):
+        writer.write(data[i:i + 1000])
+    writer.close()
+    assert gzip.decompress(out.getvalue()) == data
+
+def test_parallel_gzip_empty():
+    out = io.BytesIO()
+    writer = ParallelGzipWriter(out)
+    writer.close()
+    assert gzip.decompress(out.getvalue()) == b""
+
+def test_write_tarball():
+    files = list(iter_payload_files("./tests/resources/upload", ["data_folder/", "file1.txt"]))
+    out = io.BytesIO()
+    write_tarball(out, files, PackOptions(threads=2))
+    with tarfile.open(fileobj=io.BytesIO(out.getvalue()), mode="r:gz") as tar:
+        assert tar.getnames() == [arcname for _, arcname in files]
+
+def test_reproducible_tarball(tmpdir):
+    copy = os.path.join(str(tmpdir), "upload")
+    shutil.copytree("./tests/resources/upload", copy)
+    os.utime(os.path.join(copy, "file1.txt"), (0, 0))
+    payload = ["data_folder/", "file1.txt"]
+    archives = []
+    for cwd in ["./tests/resources/upload", copy]:
+        out = io.BytesIO()
+        write_tarball(out, list(iter_payload_files(cwd, payload)), PackOptions(reproducible=True))
+        archives.append(out.getvalue())
+    assert archives[0] == archives[1]
+
+def test_invalid_gzip_level():
+    with pytest.raises(ValueError):
+        PackOptions(level=15)
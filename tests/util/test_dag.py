@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from hs.util.dag import CycleError, run_graph, topological_order
+
+
+def test_topological_order_keeps_original_order():
+    deps = {0: set(), 1: {2}, 2: set(), 3: set()}
+    assert topological_order(deps) == [0, 2, 1, 3]
+
+def test_topological_order_cycle():
+    with pytest.raises(CycleError) as ex:
+        topological_order({0: {1}, 1: {0}, 2: set()})
+    assert ex.value.nodes == [0, 1]
+
+def test_run_graph_respects_dependencies():
+    done = []
+    lock = threading.Lock()
+
+    def action(node):
+        with lock:
+            done.append(node)
+
+    deps = {0: set(), 1: {0}, 2: {0}, 3: {1, 2}}
+    run_graph(["a", "b", "c", "d"], deps, action, parallelism=4)
+    assert done[0] == "a"
+    assert done[-1] == "d"
+    assert sorted(done) == ["a", "b", "c", "d"]
+
+def test_run_graph_stops_after_failure():
+    done = []
+
+    def action(node):
+        if node == "a":
+            raise RuntimeError("boom")
+        done.append(node)
+
+    with pytest.raises(RuntimeError):
+        run_graph(["a", "b"], {0: set(), 1: {0}}, action, parallelism=2)
+    assert done == []
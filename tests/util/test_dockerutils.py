@@ -0,0 +1,38 @@
+import io
+
+from hs.util.dockerutils import DockerLogHandler, progress_key
+
+
+def test_progress_key():
+    assert progress_key("a1b2c3: Pushing [==>      ]  1.2MB/40MB") == progress_key("a1b2c3: Pushing [=====>   ] 20MB/40MB")
+    assert progress_key("Step 1/5 : FROM python") is None
+
+
+def test_plain_output_is_deduplicated(capsys):
+    tee = io.StringIO()
+    messages = ["Step 1/2 : FROM python", "Waiting", "Waiting", "Waiting"] + \
+               [f"abc: Pushing [{'=' * i}>{' ' * (9 - i)}] {i}MB/10MB" for i in range(10)] + ["Done"]
+    with DockerLogHandler(tty=False, flush_interval=60, tee=tee) as handler:
+        for msg in messages:
+            handler.show(msg)
+    assert capsys.readouterr().out.splitlines() == [
+        "Step 1/2 : FROM python", "Waiting", "abc: Pushing [=========>] 9MB/10MB", "Done"
+    ]
+    assert tee.getvalue().splitlines() == messages
+
+
+def test_tty_output_is_updated_in_place(capsys):
+    with DockerLogHandler(tty=True, flush_interval=60) as handler:
+        for msg in ["Building", "Waiting", "Waiting", "1/10 MB", "10/10 MB", "Done"]:
+            handler.show(msg)
+    assert capsys.readouterr().out == \
+        "Building\nWaiting\rWaiting (x2)\n1/10 MB\r10/10 MB\nDone\n"
+
+
+def test_output_is_batched(capsys):
+    handler = DockerLogHandler(tty=False, flush_interval=60)
+    handler.show("first")
+    handler.show("second")
+    assert capsys.readouterr().out == ""
+    handler.close()
+    assert capsys.readouterr().out == "first\nsecond\n"
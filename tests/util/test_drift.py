@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hs.util.drift import distances, drift_rows, js_divergence, proportions, psi
+from hs.util.profiling import FieldProfile, profile_files
+
+
+def numerical(values):
+    profile = FieldProfile("x", "numerical")
+    profile.update(pd.Series(values))
+    return profile
+
+
+def categorical(values):
+    profile = FieldProfile("city", "categorical")
+    profile.update(pd.Series(values))
+    return profile
+
+
+def test_same_distributions_have_no_distance():
+    shares = proportions(np.array([1, 2, 3, 0]))
+    assert shares.sum() == pytest.approx(1) and shares.min() > 0
+    assert psi(shares, shares) == 0 and js_divergence(shares, shares) == 0
+    assert js_divergence(proportions([1, 0]), proportions([0, 1])) == pytest.approx(1, abs=0.01)
+
+
+def test_numerical_drift():
+    rng = np.random.default_rng(1)
+    old = numerical(rng.normal(0, 1, 50000))
+    same = distances(old, numerical(rng.normal(0, 1, 50000)))
+    shifted = distances(old, numerical(rng.normal(1, 1, 50000)))
+    assert same["ks"] < 0.03 and same["psi"] < 0.02 and same["js"] < 0.01
+    # KS distance of N(0, 1) and N(1, 1) is 2 * Phi(0.5) - 1
+    assert shifted["ks"] == pytest.approx(0.383, abs=0.03)
+    assert shifted["psi"] > 0.5 and shifted["js"] > 0.1
+
+
+def test_categorical_drift():
+    old = categorical(["oslo", "rome"] * 500)
+    result = distances(old, categorical(["oslo", "rome", "paris", "paris"] * 250))
+    assert result["ks"] is None
+    assert result["psi"] > 0.2 and 0 < result["js"] < 1
+
+
+def test_fields_without_values_or_distances():
+    assert distances(numerical([None, None]), numerical([1.0])) == {"ks": None, "psi": None, "js": None}
+    text = FieldProfile("note", "text")
+    rows = drift_rows([text], [text])
+    assert rows[0]["psi"] is None and not rows[0]["drift"]
+
+
+def test_drift_of_files(tmpdir):
+    old_path, new_path = str(tmpdir.join("old.csv")), str(tmpdir.join("new.csv"))
+    with open(old_path, "w") as f:
+        f.write("age,city\n" + "".join(f"{i % 50},{['oslo', 'rome'][i % 2]}\n" for i in range(2000)))
+    with open(new_path, "w") as f:
+        f.write("age,city\n" + "".join(f"{i % 50 + 25},{['oslo', 'rome'][i % 2]}\n" for i in range(2000)))
+    old, new = profile_files([old_path, new_path], {"age": "numerical", "city": "categorical"}, workers=2,
+                             piece_bytes=4096)
+    assert old[0].count == new[0].count == 2000
+    rows = {row["name"]: row for row in drift_rows(old, new, metric="ks", threshold=0.3)}
+    assert rows["age"]["drift"] and rows["age"]["ks"] == pytest.approx(0.5, abs=0.05)
+    assert not rows["city"]["drift"] and rows["city"]["psi"] == 0
@@ -0,0 +1,42 @@
+import os
+
+from hs.util.ignore import IgnoreRules
+from hs.util.payload import iter_payload_files
+
+
+def test_unanchored_patterns():
+    rules = IgnoreRules(["# comment", "", "*.pyc", "__pycache__/"])
+    assert rules.is_ignored("a.pyc")
+    assert rules.is_ignored("src/lib/a.pyc")
+    assert rules.is_ignored("src/__pycache__", is_dir=True)
+    assert not rules.is_ignored("src/__pycache__")
+    assert not rules.is_ignored("a.py")
+
+def test_anchored_patterns():
+    rules = IgnoreRules(["/checkpoints", "docs/*.md", "data/**/raw"])
+    assert rules.is_ignored("checkpoints", is_dir=True)
+    assert not rules.is_ignored("model/checkpoints", is_dir=True)
+    assert rules.is_ignored("docs/index.md")
+    assert not rules.is_ignored("docs/api/index.md")
+    assert rules.is_ignored("data/raw", is_dir=True)
+    assert rules.is_ignored("data/a/b/raw", is_dir=True)
+
+def test_negation():
+    rules = IgnoreRules(["*.csv", "!keep.csv", "[ab].txt"])
+    assert rules.is_ignored("data.csv")
+    assert not rules.is_ignored("sub/keep.csv")
+    assert rules.is_ignored("a.txt")
+    assert not rules.is_ignored("c.txt")
+
+def test_walk_prunes_ignored(tmpdir):
+    root = str(tmpdir)
+    for rel in ["model.pb", "src/main.py", "src/__pycache__/main.pyc", ".git/HEAD", "notebooks/eda.ipynb"]:
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("x")
+    with open(os.path.join(root, ".hsignore"), "w") as f:
+        f.write("__pycache__/\n.git/\n")
+    rules = IgnoreRules.load(root, ["/notebooks"])
+    files = [arcname for _, arcname in iter_payload_files(root, ["./"], rules)]
+    assert files == [".hsignore", "model.pb", "src/main.py"]
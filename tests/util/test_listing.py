@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+import requests
+import requests_mock
+
+from hs.util.listing import iter_json_array, stream_list
+from hs.util.listing_cache import CACHED, REFRESH, ListingCache
+from hs.util.policy import RequestPolicy
+from hs.util.session import SessionCluster
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+def test_iter_json_array_across_chunks(size):
+    items = [{"name": "ü-model", "version": i, "tags": ["a", "b"]} for i in range(5)] + [12345, "x", None]
+    data = json.dumps(items).encode("utf-8")
+    assert list(iter_json_array(chunked(data, size))) == items
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array([b" [ ", b"]"])) == []
+
+
+def test_iter_json_array_stops_early():
+    consumed = []
+
+    def chunks():
+        for chunk in chunked(json.dumps([{"i": i} for i in range(100)]).encode("utf-8"), 16):
+            consumed.append(chunk)
+            yield chunk
+
+    items = iter_json_array(chunks())
+    assert [next(items) for _ in range(2)] == [{"i": 0}, {"i": 1}]
+    assert len(consumed) < 5
+
+
+def test_iter_json_array_truncated():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'[{"a": 1}, {"b"']))
+
+
+def test_stream_list_revalidates_cache(tmpdir):
+    cluster = SessionCluster("http://localhost", policy=RequestPolicy(retries=0))
+    cache = ListingCache(str(tmpdir))
+    stale = ListingCache(str(tmpdir), ttl=0)
+    with requests_mock.Mocker() as mock:
+        mock.get("http://localhost/api/v2/servable", json=[{"fullName": "a"}], headers={"ETag": '"v1"'})
+        assert list(stream_list(cluster, "/api/v2/servable", "Failed", cache)) == [{"fullName": "a"}]
+        assert list(stream_list(cluster, "/api/v2/servable", "Failed", cache)) == [{"fullName": "a"}]
+        assert mock.call_count == 1
+
+        mock.get("http://localhost/api/v2/servable", status_code=304)
+        assert list(stream_list(cluster, "/api/v2/servable", "Failed", stale)) == [{"fullName": "a"}]
+        assert mock.last_request.headers["If-None-Match"] == '"v1"'
+
+        assert list(stream_list(cluster, "/api/v2/servable", "Failed", stale, CACHED)) == [{"fullName": "a"}]
+        assert mock.call_count == 2
+
+        mock.get("http://localhost/api/v2/servable", exc=requests.ConnectionError)
+        assert list(stream_list(cluster, "/api/v2/servable", "Failed", stale)) == [{"fullName": "a"}]
+        with pytest.raises(requests.ConnectionError):
+            list(stream_list(cluster, "/api/v2/servable", "Failed", cache, REFRESH))
+
+
+def test_stream_list_doesnt_cache_partial_reads(tmpdir):
+    cluster = SessionCluster("http://localhost")
+    cache = ListingCache(str(tmpdir))
+    with requests_mock.Mocker() as mock:
+        mock.get("http://localhost/api/v2/servable", json=[{"fullName": "a"}, {"fullName": "b"}])
+        items = stream_list(cluster, "/api/v2/servable", "Failed", cache)
+        assert next(items) == {"fullName": "a"}
+        items.close()
+    assert cache.get("/api/v2/servable") is None
+    assert os.listdir(str(tmpdir)) == []
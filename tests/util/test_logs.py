@@ -0,0 +1,71 @@
+import datetime
+import threading
+
+import pytest
+
+from hs.util.logs import LogMultiplexer, parse_since, since_filter
+
+UTC = datetime.timezone.utc
+
+
+def test_multiplexer_merges_all_lines():
+    streams = {
+        "a": lambda: (f"a{i}" for i in range(100)),
+        "b": lambda: (f"b{i}" for i in range(3)),
+    }
+    lines = list(LogMultiplexer(streams, buffer_size=5, batch_size=2))
+    assert [line for source, line in lines if source == "a"] == [f"a{i}" for i in range(100)]
+    assert [line for source, line in lines if source == "b"] == ["b0", "b1", "b2"]
+
+
+def test_multiplexer_bounds_noisy_source():
+    produced = []
+    quiet_ready = threading.Event()
+
+    def noisy():
+        for i in range(10000):
+            produced.append(i)
+            yield f"noise {i}"
+
+    def quiet():
+        quiet_ready.wait(5)
+        yield "hello"
+
+    lines = iter(LogMultiplexer({"noisy": noisy, "quiet": quiet}, buffer_size=10, batch_size=5))
+    first = next(lines)
+    assert first[0] == "noisy"
+    threading.Event().wait(0.1)
+    # the reader waits for the output instead of buffering the whole stream
+    assert len(produced) <= 10 + 5 + 1
+    quiet_ready.set()
+    sources = [next(lines)[0] for _ in range(40)]
+    assert "quiet" in sources
+
+
+def test_multiplexer_collects_errors():
+    def broken():
+        yield "partial"
+        raise IOError("connection reset")
+
+    multiplexer = LogMultiplexer({"ok": lambda: iter(["fine"]), "broken": broken})
+    assert sorted(multiplexer) == [("broken", "partial"), ("ok", "fine")]
+    assert list(multiplexer.errors) == ["broken"]
+
+
+def test_parse_since():
+    now = datetime.datetime(2020, 10, 1, 12, 0, tzinfo=UTC)
+    assert parse_since("10m", now) == datetime.datetime(2020, 10, 1, 11, 50, tzinfo=UTC)
+    assert parse_since("2020-10-01T14:00:00+02:00", now) == datetime.datetime(2020, 10, 1, 12, 0, tzinfo=UTC)
+    with pytest.raises(ValueError):
+        parse_since("yesterday", now)
+
+
+def test_since_filter():
+    lines = [
+        "2020-10-01T11:00:00.000Z old",
+        "Traceback (most recent call last):",
+        "2020-10-01 12:00:01,123 new",
+        "  continuation",
+    ]
+    since = datetime.datetime(2020, 10, 1, 12, 0, tzinfo=UTC)
+    assert list(since_filter(lines, since)) == lines[2:]
@@ -0,0 +1,44 @@
+import io
+import json
+
+from hs.util.output import CSV, JSON, NDJSON, TABLE, filter_rows, write_rows
+
+ROWS = [
+    {"name": "claims", "status": "Released", "apps": ["a"]},
+    {"name": "census", "status": "Failed", "apps": []},
+    {"name": "claims-gan", "status": "Released", "apps": []},
+]
+
+
+def render(rows, fmt, **kwargs):
+    out = io.StringIO()
+    write_rows(rows, fmt, out=out, **kwargs)
+    return out.getvalue()
+
+
+def test_filter_rows():
+    assert [r["name"] for r in filter_rows(ROWS, name="claims*")] == ["claims", "claims-gan"]
+    assert [r["name"] for r in filter_rows(ROWS, status="released", limit=1)] == ["claims"]
+
+
+def test_filter_rows_stops_early():
+    def rows():
+        yield ROWS[0]
+        raise AssertionError("rows after the limit should not be produced")
+
+    assert list(filter_rows(rows(), limit=1)) == [ROWS[0]]
+
+
+def test_write_rows_formats():
+    assert json.loads(render(ROWS, JSON)) == ROWS
+    assert json.loads(render([], JSON)) == []
+    assert [json.loads(line) for line in render(ROWS, NDJSON).splitlines()] == ROWS
+    assert render(ROWS, CSV).splitlines() == [
+        "name,status,apps",
+        'claims,Released,"[""a""]"',
+        "census,Failed,[]",
+        "claims-gan,Released,[]",
+    ]
+    table = render(ROWS, TABLE, sort_key=lambda r: r["name"]).splitlines()
+    assert table[0].split() == ["|", "name", "|", "status", "|", "apps", "|"]
+    assert table[2].startswith("| census")
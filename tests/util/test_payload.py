@@ -0,0 +1,30 @@
+import os
+import shutil
+
+from hs.util.payload import hash_payload, iter_payload_files
+
+
+def test_iter_payload_files():
+    files = list(iter_payload_files("./tests/resources/upload", ["data_folder/", "file1.txt"]))
+    assert [arcname for _, arcname in files] == [
+        "data_folder/file2.txt",
+        "data_folder/subfolder/file3.txt",
+        "file1.txt",
+    ]
+
+def test_hash_payload_ignores_location(tmpdir):
+    copy = os.path.join(str(tmpdir), "upload")
+    shutil.copytree("./tests/resources/upload", copy)
+    payload = ["data_folder/", "file1.txt"]
+    first = hash_payload(list(iter_payload_files("./tests/resources/upload", payload)))
+    second = hash_payload(list(iter_payload_files(copy, payload)))
+    assert first == second
+
+def test_hash_payload_detects_changes(tmpdir):
+    copy = os.path.join(str(tmpdir), "upload")
+    shutil.copytree("./tests/resources/upload", copy)
+    payload = ["data_folder/", "file1.txt"]
+    before = hash_payload(list(iter_payload_files(copy, payload)))
+    with open(os.path.join(copy, "data_folder", "file2.txt"), "a") as f:
+        f.write("changed")
+    assert hash_payload(list(iter_payload_files(copy, payload))) != before
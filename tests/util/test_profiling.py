@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+from hs.entities.contract import Contract
+from hs.util.profiling import LineRange, contract_fields, profile_file, split_file
+
+CONTRACT = Contract.parse_obj({
+    "inputs": {
+        "age": {"shape": "scalar", "type": "int64", "profile": "numerical"},
+        "city": {"shape": "scalar", "type": "string", "profile": "categorical"},
+        "note": {"shape": "scalar", "type": "string", "profile": "text"},
+    },
+    "outputs": {"score": {"shape": "scalar", "type": "double", "profile": "none"}},
+})
+
+
+def write_csv(path, rows=1000):
+    with open(path, "w") as f:
+        f.write("age,city,note,unused,score\n")
+        for i in range(rows):
+            age = "" if i % 10 == 0 else str(i % 90)
+            f.write(f"{age},{['paris', 'oslo', 'rome'][i % 3]},some words {i},x,{i / 10}\n")
+
+
+def test_line_ranges_cover_every_line_once(tmpdir):
+    path = str(tmpdir.join("lines.csv"))
+    lines = [f"{i},{'x' * (i % 13)}\n".encode() for i in range(200)]
+    with open(path, "wb") as f:
+        f.write(b"".join(lines))
+    bounds = [0, 1, 7, 50, 51, 300, 1200, len(b"".join(lines))]
+    parts = [io.BufferedReader(LineRange(path, start, end)).read() for start, end in zip(bounds, bounds[1:])]
+    assert b"".join(parts) == b"".join(lines)
+
+
+def test_contract_fields():
+    assert contract_fields(CONTRACT) == {"age": "numerical", "city": "categorical", "note": "text", "score": "none"}
+
+
+def test_profile_csv(tmpdir):
+    path = str(tmpdir.join("train.csv"))
+    write_csv(path)
+    rows = {p.name: p.to_row() for p in profile_file(path, contract_fields(CONTRACT), workers=1)}
+    assert rows["age"]["count"] == 1000 and rows["age"]["missing"] == 100
+    assert (rows["age"]["min"], rows["age"]["max"]) == (1, 89)
+    assert sum(rows["age"]["histogram"]["counts"]) == 900
+    assert rows["city"]["distinct"] == 3 and rows["city"]["top"][0] == ["paris", 334]
+    assert (rows["note"]["tokens_min"], rows["note"]["tokens_max"]) == (3, 3)
+    assert rows["score"] == {"name": "score", "profile": "none", "count": 1000, "missing": 0, "missing_rate": 0.0}
+
+
+def test_pieces_are_profiled_in_parallel(tmpdir):
+    path = str(tmpdir.join("train.csv"))
+    write_csv(path, rows=5000)
+    fields = contract_fields(CONTRACT)
+    assert len(split_file(path, fields, 2, piece_bytes=4096)) > 10
+    single = {p.name: p.to_row() for p in profile_file(path, fields, workers=1)}
+    parallel = {p.name: p.to_row() for p in profile_file(path, fields, workers=2, piece_bytes=4096)}
+    for name in ("count", "missing", "min", "max"):
+        assert parallel["age"][name] == single["age"][name]
+    assert parallel["age"]["mean"] == pytest.approx(single["age"]["mean"])
+    assert parallel["city"] == single["city"]
+    assert parallel["note"] == single["note"]
+
+
+def test_profile_parquet(tmpdir):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    path = str(tmpdir.join("train.parquet"))
+    pq.write_table(pa.table({"age": [1.0, None, 3.0] * 100, "city": ["oslo", "rome", None] * 100}), path,
+                   row_group_size=50)
+    fields = {"age": "numerical", "city": "categorical", "missing": "text"}
+    rows = {p.name: p.to_row() for p in profile_file(path, fields, workers=2)}
+    assert set(rows) == {"age", "city"}
+    assert (rows["age"]["missing"], rows["age"]["mean"]) == (100, 2.0)
+    assert rows["city"]["top"] == [["oslo", 100], ["rome", 100]]
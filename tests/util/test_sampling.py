@@ -0,0 +1,72 @@
+import csv
+import random
+from collections import Counter
+
+import pytest
+
+from hs.util.sampling import MAX_STRATA, Reservoir, SampleOptions, allocate, count_strata, sample_csv, sample_rows
+
+
+def test_reservoir_is_uniform():
+    hits = Counter()
+    rng = random.Random(1)
+    for _ in range(2000):
+        reservoir = Reservoir(5, rng)
+        for i in range(50):
+            reservoir.add(i)
+        assert len(set(reservoir.items)) == 5
+        hits.update(reservoir.items)
+    # every item is expected 2000 * 5 / 50 = 200 times
+    assert min(hits.values()) > 140 and max(hits.values()) < 260
+
+
+def test_reservoir_keeps_short_streams():
+    reservoir = Reservoir(10, random.Random(0))
+    for i in range(3):
+        reservoir.add(i)
+    assert reservoir.items == [0, 1, 2]
+
+
+def test_allocate():
+    assert allocate({"a": 90, "b": 9, "c": 1}, 10) == {"a": 9, "b": 1, "c": 0}
+    assert allocate({"a": 5, "b": 5}, 3) in ({"a": 2, "b": 1}, {"a": 1, "b": 2})
+    assert allocate({"a": 2, "b": 1}, 10) == {"a": 2, "b": 1}
+
+
+def test_stratified_sample_keeps_proportions_and_order():
+    rows = [[str(i), "fraud" if i % 10 == 0 else "ok"] for i in range(1000)]
+    counts = count_strata(rows, 1)
+    assert counts == {"fraud": 100, "ok": 900}
+    sample = list(sample_rows(rows, SampleOptions(size=50, seed=3), column=1, counts=counts))
+    assert len(sample) == 50
+    assert Counter(row[1] for row in sample) == {"ok": 45, "fraud": 5}
+    assert sample == sorted(sample, key=lambda row: int(row[0]))
+    with pytest.raises(ValueError):
+        list(sample_rows(rows, SampleOptions(size=50), column=1))
+
+
+def test_strata_are_limited():
+    rows = ([str(i), str(i)] for i in range(MAX_STRATA + 1))
+    with pytest.raises(ValueError):
+        count_strata(rows, 1)
+
+
+def test_fraction_sample():
+    sample = list(sample_rows(([str(i)] for i in range(10000)), SampleOptions(fraction=0.1, seed=0)))
+    assert 900 < len(sample) < 1100
+
+
+def test_sample_csv(tmpdir):
+    path = str(tmpdir.join("train.csv"))
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["text", "label"])
+        writer.writerows([[f"line {i}\nwith a newline", str(i % 2)] for i in range(100)])
+    out_path = str(tmpdir.join("sample.csv"))
+    assert sample_csv(path, out_path, SampleOptions(size=10, stratify_by="label", seed=1)) == 10
+    with open(out_path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["text", "label"]
+    assert Counter(row[1] for row in rows[1:]) == {"0": 5, "1": 5}
+    assert all(row[0].endswith("\nwith a newline") for row in rows[1:])
+
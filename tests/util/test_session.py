@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+import requests
+import requests_mock
+
+from hs.util.policy import CircuitBreaker, CircuitOpenError, RequestPolicy, TokenBucket
+from hs.util.session import SessionCluster, connect
+
+
+def test_connect_reuses_cluster():
+    assert connect("http://shared-cluster") is connect("http://shared-cluster")
+    assert connect("http://shared-cluster") is not connect("http://other-cluster")
+
+
+def test_requests_go_through_session():
+    cluster = SessionCluster("http://localhost")
+    with requests_mock.Mocker() as mock:
+        mock.get("http://localhost/api/buildinfo", json={"version": "3.0.0"})
+        assert cluster.request("GET", "/api/buildinfo").json() == {"version": "3.0.0"}
+    adapter = cluster.session.get_adapter("http://localhost")
+    assert adapter._pool_maxsize == 16
+
+
+def make_cluster(**policy) -> SessionCluster:
+    cluster = SessionCluster("http://localhost", policy=RequestPolicy(**policy))
+    cluster._sleep = lambda _: None
+    return cluster
+
+
+def test_idempotent_requests_are_retried():
+    cluster = make_cluster(retries=2)
+    with requests_mock.Mocker() as mock:
+        mock.get("http://localhost/api/v2/servable", [{"status_code": 503}, {"exc": requests.ConnectionError},
+                                                      {"json": []}])
+        assert cluster.request("GET", "/api/v2/servable").json() == []
+        assert mock.call_count == 3
+
+        mock.post("http://localhost/api/v2/servable", status_code=502)
+        assert cluster.request("POST", "/api/v2/servable", json={}).status_code == 502
+        assert mock.call_count == 4
+
+
+def test_retries_honor_retry_after():
+    cluster = make_cluster(retries=1)
+    sleeps = []
+    cluster._sleep = sleeps.append
+    with requests_mock.Mocker() as mock:
+        mock.get("http://localhost/api/v2/servable", [{"status_code": 429, "headers": {"Retry-After": "3"}},
+                                                      {"json": []}])
+        assert cluster.request("GET", "/api/v2/servable").ok
+    assert sleeps == [3.0]
+
+
+def test_circuit_breaker_opens_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.allow()
+
+    cluster = make_cluster(retries=0, failure_threshold=1)
+    with requests_mock.Mocker() as mock:
+        mock.get("http://localhost/api/v2/servable", status_code=502)
+        cluster.request("GET", "/api/v2/servable")
+        with pytest.raises(CircuitOpenError):
+            cluster.request("GET", "/api/v2/servable")
+        assert mock.call_count == 1
+
+
+def test_token_bucket():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    now[0] = 2
+    assert bucket.reserve() == 0
+
+
+def test_in_flight_requests_are_limited():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class SlowSession:
+        def request(self, method, url, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return requests_mock.create_response(requests.Request(method, url).prepare(), json=[])
+
+    cluster = SessionCluster("http://localhost", session=SlowSession(), policy=RequestPolicy(max_in_flight=2))
+    threads = [threading.Thread(target=cluster.request, args=("GET", "/api/v2/servable")) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
@@ -0,0 +1,47 @@
+import numpy as np
+
+from hs.util.sketches import Categories, Moments, QuantileSketch
+
+
+def test_moments_merge():
+    values = np.random.default_rng(0).normal(5, 2, 10000)
+    merged = Moments()
+    for part in np.array_split(values, 7):
+        chunk = Moments()
+        chunk.update(part)
+        merged.merge(chunk)
+    assert merged.n == len(values)
+    assert np.isclose(merged.mean, values.mean()) and np.isclose(merged.std, values.std())
+    assert (merged.min, merged.max) == (values.min(), values.max())
+
+
+def test_quantile_sketch():
+    values = np.random.default_rng(1).uniform(0, 1, 200000)
+    sketch = QuantileSketch(seed=0)
+    for part in np.array_split(values, 10):
+        other = QuantileSketch(seed=1)
+        other.update(part)
+        sketch.merge(other)
+    assert sketch.n == len(values)
+    assert sum(len(level) for level in sketch.levels) < 1000
+    for q, value in zip([0.1, 0.5, 0.9], sketch.quantiles([0.1, 0.5, 0.9])):
+        assert abs(value - q) < 0.02
+    assert np.allclose(sketch.cdf(np.array([0.25, 0.75])), [0.25, 0.75], atol=0.02)
+    assert sketch.histogram(np.linspace(0, 1, 5)).sum() == len(values)
+
+
+def test_quantile_sketch_ignores_nan():
+    sketch = QuantileSketch()
+    sketch.update(np.array([1.0, np.nan, 3.0]))
+    assert sketch.n == 2
+    assert sketch.quantiles([0, 1]) == [1.0, 3.0]
+
+
+def test_categories_are_truncated():
+    categories = Categories(limit=2)
+    categories.update({"a": 5, "b": 3})
+    other = Categories(limit=2)
+    other.update({"c": 1, "b": 1})
+    categories.merge(other)
+    assert categories.counts == {"a": 5, "b": 4}
+    assert categories.truncated
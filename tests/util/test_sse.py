@@ -0,0 +1,70 @@
+import pytest
+import requests
+import requests_mock
+
+from hs.util.policy import RequestPolicy
+from hs.util.session import SessionCluster
+from hs.util.sse import resumable_events
+
+URL = "http://localhost/api/v2/model/version/1/logs"
+
+
+def cluster() -> SessionCluster:
+    # reconnects are tested here, not retries of single requests
+    return SessionCluster("http://localhost", policy=RequestPolicy(retries=0))
+
+
+def sse(*events: str) -> dict:
+    return {"content": "".join(events).encode("utf-8"), "headers": {"Content-Type": "text/event-stream"}}
+
+
+def test_reopens_stream_until_finished_and_skips_replayed_events():
+    finished = iter([False, True])
+    sleeps = []
+    with requests_mock.Mocker() as mock:
+        mock.get(URL, [sse("data: a\n\n", "data: b\n\n"),
+                       sse("data: a\n\n", "data: b\n\n", "data: c\n\n")])
+        events = resumable_events(cluster(), "/api/v2/model/version/1/logs",
+                                  lambda: next(finished), sleep=sleeps.append)
+        assert [e.data for e in events] == ["a", "b", "c"]
+        assert mock.call_count == 2
+    assert sleeps == [1.0]
+
+
+def test_remembers_a_bounded_window_of_events(monkeypatch):
+    monkeypatch.setattr("hs.util.sse.SEEN_EVENT_IDS", 2)
+    finished = iter([False, False, True])
+    with requests_mock.Mocker() as mock:
+        mock.get(URL, [sse("data: a\n\n", "data: b\n\n", "data: c\n\n"),
+                       sse("data: a\n\n", "data: b\n\n", "data: c\n\n", "data: d\n\n"),
+                       sse("data: x\n\n", "data: y\n\n")])
+        events = resumable_events(cluster(), "/api/v2/model/version/1/logs",
+                                  lambda: next(finished), sleep=lambda _: None)
+        # "a" is out of the window, the replay is recognized by the first event
+        assert [e.data for e in events] == ["a", "b", "c", "d", "x", "y"]
+
+
+def test_resumes_from_last_event_id():
+    with requests_mock.Mocker() as mock:
+        mock.get(URL, [{"exc": requests.exceptions.ChunkedEncodingError},
+                       sse("id: 1\ndata: a\n\n", "id: 2\ndata: b\n\n")])
+        conn = cluster()
+        events = list(resumable_events(conn, "/api/v2/model/version/1/logs", sleep=lambda _: None))
+        assert [e.data for e in events] == ["a", "b"]
+
+        mock.get(URL, [{"status_code": 504}, sse("id: 2\ndata: b\n\n", "id: 3\ndata: c\n\n")])
+        finished = iter([False, False, True])
+        events = resumable_events(conn, "/api/v2/model/version/1/logs", lambda: next(finished),
+                                  sleep=lambda _: None)
+        assert [e.data for e in events] == ["b", "c"]
+        assert mock.last_request.headers["Last-Event-ID"] == "3"
+
+
+def test_gives_up_after_retries():
+    sleeps = []
+    with requests_mock.Mocker() as mock:
+        mock.get(URL, exc=requests.exceptions.ConnectionError)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            list(resumable_events(cluster(), "/api/v2/model/version/1/logs",
+                                  retries=3, sleep=sleeps.append))
+    assert sleeps == [1.0, 2.0, 4.0]
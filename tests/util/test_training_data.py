@@ -0,0 +1,64 @@
+import requests
+import requests_mock
+
+from hs.util.policy import RequestPolicy
+from hs.util.session import SessionCluster
+from hs.util.sampling import SampleOptions
+from hs.util.training_data import DONE, FAILED, UPLOADING, TrainingDataUpload, read_progress, training_file
+
+URL = "http://localhost/monitoring/profiles/batch/1"
+DATA = b"a,b\n1,2\n3,4\n"
+
+
+def make_upload(tmpdir) -> TrainingDataUpload:
+    path = tmpdir.join("train.csv")
+    path.write_binary(DATA)
+    cluster = SessionCluster("http://localhost", policy=RequestPolicy(retries=0))
+    return TrainingDataUpload(cluster, 1, "claims:1", str(path), str(tmpdir.join("uploads", "claims-1.json")),
+                              chunk_size=4)
+
+
+def test_streams_file_in_one_request(tmpdir):
+    upload = make_upload(tmpdir)
+    saved = []
+    save = upload._save
+    upload._save = lambda: saved.append(upload.progress.state) or save()
+    with requests_mock.Mocker() as mock:
+        received = []
+        mock.post(URL, text=lambda request, context: received.append(b"".join(request.body)) or "")
+        upload.run()
+        assert [r.method for r in mock.request_history] == ["POST"]
+    assert received == [DATA]
+    # chunks sent within the report interval don't rewrite the progress file
+    assert saved == [UPLOADING, DONE]
+    progress = read_progress(upload.progress_file)
+    assert (progress.offset, progress.state) == (len(DATA), DONE)
+
+
+def test_failed_upload_is_saved(tmpdir):
+    upload = make_upload(tmpdir)
+    with requests_mock.Mocker() as mock:
+        mock.post(URL, status_code=500, text="no space left")
+        try:
+            upload.run()
+            assert False, "upload should fail"
+        except Exception:
+            pass
+    progress = read_progress(upload.progress_file)
+    assert progress.state == FAILED and "no space left" in progress.error
+
+
+def test_training_file_is_reused_until_options_change(tmpdir):
+    path = tmpdir.join("train.csv")
+    path.write("x\n" + "".join(f"{i}\n" for i in range(100)))
+    progress_file = str(tmpdir.join("uploads", "claims-1.json"))
+    assert training_file(str(path), progress_file) == str(path)
+    first = training_file(str(path), progress_file, SampleOptions(size=10))
+    with open(first) as f:
+        content = f.read()
+    assert training_file(str(path), progress_file, SampleOptions(size=10)) == first
+    with open(first) as f:
+        assert f.read() == content
+    second = training_file(str(path), progress_file, SampleOptions(size=20))
+    assert second != first
+    assert tmpdir.join("uploads").listdir() == [tmpdir.join("uploads", second.rsplit("/", 1)[-1])]
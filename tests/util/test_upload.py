@@ -0,0 +1,93 @@
+import email.parser
+import email.policy
+import io
+import json
+import tarfile
+
+import requests
+import requests_mock
+from hydrosdk.cluster import Cluster
+from hydrosdk.image import DockerImage
+from hydrosdk.modelversion import ModelVersionBuilder
+
+from hs.entities.contract import Contract, Field
+from hs.util.payload import iter_payload_files, stream_tarball
+from hs.util.upload import multipart_stream, upload_model_version
+
+
+def test_stream_tarball():
+    files = list(iter_payload_files("./tests/resources/upload", ["data_folder/", "file1.txt"]))
+    data = b"".join(stream_tarball(files, chunk_size=16))
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        assert tar.getnames() == [arcname for _, arcname in files]
+
+def test_stream_tarball_closed_early():
+    files = list(iter_payload_files("./tests/resources/upload", ["data_folder/", "file1.txt"]))
+    chunks = stream_tarball(files, chunk_size=1)
+    next(chunks)
+    chunks.close()
+
+def parse_multipart(body: bytes, boundary: str):
+    """
+    Parts of a multipart/form-data body as (name, filename, content_type, content) tuples.
+    """
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: multipart/form-data; boundary={boundary}\r\n\r\n".encode("utf-8") + body)
+    assert message.is_multipart() and not message.defects
+    return [(part.get_param("name", header="content-disposition"), part.get_filename(),
+             part.get("Content-Type"), part.get_payload(decode=True)) for part in message.iter_parts()]
+
+def test_multipart_stream():
+    body = b"".join(multipart_stream([("a", None, None, [b"1", b"2"]),
+                                      ("b", "f", "application/gzip", [b"3"])], "xxx"))
+    assert body == (b'--xxx\r\nContent-Disposition: form-data; name="a"\r\n\r\n12\r\n'
+                    b'--xxx\r\nContent-Disposition: form-data; name="b"; filename="f"\r\n'
+                    b'Content-Type: application/gzip\r\n\r\n3\r\n'
+                    b'--xxx--\r\n')
+
+def test_multipart_stream_is_parsed_byte_for_byte():
+    binary = bytes(range(256)) * 4 + b"\r\n--xx\r\n"
+    body = b"".join(multipart_stream([("payload", "filename", "application/gzip", [binary[:100], binary[100:]]),
+                                      ("metadata", None, None, [b'{"name": "test"}'])], "xxx"))
+    assert parse_multipart(body, "xxx") == [
+        ("payload", "filename", "application/gzip", binary),
+        ("metadata", None, None, b'{"name": "test"}'),
+    ]
+
+def test_upload_model_version():
+    conn = Cluster("http://localhost")
+    contract = Contract(
+        inputs={"x": Field(shape="scalar", type="int64", profile="numerical")},
+        outputs={"y": Field(shape="scalar", type="int64", profile="numerical")},
+    )
+    builder = ModelVersionBuilder("test", "./tests/resources/upload") \
+        .with_runtime(DockerImage.from_string("python:latest")) \
+        .with_signature(contract.to_proto())
+    files = list(iter_payload_files("./tests/resources/upload", ["file1.txt"]))
+
+    def _upload_matcher(request):
+        boundary = request.headers["Content-Type"].split("boundary=")[1]
+        parts = parse_multipart(b"".join(request.body), boundary)
+        assert [part[:3] for part in parts] == [("payload", "filename", "application/gzip"),
+                                               ("metadata", None, None)]
+        with tarfile.open(fileobj=io.BytesIO(parts[0][3]), mode="r:gz") as tar:
+            assert tar.getnames() == ["file1.txt"]
+        assert json.loads(parts[1][3])["name"] == "test"
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = json.dumps({
+            "id": 1,
+            "model": {"name": "test", "id": 1},
+            "modelVersion": 1,
+            "status": "Assembling",
+            "modelSignature": {"signatureName": "predict", "inputs": [], "outputs": []},
+            "monitoringConfiguration": {"batchSize": 100},
+            "runtime": {"name": "python", "tag": "latest"},
+            "metadata": {}
+        }).encode("utf-8")
+        return resp
+
+    with requests_mock.Mocker() as req_mock:
+        req_mock.add_matcher(_upload_matcher)
+        mv = upload_model_version(conn, builder, files)
+    assert mv.version == 1